@@ -0,0 +1,201 @@
+"""
+Customer accounts: password hashing, access tokens and revocation.
+
+Passwords are hashed with scrypt on PASSWORD_HASH_WORKERS threads (hashlib
+releases the GIL while hashing), so a burst of logins keeps the event loop
+and Starlette's thread pool free for other requests.
+
+Access tokens are `<claims>.<signature>`: base64url JSON `{sub, jti, exp}`
+signed with HMAC-SHA256, checked without reading MongoDB. Logging out
+records the token id in `revoked_tokens` until the token expires. Each
+worker remembers the last AUTH_REVOCATION_CACHE_SIZE checks for
+AUTH_REVOCATION_CACHE_TTL seconds, so a token revoked through another worker
+stops working within that delay.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from typing import Optional, Tuple
+from fastapi import Depends, Header, HTTPException
+from database import get_collections
+from tenancy import user_collections
+import config
+
+logger = logging.getLogger(__name__)
+
+# scrypt cost: 16 MB and about 50 ms per hash
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+password_executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+
+# Generated once per import: server.py preloads the app, so its workers share it
+if not config.AUTH_SECRET:
+    logger.warning(
+        "AUTH_SECRET is not set: tokens are signed with a random secret and all of them "
+        "become invalid when the server restarts"
+    )
+_secret = (config.AUTH_SECRET or secrets.token_urlsafe(32)).encode()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=32)
+
+
+def hash_password_sync(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def verify_password_sync(password: str, password_hash: str) -> bool:
+    try:
+        _, n, r, p, salt, key = password_hash.split("$")
+        expected = _b64decode(key)
+        return hmac.compare_digest(_scrypt(password, _b64decode(salt), int(n), int(r), int(p)), expected)
+    except ValueError:
+        return False
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, hash_password_sync, password)
+
+
+async def verify_password(password: str, password_hash: Optional[str]) -> bool:
+    # Unknown emails cost a hash too, so response times do not tell which emails exist
+    password_hash = password_hash or await unknown_user_hash()
+    return await asyncio.get_running_loop().run_in_executor(
+        password_executor, verify_password_sync, password, password_hash
+    )
+
+
+_unknown_user_hash: Optional[str] = None
+
+
+async def unknown_user_hash() -> str:
+    global _unknown_user_hash
+    if _unknown_user_hash is None:
+        _unknown_user_hash = await hash_password(secrets.token_urlsafe(16))
+    return _unknown_user_hash
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret, payload.encode(), hashlib.sha256).digest())
+
+
+def create_token(user_id: str, now: Optional[datetime] = None) -> Tuple[str, datetime]:
+    """Signed access token of `user_id` and its expiry."""
+    expires_at = (now or datetime.now(UTC)) + timedelta(seconds=config.AUTH_TOKEN_TTL_SECONDS)
+    claims = {"sub": user_id, "jti": secrets.token_urlsafe(12), "exp": int(expires_at.timestamp())}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Claims of a well-signed, unexpired token (None otherwise)."""
+    payload, _, signature = token.partition(".")
+    if not signature or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+class RevocationCache:
+    """Most recent revocation checks (token id -> revoked), LRU."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+
+    def get(self, token_id: str) -> Optional[bool]:
+        entry = self._entries.get(token_id)
+        if entry is None:
+            return None
+        revoked, checked_at = entry
+        # A revocation is final, only "not revoked" goes stale
+        if not revoked and time.monotonic() - checked_at > self.ttl:
+            del self._entries[token_id]
+            return None
+        self._entries.move_to_end(token_id)
+        return revoked
+
+    def put(self, token_id: str, revoked: bool) -> None:
+        self._entries[token_id] = (revoked, time.monotonic())
+        self._entries.move_to_end(token_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+revocation_cache = RevocationCache(config.AUTH_REVOCATION_CACHE_SIZE, config.AUTH_REVOCATION_CACHE_TTL)
+
+
+def is_revoked(claims: dict, collections: dict) -> bool:
+    revoked = revocation_cache.get(claims["jti"])
+    if revoked is None:
+        revoked = collections["revoked_tokens"].find_one({"_id": claims["jti"]}, {"_id": 1}) is not None
+        revocation_cache.put(claims["jti"], revoked)
+    return revoked
+
+
+def revoke(claims: dict, collections: dict) -> None:
+    # Kept until the token would have expired anyway (TTL index)
+    collections["revoked_tokens"].update_one(
+        {"_id": claims["jti"]},
+        {"$set": {"expires_at": datetime.fromtimestamp(claims["exp"], UTC)}},
+        upsert=True
+    )
+    revocation_cache.put(claims["jti"], True)
+
+
+def get_optional_user(
+    authorization: Optional[str] = Header(default=None),
+    collections: dict = Depends(get_collections)
+) -> Optional[dict]:
+    """Claims of the request's bearer token, None for anonymous requests."""
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    claims = decode_token(token) if scheme.lower() == "bearer" else None
+    if claims is None or is_revoked(claims, collections):
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+
+def get_current_user(user: Optional[dict] = Depends(get_optional_user)) -> dict:
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+
+def get_user_collections(
+    collections: dict = Depends(get_collections),
+    user: Optional[dict] = Depends(get_optional_user)
+) -> dict:
+    """Collections with carts and orders scoped to the signed-in user (or to anonymous ones)."""
+    return user_collections(collections, user["sub"] if user else None)
@@ -0,0 +1,58 @@
+"""
+Multi-get helpers: the ids of a batchGet request are resolved with at most
+one `$in` query and answered in request order, with a marker for each id that
+is not a valid ObjectId or does not exist.
+"""
+from typing import Dict, List, Optional
+from bson import ObjectId
+from catalog import catalog_cache
+
+
+def parse_ids(ids: List[str]) -> Dict[str, Optional[ObjectId]]:
+    """Requested id -> ObjectId (None when invalid)."""
+    return {id_: ObjectId(id_) if ObjectId.is_valid(id_) else None for id_ in ids}
+
+
+def valid_ids(object_ids: Dict[str, Optional[ObjectId]]) -> List[ObjectId]:
+    """Distinct valid ObjectIds of a parsed request."""
+    return list({object_id for object_id in object_ids.values() if object_id is not None})
+
+
+def find_by_ids(collection, object_ids: List[ObjectId]) -> Dict[str, dict]:
+    """One `$in` query, documents keyed by string id."""
+    if not object_ids:
+        return {}
+    return {str(doc["_id"]): doc for doc in collection.find({"_id": {"$in": object_ids}})}
+
+
+def batch_results(ids: List[str], object_ids: Dict[str, Optional[ObjectId]], found: Dict[str, dict]) -> list:
+    results = []
+    for id_ in ids:
+        object_id = object_ids[id_]
+        if object_id is None:
+            results.append({"id": id_, "found": False, "error": "invalid_id"})
+        elif str(object_id) not in found:
+            results.append({"id": id_, "found": False, "error": "not_found"})
+        else:
+            results.append({"id": id_, "found": True, "item": found[str(object_id)]})
+    return results
+
+
+async def catalog_batch_get(name: str, ids: List[str], collections: dict) -> list:
+    """
+    Multi-get of menu items or options: served from the cached catalog, only
+    ids missing from it (created since it was loaded) are queried.
+    """
+    object_ids = parse_ids(ids)
+    entry = await catalog_cache.get(name, collections)
+    found = {}
+    missing = []
+    for object_id in valid_ids(object_ids):
+        item = entry["by_id"].get(str(object_id))
+        if item is not None:
+            found[str(object_id)] = item
+        else:
+            missing.append(object_id)
+    for id_, doc in find_by_ids(collections[name], missing).items():
+        found[id_] = {**doc, "id": id_}
+    return batch_results(ids, object_ids, found)
@@ -0,0 +1,351 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, List, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from bson import ObjectId
+from pymongo import ReturnDocument
+from schemas.menu import MenuItemResponse
+from schemas.option import OptionResponse
+from schemas.pricing_rule import PricingRuleResponse
+from pricing_rules import PricingEngine
+from singleflight import single_flight
+from tenancy import collections_truck
+import config
+
+# Response model of each cached catalog collection
+CATALOG_MODELS = {
+    "menu": MenuItemResponse,
+    "options": OptionResponse,
+    "pricing_rules": PricingRuleResponse
+}
+
+# Document of the `counters` collection holding the catalog version (one per truck)
+CATALOG_COUNTER_ID = "catalog"
+
+
+def read_catalog_version(collections: dict) -> tuple:
+    """Return (version, last_modified) of the catalog, (0, None) before any write."""
+    counter = collections["counters"].find_one({"_id": CATALOG_COUNTER_ID})
+    if not counter:
+        return 0, None
+    return counter["seq"], counter.get("updated_at")
+
+
+def bump_catalog_version(collections: dict) -> int:
+    """Atomically increment the catalog version, shared by all workers."""
+    counter = collections["counters"].find_one_and_update(
+        {"_id": CATALOG_COUNTER_ID},
+        {"$inc": {"seq": 1}, "$set": {"updated_at": datetime.now(UTC)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+
+def next_change_seq(collections: dict) -> int:
+    """
+    Change sequence number to stamp (as `seq`) on a catalog document about to
+    be written. It is allocated before the write and `catalog_changed` bumps
+    the version again afterwards, so a cache loaded in between never pairs the
+    final version with the data from before the write.
+    """
+    return bump_catalog_version(collections)
+
+
+def record_deletion(name: str, item_id: ObjectId, seq: int, collections: dict) -> None:
+    """Leave a tombstone so that delta syncs learn about the deletion."""
+    collections["tombstones"].insert_one({
+        "collection": name,
+        "item_id": item_id,
+        "seq": seq,
+        "deleted_at": datetime.now(UTC)
+    })
+
+
+class SettledVersions:
+    """
+    Highest change sequence of a truck whose writes have all committed.
+
+    Sequences are allocated before their write, so with several workers seq 5
+    can commit after seq 6 has been read by a sync. Every sequence up to a
+    catalog version seen CATALOG_CHANGES_SETTLE_SECONDS ago was allocated
+    before then and is taken as committed; so is the whole catalog when the
+    version has not moved for that long. Versions are remembered per worker.
+    """
+
+    def __init__(self):
+        self._seen: dict = {}
+        self._lock = threading.Lock()
+
+    def settled(self, truck_id: Optional[str], version: int, updated_at: Optional[datetime]) -> Optional[int]:
+        """The settled sequence (None: no version recorded, nothing to wait for)."""
+        if updated_at is None:
+            return None
+        now = time.time()
+        horizon = now - config.CATALOG_CHANGES_SETTLE_SECONDS
+        # pymongo returns naive UTC datetimes
+        if (updated_at if updated_at.tzinfo else updated_at.replace(tzinfo=UTC)).timestamp() <= horizon:
+            return version
+        with self._lock:
+            seen = self._seen.setdefault(truck_id, deque())
+            if not seen or seen[-1][1] != version:
+                seen.append((now, version))
+            # Keep the newest observation old enough to count, drop the older ones
+            while len(seen) > 1 and seen[1][0] <= horizon:
+                seen.popleft()
+            return seen[0][1] if seen[0][0] <= horizon else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seen.clear()
+
+
+settled_versions = SettledVersions()
+
+
+def get_changes(since: int, collections: dict) -> dict:
+    """
+    Menu items, options and deletions stamped after `since`, in sequence order.
+    `next_since` stays at or below the settled sequence: changes still in
+    flight are delivered again by the next sync rather than skipped.
+    """
+    version, updated_at = read_catalog_version(collections)
+    settled = settled_versions.settled(collections_truck(collections), version, updated_at)
+    query = {"seq": {"$gt": since}} if since > 0 else {}
+    menu = list(collections["menu"].find(query).sort("seq", 1))
+    options = list(collections["options"].find(query).sort("seq", 1))
+    deleted = {"menu": [], "options": []}
+    seqs = [since]
+    if since > 0:
+        # A full sync (since=0) has nothing to delete on the client
+        for tombstone in collections["tombstones"].find(query).sort("seq", 1):
+            deleted[tombstone["collection"]].append(str(tombstone["item_id"]))
+            seqs.append(tombstone["seq"])
+    seqs.extend(doc.get("seq", 0) for doc in menu + options)
+    next_since = max(seqs) if settled is None else max(since, min(max(seqs), settled))
+    return {
+        "since": since,
+        "next_since": next_since,
+        "menu": [{**doc, "id": str(doc["_id"])} for doc in menu],
+        "options": [{**doc, "id": str(doc["_id"])} for doc in options],
+        "deleted": deleted
+    }
+
+
+class CatalogCache:
+    """
+    Per-process cache of the catalog collections (menu, options, pricing rules),
+    one entry per truck and collection.
+
+    An entry holds the documents converted for the response
+    (`{**doc, "id": str(doc["_id"])}`), the JSON body already rendered through
+    the response model, and the catalog version it was loaded at. Entries are
+    reloaded once older than CATALOG_CACHE_TTL seconds. Writes through this
+    worker invalidate them immediately; other workers are told by their
+    CatalogWatcher (catalog_watcher.py), and pick changes up within the TTL at
+    worst. Concurrent misses share a single reload (see singleflight.py).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    async def get(self, name: str, collections: dict) -> dict:
+        key = (collections_truck(collections), name)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry["loaded_at"] < self.ttl:
+            return entry
+        return await single_flight.do(f"catalog.{name}", key, lambda: self._load(key, collections))
+
+    def _load(self, key: tuple, collections: dict) -> dict:
+        truck_id, name = key
+        generation = self._generation
+        # Read the version before the documents: a concurrent write can then only
+        # make the entry look older than it is, never newer
+        version, last_modified = read_catalog_version(collections)
+        items = [{**doc, "id": str(doc["_id"])} for doc in collections[name].find()]
+        adapter = TypeAdapter(List[CATALOG_MODELS[name]])
+        entry = {
+            "items": items,
+            "by_id": {item["id"]: item for item in items},
+            "body": adapter.dump_json(adapter.validate_python(items)),
+            "version": version,
+            # Versions are counted per truck: the ETag names the truck too
+            "etag": f'"{name}-{version}"' if truck_id is None else f'"{truck_id}-{name}-{version}"',
+            "last_modified": last_modified,
+            "loaded_at": time.monotonic(),
+            "loaded_at_utc": datetime.now(UTC)
+        }
+        if name == "menu":
+            # Reverse index: option name -> ids of the menu items offering it
+            by_option = {}
+            for item in items:
+                for option_name in item.get("options", []):
+                    by_option.setdefault(option_name, []).append(item["id"])
+            entry["by_option"] = by_option
+        elif name == "options":
+            entry["by_name"] = {item["name"]: item for item in items}
+        elif name == "pricing_rules":
+            entry["engine"] = PricingEngine(items)
+        with self._lock:
+            # A write invalidated the cache while loading, don't store what may be stale
+            if generation == self._generation:
+                self._entries[key] = entry
+        return entry
+
+    def invalidate(self, name: Optional[str] = None, truck_id: Optional[str] = None) -> None:
+        """Drop the entries of `name` (all when None) of `truck_id` (all trucks when None)."""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                if (name is None or key[1] == name) and (truck_id is None or key[0] == truck_id):
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            name if truck_id is None else f"{truck_id}:{name}": {
+                "items": len(entry["items"]),
+                "version": entry["version"],
+                "loaded_at": entry["loaded_at_utc"],
+                "age_seconds": round(now - entry["loaded_at"], 3),
+                "fresh": now - entry["loaded_at"] < self.ttl
+            }
+            for (truck_id, name), entry in list(self._entries.items())
+        }
+
+
+catalog_cache = CatalogCache(config.CATALOG_CACHE_TTL)
+
+
+class CatalogEvents:
+    """
+    Catalog versions pushed to the clients of GET /menu/events, per truck.
+
+    Each subscriber gets a queue holding only the latest version it has not
+    read yet: a slow client skips intermediate versions instead of piling
+    them up, it only needs to know it must sync again.
+    """
+
+    def __init__(self, max_subscribers: int):
+        self.max_subscribers = max_subscribers
+        self.versions: dict = {}
+        self._subscribers: dict = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, truck_id: Optional[str]) -> Optional[asyncio.Queue]:
+        """A queue of new versions, None when there are too many subscribers."""
+        if self.subscriber_count() >= self.max_subscribers:
+            return None
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(truck_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, truck_id: Optional[str], queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(truck_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[truck_id]
+
+    def publish(self, truck_id: Optional[str], version: int) -> None:
+        """Notify a truck's subscribers of a new version (callable from any thread)."""
+        if version <= self.versions.get(truck_id, 0):
+            return
+        self.versions[truck_id] = version
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._notify(truck_id, version)
+        else:
+            loop.call_soon_threadsafe(self._notify, truck_id, version)
+
+    def _notify(self, truck_id: Optional[str], version: int) -> None:
+        for queue in list(self._subscribers.get(truck_id, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(version)
+
+
+catalog_events = CatalogEvents(config.CATALOG_EVENTS_MAX_SUBSCRIBERS)
+
+
+def catalog_changed(name: str, collections: dict) -> int:
+    """
+    Record a write to a catalog collection: new version, local invalidation
+    and a push to this worker's event subscribers (the other workers learn
+    about the version through their CatalogWatcher).
+    """
+    version = bump_catalog_version(collections)
+    truck_id = collections_truck(collections)
+    catalog_cache.invalidate(name, truck_id)
+    catalog_events.publish(truck_id, version)
+    return version
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def not_modified(request: Request, entry: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, entry["etag"])
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry["last_modified"] is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        last_modified = entry["last_modified"]
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=UTC)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(entry: dict) -> dict:
+    # The same URL serves every truck's catalog
+    headers = {"ETag": entry["etag"], "Vary": "X-Truck-Id"}
+    if entry["last_modified"] is not None:
+        last_modified = entry["last_modified"]
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=UTC)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def catalog_response(request: Request, entry: dict, render: Optional[Callable[[], bytes]] = None) -> Response:
+    """
+    304 when the client already holds this catalog version, otherwise the
+    cached list body (or `render()` for a single resource), with validators.
+    """
+    headers = validator_headers(entry)
+    if not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=entry["body"] if render is None else render(),
+        media_type="application/json",
+        headers=headers
+    )
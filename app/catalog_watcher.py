@@ -0,0 +1,89 @@
+"""
+Fan-out of catalog invalidations across worker processes.
+
+Every catalog write bumps the shared catalog version of its truck (the
+`<truck_id>:catalog` documents of `counters`). Each worker runs a
+CatalogWatcher thread following those documents, through a change stream when MongoDB supports one (replica sets,
+sharded clusters) and by polling it every CATALOG_POLL_INTERVAL seconds
+otherwise. On a new version the worker drops its cached catalog of that
+truck and pushes the version to its GET /menu/events subscribers, so a write through any
+worker is visible everywhere right away instead of after CATALOG_CACHE_TTL.
+"""
+import logging
+import threading
+from typing import Optional
+from pymongo.errors import PyMongoError
+from catalog import CATALOG_COUNTER_ID, catalog_cache, catalog_events
+import config
+
+logger = logging.getLogger(__name__)
+
+# The catalog version documents of all trucks
+CATALOG_COUNTERS = {"_id": {"$regex": f":{CATALOG_COUNTER_ID}$"}}
+
+
+class CatalogWatcher:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self._collections: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, collections: dict) -> None:
+        self._collections = collections
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def changed(self, truck_id: str, version: int) -> bool:
+        """Invalidate and notify when `version` is newer than the last one seen."""
+        if version <= catalog_events.versions.get(truck_id, 0):
+            return False
+        catalog_cache.invalidate(truck_id=truck_id)
+        catalog_events.publish(truck_id, version)
+        return True
+
+    def poll_once(self) -> bool:
+        """Check the catalog version of every truck (one query)."""
+        changed = False
+        for counter in self._collections["counters"].find(CATALOG_COUNTERS, {"seq": 1, "truck_id": 1}):
+            changed = self.changed(counter["truck_id"], counter["seq"]) or changed
+        return changed
+
+    def _run(self) -> None:
+        try:
+            self.poll_once()
+            self._follow_change_stream()
+        except PyMongoError as e:
+            # Standalone servers have no change streams
+            logger.info("Catalog change stream unavailable (%s), polling instead", e)
+        while not self._stop.is_set():
+            self.mode = "poll"
+            try:
+                self.poll_once()
+            except PyMongoError:
+                logger.exception("Catalog version poll failed")
+            self._stop.wait(self.poll_interval)
+
+    def _follow_change_stream(self) -> None:
+        pipeline = [{"$match": {"documentKey._id": CATALOG_COUNTERS["_id"]}}]
+        with self._collections["counters"].watch(
+            pipeline,
+            full_document="updateLookup",
+            max_await_time_ms=int(self.poll_interval * 1000)
+        ) as stream:
+            self.mode = "change_stream"
+            while not self._stop.is_set():
+                change = stream.try_next()
+                if change is not None and change.get("fullDocument"):
+                    self.changed(change["fullDocument"]["truck_id"], change["fullDocument"]["seq"])
+
+
+catalog_watcher = CatalogWatcher(config.CATALOG_POLL_INTERVAL)
@@ -9,3 +9,113 @@ VERSION: str = "0.1.0"
 PORT = int(os.getenv("PORT", 8000))
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+# Ensure indexes at startup (idempotent), disable when they are managed separately
+MONGO_CREATE_INDEXES = os.getenv("MONGO_CREATE_INDEXES", "true").lower() == "true"
+
+# Truck of the requests without an X-Truck-Id header
+DEFAULT_TRUCK_ID = os.getenv("DEFAULT_TRUCK_ID", "default")
+
+# Production server (app/server.py)
+HOST = os.getenv("HOST", "0.0.0.0")
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+KEEPALIVE = int(os.getenv("KEEPALIVE", 5))
+BACKLOG = int(os.getenv("BACKLOG", 2048))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", 60))
+
+# Seconds a worker serves the cached menu / options lists before reloading them
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 10))
+
+# Follow the catalog version to invalidate every worker's cache on writes: change
+# stream when MongoDB supports one, otherwise polling every CATALOG_POLL_INTERVAL seconds
+CATALOG_WATCH = os.getenv("CATALOG_WATCH", "true").lower() == "true"
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", 1))
+# GET /menu/changes: a change sequence is considered committed this many seconds after its
+# allocation, `next_since` never goes past one that may still be in flight
+CATALOG_CHANGES_SETTLE_SECONDS = float(os.getenv("CATALOG_CHANGES_SETTLE_SECONDS", 5))
+# GET /menu/events: connected clients per worker and keep-alive interval (seconds)
+CATALOG_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("CATALOG_EVENTS_MAX_SUBSCRIBERS", 1000))
+CATALOG_EVENTS_KEEPALIVE = float(os.getenv("CATALOG_EVENTS_KEEPALIVE", 15))
+
+# Rows per bulk_write when importing menu items and options
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+# Longest NDJSON import line accepted, in bytes (413 above)
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", 1024 * 1024))
+
+# Documents per bulk_write when converting cart / order references (migrate_references.py)
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 500))
+
+# Maximum number of ids in one batchGet request
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", 100))
+
+# Timezone of the daily windows of pricing rules (happy hours)
+PRICING_TIMEZONE = os.getenv("PRICING_TIMEZONE", "UTC")
+
+# Counter documents per tracked menu item / option, and reservation attempts under contention
+INVENTORY_SHARDS = int(os.getenv("INVENTORY_SHARDS", 4))
+INVENTORY_RESERVE_ATTEMPTS = int(os.getenv("INVENTORY_RESERVE_ATTEMPTS", 3))
+# Reservation ids kept on each stock shard to read back which conditional updates applied
+INVENTORY_RESERVATION_TAGS = int(os.getenv("INVENTORY_RESERVATION_TAGS", 50))
+
+# Truck locations: reports moving less than LOCATION_MIN_MOVE_METERS are not written unless
+# the stored one is older than LOCATION_REFRESH_SECONDS; positions older than
+# LOCATION_STALE_SECONDS are left out of GET /trucks/nearby
+LOCATION_MIN_MOVE_METERS = float(os.getenv("LOCATION_MIN_MOVE_METERS", 10))
+LOCATION_REFRESH_SECONDS = float(os.getenv("LOCATION_REFRESH_SECONDS", 60))
+LOCATION_STALE_SECONDS = float(os.getenv("LOCATION_STALE_SECONDS", 900))
+# GET /trucks/nearby radius (meters) and result limits
+NEARBY_DEFAULT_MAX_DISTANCE = float(os.getenv("NEARBY_DEFAULT_MAX_DISTANCE", 5000))
+NEARBY_MAX_DISTANCE = float(os.getenv("NEARBY_MAX_DISTANCE", 50000))
+NEARBY_MAX_LIMIT = int(os.getenv("NEARBY_MAX_LIMIT", 50))
+
+# Order status events: buffered per worker, written every ORDER_EVENTS_BATCH_SIZE events
+# or ORDER_EVENTS_FLUSH_INTERVAL seconds, kept ORDER_EVENTS_RETENTION_DAYS days
+ORDER_EVENTS_BATCH_SIZE = int(os.getenv("ORDER_EVENTS_BATCH_SIZE", 100))
+ORDER_EVENTS_FLUSH_INTERVAL = float(os.getenv("ORDER_EVENTS_FLUSH_INTERVAL", 2))
+ORDER_EVENTS_RETENTION_DAYS = int(os.getenv("ORDER_EVENTS_RETENTION_DAYS", 90))
+
+# Carts untouched for CART_TTL_SECONDS are deleted by MongoDB (TTL index);
+# orders unpaid after PENDING_ORDER_TTL_SECONDS are cancelled by a sweep every
+# ORDER_SWEEP_INTERVAL seconds (0 disables it), ORDER_SWEEP_BATCH_SIZE orders per update
+CART_TTL_SECONDS = int(os.getenv("CART_TTL_SECONDS", 24 * 3600))
+PENDING_ORDER_TTL_SECONDS = int(os.getenv("PENDING_ORDER_TTL_SECONDS", 3600))
+ORDER_SWEEP_INTERVAL = float(os.getenv("ORDER_SWEEP_INTERVAL", 60))
+ORDER_SWEEP_BATCH_SIZE = int(os.getenv("ORDER_SWEEP_BATCH_SIZE", 500))
+
+# Customer access tokens: signing secret (random per process when unset, tokens then only
+# work on the worker that issued them), lifetime, and per-worker cache of revocation checks
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", 7 * 24 * 3600))
+AUTH_REVOCATION_CACHE_SIZE = int(os.getenv("AUTH_REVOCATION_CACHE_SIZE", 10000))
+AUTH_REVOCATION_CACHE_TTL = float(os.getenv("AUTH_REVOCATION_CACHE_TTL", 30))
+# Threads hashing passwords, off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# Per-worker cache of the active orders of ACTIVE_ORDERS_CACHE_SIZE users (seconds),
+# and page size limit of GET /users/me/orders
+ACTIVE_ORDERS_CACHE_SIZE = int(os.getenv("ACTIVE_ORDERS_CACHE_SIZE", 1000))
+ACTIVE_ORDERS_CACHE_TTL = float(os.getenv("ACTIVE_ORDERS_CACHE_TTL", 10))
+USER_ORDERS_MAX_LIMIT = int(os.getenv("USER_ORDERS_MAX_LIMIT", 50))
+
+# Limits of POST /quote and /quote:batch
+QUOTE_MAX_ITEMS = int(os.getenv("QUOTE_MAX_ITEMS", 100))
+QUOTE_MAX_VARIANTS = int(os.getenv("QUOTE_MAX_VARIANTS", 20))
+
+# Maximum number of requests waiting on one coalesced read before returning 503
+SINGLEFLIGHT_MAX_WAITERS = int(os.getenv("SINGLEFLIGHT_MAX_WAITERS", 100))
+
+# Readiness probe: ping timeout and how long its result is reused (seconds)
+READINESS_PING_TIMEOUT = float(os.getenv("READINESS_PING_TIMEOUT", 1))
+READINESS_CACHE_TTL = float(os.getenv("READINESS_CACHE_TTL", 2))
+
+# Directory shared by worker processes for metrics aggregation (unset = single-process mode)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# On-demand request profiling (disabled unless a token or a sampling rate is set)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", 50))
+
+# Shared secret for /admin endpoints (disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
@@ -1,22 +1,142 @@
-from fastapi import Depends
+import os
+from typing import Optional
+from fastapi import Depends, Header, HTTPException
 from pymongo import MongoClient
 from pymongo.database import Database
+from pymongo.errors import CollectionInvalid
 import config
+from metrics import MONGO_EVENT_LISTENERS
+from tenancy import is_valid_truck_id, truck_collections
+
+# One client (and connection pool) per process, opened lazily so that a
+# preloading server never forks a live pool into its workers
+_client: Optional[MongoClient] = None
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            config.MONGO_URI,
+            maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+            event_listeners=MONGO_EVENT_LISTENERS
+        )
+    return _client
+
+def close_client() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+def _forget_client_after_fork() -> None:
+    # The parent's sockets must not be reused by the child
+    global _client
+    _client = None
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
 
 def get_database() -> Database:
-    client = MongoClient(config.MONGO_URI)
-    return client[config.MONGO_DB_NAME]
+    return get_client()[config.MONGO_DB_NAME]
 
-def get_collections(db: Database = Depends(get_database)) -> dict:
-    """Get all required database collections."""
+def database_collections(db: Database) -> dict:
+    """All collections, across trucks (scripts and background tasks)."""
     return {
         "menu": db["menu"],
         "options": db["options"],
         "carts": db["carts"],
-        "orders": db["orders"]
+        "orders": db["orders"],
+        "counters": db["counters"],
+        "tombstones": db["catalog_tombstones"],
+        "pricing_rules": db["pricing_rules"],
+        "inventory": db["inventory"],
+        "order_events": db["order_events"],
+        "users": db["users"],
+        "revoked_tokens": db["revoked_tokens"],
+        # One document per truck (location, open), shared by all trucks
+        "trucks": db["trucks"]
     }
 
-# Create indexes for unique fields
+def get_truck_id(x_truck_id: Optional[str] = Header(None, description="Truck the request is for")) -> str:
+    truck_id = x_truck_id or config.DEFAULT_TRUCK_ID
+    if not is_valid_truck_id(truck_id):
+        raise HTTPException(status_code=400, detail="Invalid truck ID")
+    return truck_id
+
+def get_collections(
+    db: Database = Depends(get_database),
+    truck_id: str = Depends(get_truck_id)
+) -> dict:
+    """Get all required database collections, scoped to the request's truck."""
+    return truck_collections(database_collections(db), truck_id)
+
+def ensure_ttl_index(collection, field: str, expire_after_seconds: int) -> None:
+    """
+    TTL index on `field`. create_index cannot change the delay of an existing
+    one (IndexOptionsConflict), so a changed setting is applied with collMod.
+    """
+    for index in collection.index_information().values():
+        if dict(index["key"]) == {field: 1} and "expireAfterSeconds" in index:
+            if index["expireAfterSeconds"] != expire_after_seconds:
+                collection.database.command(
+                    "collMod", collection.name,
+                    index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after_seconds}
+                )
+            return
+    collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+
+def ensure_timeseries_expiry(db: Database, name: str, expire_after_seconds: int) -> None:
+    """Apply a changed retention to an existing time-series collection."""
+    collection_info = next(iter(db.list_collections(filter={"name": name})), {})
+    if collection_info.get("options", {}).get("expireAfterSeconds") != expire_after_seconds:
+        db.command("collMod", name, expireAfterSeconds=expire_after_seconds)
+
+# Create indexes, all led by the truck_id partition key
 def create_indexes(db: Database):
-    db["menu"].create_index("name", unique=True)
-    db["options"].create_index("name", unique=True)
\ No newline at end of file
+    db["menu"].create_index([("truck_id", 1), ("name", 1)], unique=True)
+    db["options"].create_index([("truck_id", 1), ("name", 1)], unique=True)
+    # Menu search (GET /menu/?q=&category=&available=&min_price=&max_price=&option=)
+    db["menu"].create_index(
+        [("truck_id", 1), ("name", "text"), ("description", "text")],
+        weights={"name": 10, "description": 2},
+        name="menu_text"
+    )
+    db["menu"].create_index([("truck_id", 1), ("category", 1), ("available", 1), ("price", 1)])
+    db["menu"].create_index([("truck_id", 1), ("available", 1), ("price", 1)])
+    db["menu"].create_index([("truck_id", 1), ("options", 1), ("available", 1), ("price", 1)])
+    # Delta sync (GET /menu/changes) scans by change sequence
+    db["menu"].create_index([("truck_id", 1), ("seq", 1)])
+    db["options"].create_index([("truck_id", 1), ("seq", 1)])
+    db["catalog_tombstones"].create_index([("truck_id", 1), ("seq", 1)])
+    # Current cart of a user (or the anonymous one), per-truck order numbers and status filters
+    db["carts"].create_index([("truck_id", 1), ("user_id", 1), ("created_at", -1)])
+    db["orders"].create_index([("truck_id", 1), ("order_number", 1)], unique=True)
+    db["orders"].create_index([("truck_id", 1), ("status", 1)])
+    # Order history of a user (GET /users/me/orders), across trucks
+    db["orders"].create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    # Abandoned carts expire; TTL indexes take a single field, so this one is not led by truck_id
+    ensure_ttl_index(db["carts"], "updated_at", config.CART_TTL_SECONDS)
+    # Unpaid orders sweep, across trucks: only pending orders are indexed
+    db["orders"].create_index(
+        "created_at",
+        partialFilterExpression={"status": "pending"},
+        name="pending_created_at"
+    )
+    db["pricing_rules"].create_index("truck_id")
+    # Stock shards of a menu item / option
+    db["inventory"].create_index([("truck_id", 1), ("item_id", 1)])
+    # Customer accounts span trucks; revoked tokens are kept until they expire
+    db["users"].create_index("email", unique=True)
+    ensure_ttl_index(db["revoked_tokens"], "expires_at", 0)
+    # Nearby open trucks (GET /trucks/nearby)
+    db["trucks"].create_index([("location", "2dsphere"), ("open", 1)])
+    # Order status events: time series per truck, expired after the retention period
+    # (last: in-memory stand-ins without time-series support fail here)
+    retention = config.ORDER_EVENTS_RETENTION_DAYS * 24 * 3600
+    try:
+        db.create_collection(
+            "order_events",
+            timeseries={"timeField": "at", "metaField": "truck_id", "granularity": "minutes"},
+            expireAfterSeconds=retention
+        )
+    except CollectionInvalid:
+        ensure_timeseries_expiry(db, "order_events", retention)
@@ -0,0 +1,219 @@
+"""
+Stock of menu items and options.
+
+Untracked items (no inventory documents) have unlimited stock. A tracked
+item's stock is spread over INVENTORY_SHARDS counter documents in the
+`inventory` collection (`{_id: "<kind>:<item_id>:<shard>", item_id, stock}`),
+so concurrent orders of a hot item update different documents instead of
+queueing on one.
+
+Reserving an order decrements shards with conditional `$inc` updates
+(`stock >= quantity`, no upsert) sent in one unordered `bulk_write`. Each
+update also tags its shard with the reservation id (`reserved_by`, the last
+INVENTORY_RESERVATION_TAGS ids). When fewer updates matched than were sent
+(stock taken concurrently), the tagged shards tell which ones went through:
+they are given back and the reservation is retried against fresh counts.
+The shards actually decremented are stored on the order, so cancelling it
+returns exactly them.
+
+A menu item whose stock is zero once the reservation is written (shards read
+again, so concurrent orders count) is flipped to unavailable and marked
+`sold_out`; setting its stock again flips it back. Both flips stamp a change
+sequence, so delta syncs see them.
+"""
+import random
+from typing import Dict, List
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from catalog import catalog_changed, next_change_seq
+from references import find_options
+from batch import find_by_ids
+import config
+
+def shard_id(kind: str, item_id: ObjectId, shard: int) -> str:
+    return f"{kind}:{item_id}:{shard}"
+
+
+def read_stock(item_ids: List[ObjectId], collections: dict) -> Dict[ObjectId, List[dict]]:
+    """Shards of the tracked items among `item_ids` (one query)."""
+    shards: Dict[ObjectId, List[dict]] = {}
+    if item_ids:
+        for shard in collections["inventory"].find({"item_id": {"$in": list(item_ids)}}):
+            shards.setdefault(shard["item_id"], []).append(shard)
+    return shards
+
+
+def set_stock(kind: str, item_id: ObjectId, stock: int, collections: dict) -> None:
+    """Set the stock of an item, spread evenly over its shards."""
+    shares = [stock // config.INVENTORY_SHARDS] * config.INVENTORY_SHARDS
+    for shard in range(stock % config.INVENTORY_SHARDS):
+        shares[shard] += 1
+    collections["inventory"].bulk_write([
+        UpdateOne(
+            {"_id": shard_id(kind, item_id, shard)},
+            {"$set": {"kind": kind, "item_id": item_id, "shard": shard, "stock": share}},
+            upsert=True
+        )
+        for shard, share in enumerate(shares)
+    ])
+    if kind == "menu":
+        if stock > 0:
+            mark_back_in_stock([item_id], collections)
+        else:
+            mark_sold_out([item_id], collections)
+
+
+def stock_levels(collections: dict, query: dict = None) -> List[dict]:
+    """Stock of the tracked items (matching `query`), summed over their shards."""
+    levels: Dict[ObjectId, dict] = {}
+    for shard in collections["inventory"].find(query or {}):
+        level = levels.setdefault(shard["item_id"], {"kind": shard["kind"], "item_id": str(shard["item_id"]), "stock": 0})
+        level["stock"] += shard["stock"]
+    return list(levels.values())
+
+
+def stop_tracking(kind: str, item_id: ObjectId, collections: dict) -> int:
+    result = collections["inventory"].delete_many({"item_id": item_id})
+    if kind == "menu":
+        mark_back_in_stock([item_id], collections)
+    return result.deleted_count
+
+
+def _flip_availability(menu_item_ids: List[ObjectId], query: dict, update: dict, collections: dict) -> None:
+    query = {"_id": {"$in": menu_item_ids}, **query}
+    # Most calls have nothing to flip: no change sequence is spent on them
+    if collections["menu"].find_one(query, {"_id": 1}) is None:
+        return
+    seq = next_change_seq(collections)
+    result = collections["menu"].update_many(query, {**update, "$set": {**update["$set"], "seq": seq}})
+    if result.modified_count:
+        catalog_changed("menu", collections)
+
+
+def mark_sold_out(menu_item_ids: List[ObjectId], collections: dict) -> None:
+    _flip_availability(
+        menu_item_ids, {"available": True}, {"$set": {"available": False, "sold_out": True}}, collections
+    )
+
+
+def mark_back_in_stock(menu_item_ids: List[ObjectId], collections: dict) -> None:
+    # Only items flipped by the inventory, not those disabled by hand
+    _flip_availability(
+        menu_item_ids, {"sold_out": True}, {"$set": {"available": True}, "$unset": {"sold_out": ""}}, collections
+    )
+
+
+def stock_needs(lines: List[dict], collections: dict) -> Dict[ObjectId, int]:
+    """Units of each menu item and option needed by cart / order lines."""
+    needs: Dict[ObjectId, int] = {}
+    option_ids = {}
+    names = [ref for line in lines for ref in line["selected_options"] if isinstance(ref, str)]
+    if names:
+        # Lines not migrated to ObjectId references yet
+        option_ids = {option["name"]: option["_id"] for option in find_options(names, collections["options"])}
+    for line in lines:
+        menu_item_id = ObjectId(line["menu_item_id"])
+        needs[menu_item_id] = needs.get(menu_item_id, 0) + line["quantity"]
+        for ref in line["selected_options"]:
+            option_id = option_ids.get(ref) if isinstance(ref, str) else ref
+            if option_id is not None:
+                needs[option_id] = needs.get(option_id, 0) + line["quantity"]
+    return needs
+
+
+def plan_reservation(needs: Dict[ObjectId, int], shards: Dict[ObjectId, List[dict]]) -> tuple:
+    """([(shard _id, item_id, quantity)], ids of the items short of stock)."""
+    plan, short = [], []
+    for item_id, shard_docs in shards.items():
+        needed = needs[item_id]
+        if sum(shard["stock"] for shard in shard_docs) < needed:
+            short.append(item_id)
+            continue
+        # Start at a random shard so that concurrent orders spread their updates
+        start = random.randrange(len(shard_docs))
+        for shard in shard_docs[start:] + shard_docs[:start]:
+            taken = min(needed, shard["stock"])
+            if taken > 0:
+                plan.append((shard["_id"], item_id, taken))
+                needed -= taken
+            if needed == 0:
+                break
+    return plan, short
+
+
+def release(reservations: List[dict], collections: dict) -> None:
+    """Return reserved units to the shards they were taken from."""
+    if not reservations:
+        return
+    collections["inventory"].bulk_write([
+        UpdateOne({"_id": reservation["shard"]}, {"$inc": {"stock": reservation["quantity"]}})
+        for reservation in reservations
+    ], ordered=False)
+    menu_item_ids = list({reservation["item_id"] for reservation in reservations if reservation["kind"] == "menu"})
+    if menu_item_ids:
+        mark_back_in_stock(menu_item_ids, collections)
+
+
+def item_names(item_ids: List[ObjectId], collections: dict) -> List[str]:
+    found = {**find_by_ids(collections["menu"], item_ids), **find_by_ids(collections["options"], item_ids)}
+    return [found[str(item_id)]["name"] if str(item_id) in found else str(item_id) for item_id in item_ids]
+
+
+def reserve(lines: List[dict], collections: dict) -> List[dict]:
+    """
+    Take the stock needed by `lines`, all or nothing. Returns the reservations
+    to store on the order; raises a 409 naming the items short of stock.
+    """
+    needs = stock_needs(lines, collections)
+    for _ in range(config.INVENTORY_RESERVE_ATTEMPTS):
+        shards = read_stock(list(needs), collections)
+        plan, short = plan_reservation(needs, shards)
+        if short:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Not enough stock for: {', '.join(item_names(short, collections))}"
+            )
+        if not plan:
+            return []
+
+        reservation_id = ObjectId()
+        result = collections["inventory"].bulk_write([
+            UpdateOne(
+                {"_id": shard, "stock": {"$gte": quantity}},
+                {
+                    "$inc": {"stock": -quantity},
+                    "$push": {"reserved_by": {"$each": [reservation_id], "$slice": -config.INVENTORY_RESERVATION_TAGS}}
+                }
+            )
+            for shard, _, quantity in plan
+        ], ordered=False)
+        applied = plan
+        if result.matched_count < len(plan):
+            # Read back which updates went through
+            tagged = {
+                shard["_id"] for shard in collections["inventory"].find(
+                    {"_id": {"$in": [shard for shard, _, _ in plan]}, "reserved_by": reservation_id}, {"_id": 1}
+                )
+            }
+            applied = [step for step in plan if step[0] in tagged]
+
+        reservations = [
+            {"shard": shard, "item_id": item_id, "kind": shard.split(":", 1)[0], "quantity": quantity}
+            for shard, item_id, quantity in applied
+        ]
+        if len(applied) == len(plan):
+            # Decided on the counts after the write, concurrent orders included
+            menu_item_ids = [item_id for item_id, shard_docs in shards.items() if shard_docs[0]["kind"] == "menu"]
+            sold_out = [
+                item_id for item_id, shard_docs in read_stock(menu_item_ids, collections).items()
+                if sum(shard["stock"] for shard in shard_docs) <= 0
+            ]
+            if sold_out:
+                mark_sold_out(sold_out, collections)
+            return reservations
+
+        # Stock moved concurrently: undo what was taken and retry on fresh counts
+        release(reservations, collections)
+
+    raise HTTPException(status_code=409, detail="Stock is changing too fast, please retry")
@@ -0,0 +1,128 @@
+"""
+Truck locations and "nearest open truck" search.
+
+Trucks report their position every few seconds. Each truck has one document
+in the (global, not per-truck) `trucks` collection, keyed by its truck id,
+holding a GeoJSON point under a `2dsphere` index. A report is a single upsert
+by `_id`, and reports moving the truck less than LOCATION_MIN_MOVE_METERS are
+not written at all unless the stored one is older than
+LOCATION_REFRESH_SECONDS, so a parked truck costs nothing.
+
+Searches run one aggregation: `$geoNear` (open trucks with a recent position,
+nearest first, within a radius), then, when an item is asked for, a `$lookup`
+of that item among the truck's available menu items, served by the
+`(truck_id, name)` index.
+"""
+import math
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from typing import Optional
+import config
+
+EARTH_RADIUS_METERS = 6371000
+
+
+def distance_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (haversine) distance."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+
+def point(lat: float, lng: float) -> dict:
+    # GeoJSON order is longitude, latitude
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+class LocationThrottle:
+    """Last position written per truck, to drop reports that change nothing."""
+
+    def __init__(self, min_move_meters: float, refresh_seconds: float):
+        self.min_move_meters = min_move_meters
+        self.refresh_seconds = refresh_seconds
+        self._last: dict = {}
+        self._lock = threading.Lock()
+
+    def should_store(self, truck_id: str, lat: float, lng: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(truck_id)
+            if last is not None:
+                last_lat, last_lng, stored_at = last
+                if (now - stored_at < self.refresh_seconds
+                        and distance_meters(last_lat, last_lng, lat, lng) < self.min_move_meters):
+                    return False
+            self._last[truck_id] = (lat, lng, now)
+            return True
+
+    def forget(self, truck_id: Optional[str] = None) -> None:
+        with self._lock:
+            if truck_id is None:
+                self._last.clear()
+            else:
+                self._last.pop(truck_id, None)
+
+
+location_throttle = LocationThrottle(config.LOCATION_MIN_MOVE_METERS, config.LOCATION_REFRESH_SECONDS)
+
+
+def store_location(trucks_collection, truck_id: str, lat: float, lng: float) -> bool:
+    """Upsert the truck's position, unless it barely moved. Returns whether it was written."""
+    if not location_throttle.should_store(truck_id, lat, lng):
+        return False
+    try:
+        trucks_collection.update_one(
+            {"_id": truck_id},
+            {"$set": {"location": point(lat, lng), "location_updated_at": datetime.now(UTC)}},
+            upsert=True
+        )
+    except Exception:
+        # Not written: the next report must not be throttled against it
+        location_throttle.forget(truck_id)
+        raise
+    return True
+
+
+def nearby_pipeline(lat: float, lng: float, item: Optional[str], max_distance: float, limit: int) -> list:
+    fresh_since = datetime.now(UTC) - timedelta(seconds=config.LOCATION_STALE_SECONDS)
+    pipeline = [{
+        "$geoNear": {
+            "near": point(lat, lng),
+            "distanceField": "distance",
+            "maxDistance": max_distance,
+            "spherical": True,
+            "query": {"open": True, "location_updated_at": {"$gte": fresh_since}}
+        }
+    }]
+    if item is not None:
+        pipeline += [
+            {"$lookup": {
+                "from": "menu",
+                "localField": "_id",
+                "foreignField": "truck_id",
+                "pipeline": [
+                    {"$match": {"name": item, "available": True}},
+                    {"$project": {"name": 1, "price": 1}},
+                    {"$limit": 1}
+                ],
+                "as": "items"
+            }},
+            {"$match": {"items": {"$ne": []}}}
+        ]
+    pipeline.append({"$limit": limit})
+    return pipeline
+
+
+def nearby_truck(document: dict) -> dict:
+    lng, lat = document["location"]["coordinates"]
+    items = document.get("items")
+    return {
+        "truck_id": document["_id"],
+        "name": document.get("name"),
+        "distance": round(document["distance"], 1),
+        "location": {"lat": lat, "lng": lng},
+        "item": {**items[0], "id": str(items[0]["_id"])} if items else None
+    }
@@ -1,16 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import uvicorn
 import config
-from database import get_database
-from routes import menu, options, cart, order
+from database import get_database, get_client, close_client, create_indexes, database_collections
+from catalog_watcher import catalog_watcher
+from order_events import order_events
+from order_sweeper import order_sweeper
+from metrics import MetricsMiddleware, metrics_response
+from profiling import ProfilingMiddleware, profiling_enabled
+from routes import menu, options, cart, order, admin, health, imports, quote, pricing_rules, inventory, trucks, users
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after fork, so every process opens its own pool
+    get_client()
+    if config.MONGO_CREATE_INDEXES:
+        create_indexes(get_database())
+    if config.CATALOG_WATCH:
+        catalog_watcher.start(database_collections(get_database()))
+    order_events.start()
+    if config.ORDER_SWEEP_INTERVAL:
+        order_sweeper.start(database_collections(get_database()))
+    yield
+    order_sweeper.stop()
+    order_events.stop()
+    catalog_watcher.stop()
+    close_client()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+# Only installed when configured, so requests pay nothing otherwise
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
 
 # Include all routers
 app.include_router(menu.router, prefix="/menu", tags=["Menu"])
+app.include_router(imports.router, prefix="/menu", tags=["Menu"])
 app.include_router(options.router, prefix="/options", tags=["Options"])
 app.include_router(cart.router, prefix="/cart", tags=["Cart"])
 app.include_router(order.router, prefix="/orders", tags=["Orders"])
+app.include_router(quote.router, tags=["Quote"])
+app.include_router(pricing_rules.router, prefix="/pricing-rules", tags=["Pricing Rules"])
+app.include_router(inventory.router, prefix="/inventory", tags=["Inventory"])
+app.include_router(trucks.router, prefix="/trucks", tags=["Trucks"])
+app.include_router(users.router, prefix="/users", tags=["Users"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+app.include_router(health.router, tags=["Health"])
 
 # Test de connexion à MongoDB
 @app.get("/db-status")
@@ -24,6 +59,12 @@ async def db_status():
         return {"status": "Error", "message": str(e)}
 
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+
 @app.get("/")
 async def root():
     return {"message": "Bienvenue sur l'API du Food Truck!"}
@@ -0,0 +1,204 @@
+import threading
+import time
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+import config
+
+# Latency buckets (seconds) tuned for an API whose handlers mostly do one or two Mongo round trips
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+MONGO_COMMANDS_TOTAL = Counter(
+    "mongo_commands_total",
+    "MongoDB commands by name and outcome",
+    ["command", "outcome"],
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by name",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Failed connection pool checkouts by reason",
+    ["reason"],
+)
+SINGLEFLIGHT_REQUESTS = Counter(
+    "singleflight_requests_total",
+    "Coalesced reads by kind and role (leader ran the query, shared reused it, rejected hit the waiter limit)",
+    ["key", "role"],
+)
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Records count and latency of every command sent by the PyMongo driver."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMANDS_TOTAL.labels(event.command_name, "success").inc()
+        MONGO_COMMAND_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMANDS_TOTAL.labels(event.command_name, "failure").inc()
+        MONGO_COMMAND_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Records how long requests wait for a pooled connection and keeps
+    in-process pool counters for the readiness probe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def stats(self) -> dict:
+        return {"open": self.open, "in_use": self.in_use, "waiting": self.waiting}
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, in_use=1)
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1)
+        MONGO_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        self._add(in_use=-1)
+
+    def connection_created(self, event):
+        self._add(open=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    # The remaining pool events are not measured
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+# Passed to every MongoClient created by the application
+pool_listener = PoolMetricsListener()
+MONGO_EVENT_LISTENERS = [CommandMetricsListener(), pool_listener]
+
+
+def route_template(scope) -> str:
+    """
+    Rebuild the route template of a matched request by putting path parameter
+    names back in place of their values. Unmatched requests share one label.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    path_params = scope.get("path_params")
+    if not path_params:
+        return scope["path"]
+    placeholders = {str(value): "{" + name + "}" for name, value in path_params.items()}
+    return "/".join(placeholders.get(segment, segment) for segment in scope["path"].split("/"))
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware timing each HTTP request.
+    Requests are labelled with their route template (e.g. /menu/{menu_item_id})
+    rather than the raw path so that label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            template = route_template(scope)
+            REQUEST_LATENCY.labels(scope["method"], template).observe(elapsed)
+            REQUESTS_TOTAL.labels(scope["method"], template, str(status_code)).inc()
+
+
+def metrics_response() -> Response:
+    """Render all metrics, aggregating over worker processes in multiprocess mode."""
+    if config.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop live gauges of an exited worker (called from the process manager)."""
+    if config.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,138 @@
+"""
+Online migration of cart and order lines to ObjectId references:
+`python app/migrate_references.py [--collection carts|orders] [--batch-size N] [--restart]`
+
+Converts the `menu_item_id` strings to ObjectIds and the option names in
+`selected_options` to option ids, MIGRATION_BATCH_SIZE documents at a time
+with one unordered `bulk_write` per batch. The app keeps serving meanwhile
+(it reads both forms, see references.py).
+
+The last `_id` processed is checkpointed in `counters`, so an interrupted run
+resumes where it stopped (`--restart` ignores the checkpoint). An update only
+applies if the lines are unchanged since they were read; documents written
+concurrently are converted by a further pass. Names of options that no longer
+exist are left as they are.
+"""
+import argparse
+import json
+from datetime import datetime, UTC
+from bson import ObjectId
+from pymongo import UpdateOne
+from database import close_client, database_collections, get_database
+import config
+
+COLLECTIONS = ("carts", "orders")
+
+# Passes over a collection while concurrent writes keep conflicting
+MAX_PASSES = 10
+
+# Documents with at least one line not converted yet
+LEGACY_LINES = {
+    "$or": [
+        {"items.menu_item_id": {"$type": "string"}},
+        {"items.selected_options": {"$type": "string"}}
+    ]
+}
+
+
+def checkpoint_id(name: str) -> str:
+    return f"migration.references.{name}"
+
+
+def convert_line(line: dict, option_ids: dict) -> dict:
+    menu_item_id = line["menu_item_id"]
+    if isinstance(menu_item_id, str) and ObjectId.is_valid(menu_item_id):
+        menu_item_id = ObjectId(menu_item_id)
+    selected_options = [
+        option_ids.get(ref, ref) if isinstance(ref, str) else ref
+        for ref in line.get("selected_options", [])
+    ]
+    return {**line, "menu_item_id": menu_item_id, "selected_options": selected_options}
+
+
+def migrate_batch(collection, documents: list, option_ids: dict) -> tuple:
+    """Convert a batch with one bulk_write, returns (converted, conflicts)."""
+    operations = []
+    for document in documents:
+        # Option names are unique per truck
+        truck_option_ids = option_ids.get(document.get("truck_id"), {})
+        items = [convert_line(line, truck_option_ids) for line in document["items"]]
+        if items != document["items"]:
+            # Only applies if the cart / order was not modified since it was read
+            operations.append(UpdateOne(
+                {"_id": document["_id"], "items": document["items"]},
+                {"$set": {"items": items}}
+            ))
+    if not operations:
+        return 0, 0
+    result = collection.bulk_write(operations, ordered=False)
+    return result.modified_count, len(operations) - result.matched_count
+
+
+def migrate_collection(name: str, collections: dict, option_ids: dict, batch_size: int, restart: bool = False) -> dict:
+    """One pass over a collection, resuming from its checkpoint unless `restart`."""
+    collection = collections[name]
+    counters = collections["counters"]
+    checkpoint = None if restart else counters.find_one({"_id": checkpoint_id(name)})
+    last_id = checkpoint["last_id"] if checkpoint else None
+    totals = {"scanned": 0, "converted": 0, "conflicts": 0}
+
+    while True:
+        query = dict(LEGACY_LINES)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        documents = list(collection.find(query, sort=[("_id", 1)], limit=batch_size))
+        if not documents:
+            break
+        converted, conflicts = migrate_batch(collection, documents, option_ids)
+        totals["scanned"] += len(documents)
+        totals["converted"] += converted
+        totals["conflicts"] += conflicts
+        last_id = documents[-1]["_id"]
+        counters.update_one(
+            {"_id": checkpoint_id(name)},
+            {"$set": {"last_id": last_id, "updated_at": datetime.now(UTC)}},
+            upsert=True
+        )
+
+    counters.delete_one({"_id": checkpoint_id(name)})
+    return totals
+
+
+def migrate(collections: dict, names=COLLECTIONS, batch_size: int = config.MIGRATION_BATCH_SIZE, restart: bool = False) -> dict:
+    option_ids = {}
+    for option in collections["options"].find({}, {"name": 1, "truck_id": 1}):
+        option_ids.setdefault(option.get("truck_id"), {})[option["name"]] = option["_id"]
+    report = {}
+    for name in names:
+        totals = migrate_collection(name, collections, option_ids, batch_size, restart)
+        passes = 1
+        while totals["conflicts"] and passes < MAX_PASSES:
+            retry = migrate_collection(name, collections, option_ids, batch_size, restart=True)
+            totals = {key: totals[key] + retry[key] for key in ("scanned", "converted")}
+            totals["conflicts"] = retry["conflicts"]
+            passes += 1
+        report[name] = {**totals, "passes": passes}
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert cart and order references to ObjectIds")
+    parser.add_argument(
+        "--collection", dest="collections", action="append", choices=COLLECTIONS,
+        help="collection to convert, repeatable (default: carts and orders)"
+    )
+    parser.add_argument("--batch-size", type=int, default=config.MIGRATION_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore saved checkpoints")
+    args = parser.parse_args()
+
+    try:
+        names = args.collections or COLLECTIONS
+        report = migrate(database_collections(get_database()), names, args.batch_size, args.restart)
+    finally:
+        close_client()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Migration of a single-truck database to truck tenancy:
+`python app/migrate_tenancy.py [--truck-id ID]`
+
+Run once before starting a version with truck tenancy (tenancy.py). Assigns
+the documents without a `truck_id` to a truck (DEFAULT_TRUCK_ID unless
+given), moves the catalog version to that truck's counter and drops the
+indexes not led by `truck_id`: the old unique name indexes would keep two
+trucks from using the same names. Safe to run again.
+"""
+import argparse
+import json
+from database import close_client, create_indexes, database_collections, get_database
+from catalog import CATALOG_COUNTER_ID
+from tenancy import TRUCK_COLLECTIONS, is_valid_truck_id, truck_counter_id
+import config
+
+# Indexes created before truck tenancy, per collection
+LEGACY_INDEXES = {
+    "menu": [
+        "name_1", "menu_text", "category_1_available_1_price_1", "available_1_price_1",
+        "options_1_available_1_price_1", "seq_1"
+    ],
+    "options": ["name_1", "seq_1"],
+    "catalog_tombstones": ["seq_1"],
+    "inventory": ["item_id_1"]
+}
+
+
+def assign_truck(collections: dict, truck_id: str) -> dict:
+    """Documents given `truck_id`, per collection."""
+    assigned = {}
+    for name in TRUCK_COLLECTIONS:
+        # Order events came with tenancy, they always carry their truck
+        if name in ("counters", "order_events"):
+            continue
+        result = collections[name].update_many({"truck_id": {"$exists": False}}, {"$set": {"truck_id": truck_id}})
+        assigned[name] = result.modified_count
+    return assigned
+
+
+def move_catalog_counter(counters, truck_id: str) -> bool:
+    legacy = counters.find_one({"_id": CATALOG_COUNTER_ID})
+    if not legacy:
+        return False
+    # $max: never move the truck's version backwards, clients hold ETags on it
+    counters.update_one(
+        {"_id": truck_counter_id(truck_id, CATALOG_COUNTER_ID)},
+        {"$max": {"seq": legacy["seq"]}, "$set": {"truck_id": truck_id, "updated_at": legacy.get("updated_at")}},
+        upsert=True
+    )
+    counters.delete_one({"_id": CATALOG_COUNTER_ID})
+    return True
+
+
+def drop_legacy_indexes(db) -> list:
+    dropped = []
+    for name, index_names in LEGACY_INDEXES.items():
+        existing = db[name].index_information()
+        for index_name in index_names:
+            if index_name in existing:
+                db[name].drop_index(index_name)
+                dropped.append(f"{name}.{index_name}")
+    return dropped
+
+
+def migrate(db, truck_id: str) -> dict:
+    collections = database_collections(db)
+    report = {
+        "assigned": assign_truck(collections, truck_id),
+        "catalog_counter_moved": move_catalog_counter(collections["counters"], truck_id),
+        "dropped_indexes": drop_legacy_indexes(db)
+    }
+    create_indexes(db)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign existing documents to a truck")
+    parser.add_argument("--truck-id", default=config.DEFAULT_TRUCK_ID)
+    args = parser.parse_args()
+    if not is_valid_truck_id(args.truck_id):
+        parser.error("invalid truck id")
+    try:
+        report = migrate(get_database(), args.truck_id)
+    finally:
+        close_client()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
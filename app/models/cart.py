@@ -1,11 +1,16 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, UTC
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from bson import ObjectId
 
+# References are stored as ObjectIds, lines written before the migration
+# (migrate_references.py) still hold a string id and option names
 class CartItemModel(BaseModel):
-    menu_item_id: str
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    menu_item_id: Union[ObjectId, str]
     quantity: int
-    selected_options: List[str]
+    selected_options: List[Union[ObjectId, str]]
     special_instructions: Optional[str] = None
     total_price: float  # Calculated server-side
 
@@ -13,5 +18,7 @@ class CartModel(BaseModel):
     id: Optional[str] = None
     items: List[CartItemModel]
     total_amount: float
+    discounts: List[dict] = []
+    discount_amount: float = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC)) 
\ No newline at end of file
@@ -1,12 +1,17 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field
+from bson import ObjectId
 from datetime import datetime, UTC
 from schemas.order import OrderStatus
 
+# References are stored as ObjectIds, lines written before the migration
+# (migrate_references.py) still hold a string id and option names
 class OrderItemModel(BaseModel):
-    menu_item_id: str
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    menu_item_id: Union[ObjectId, str]
     quantity: int
-    selected_options: List[str]
+    selected_options: List[Union[ObjectId, str]]
     special_instructions: Optional[str] = None
     total_price: float  # Calculated server-side
 
@@ -15,6 +20,8 @@ class OrderModel(BaseModel):
     order_number: str
     items: List[OrderItemModel]
     total_amount: float
+    discounts: List[dict] = []
+    discount_amount: float = 0
     status: OrderStatus = OrderStatus.PENDING
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
\ No newline at end of file
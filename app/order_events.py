@@ -0,0 +1,147 @@
+"""
+Append-only log of order status changes and time-in-stage statistics.
+
+Every status change (order creation included) appends an event
+`{at, truck_id, order_id, status, previous_status, menu_item_ids}` to the
+`order_events` time-series collection (time field `at`, meta field
+`truck_id`). Events are buffered per worker and written with one unordered
+`insert_many` per ORDER_EVENTS_BATCH_SIZE events or every
+ORDER_EVENTS_FLUSH_INTERVAL seconds, whichever comes first, so a status
+change costs no extra round trip; a worker killed before a flush loses its
+buffered events, never the status change itself.
+
+The time spent in a stage is the gap between the event entering it and the
+order's next event, computed by MongoDB with `$setWindowFields`; p50 / p95
+come from `$percentile` (MongoDB 7.0+).
+"""
+import logging
+import threading
+from datetime import datetime, UTC
+from typing import List, Optional
+from bson import ObjectId
+from tenancy import collections_truck
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def order_menu_item_ids(order: dict) -> List[ObjectId]:
+    ids = []
+    for line in order.get("items", []):
+        menu_item_id = line["menu_item_id"]
+        if isinstance(menu_item_id, str) and ObjectId.is_valid(menu_item_id):
+            menu_item_id = ObjectId(menu_item_id)
+        if menu_item_id not in ids:
+            ids.append(menu_item_id)
+    return ids
+
+
+class OrderEventLog:
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: list = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, collections: dict, order: dict, status: str, previous_status: Optional[str] = None) -> None:
+        """Buffer a status change of `order` (the document as read or written)."""
+        collection = collections["order_events"]
+        event = {
+            "at": datetime.now(UTC),
+            "truck_id": collections_truck(collections),
+            "order_id": order["_id"],
+            "status": status,
+            "previous_status": previous_status,
+            "menu_item_ids": order_menu_item_ids(order)
+        }
+        # Events are stamped with their truck here, the buffer writes them unscoped
+        with self._lock:
+            self.pending.append((getattr(collection, "collection", collection), event))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write the buffered events, one insert_many per collection. Returns the count written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending = self.pending, []
+            batches: dict = {}
+            for collection, event in pending:
+                batches.setdefault(id(collection), (collection, []))[1].append(event)
+            written = 0
+            for collection, events in batches.values():
+                try:
+                    collection.insert_many(events, ordered=False)
+                    written += len(events)
+                except Exception:
+                    # Statistics only: dropping a batch must not fail or block orders
+                    logger.exception("Could not write %d order events", len(events))
+            return written
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+order_events = OrderEventLog(config.ORDER_EVENTS_BATCH_SIZE, config.ORDER_EVENTS_FLUSH_INTERVAL)
+
+
+def stage_durations_pipeline(since: datetime, until: datetime, group_by: str) -> list:
+    """p50 / p95 seconds spent in each stage, per hour entered or per menu item."""
+    pipeline = [
+        {"$match": {"at": {"$gte": since, "$lt": until}}},
+        {"$setWindowFields": {
+            "partitionBy": "$order_id",
+            "sortBy": {"at": 1},
+            "output": {"left_at": {"$shift": {"output": "$at", "by": 1}}}
+        }},
+        # Stages not left yet (or terminal) have no duration
+        {"$match": {"left_at": {"$ne": None}}},
+        {"$set": {"seconds": {"$divide": [{"$subtract": ["$left_at", "$at"]}, 1000]}}}
+    ]
+    if group_by == "hour":
+        key = {"stage": "$status", "hour": {"$dateTrunc": {"date": "$at", "unit": "hour"}}}
+    else:
+        pipeline.append({"$unwind": "$menu_item_ids"})
+        key = {"stage": "$status", "menu_item_id": "$menu_item_ids"}
+    pipeline += [
+        {"$group": {
+            "_id": key,
+            "count": {"$sum": 1},
+            "percentiles": {"$percentile": {"input": "$seconds", "p": [0.5, 0.95], "method": "approximate"}}
+        }},
+        {"$sort": {"_id.stage": 1, "_id.hour": 1, "_id.menu_item_id": 1}}
+    ]
+    return pipeline
+
+
+def stage_duration(document: dict, menu_by_id: dict) -> dict:
+    key = document["_id"]
+    p50, p95 = document["percentiles"]
+    menu_item_id = key.get("menu_item_id")
+    menu_item = menu_by_id.get(str(menu_item_id)) if menu_item_id is not None else None
+    return {
+        "stage": key["stage"],
+        "hour": key.get("hour"),
+        "menu_item_id": str(menu_item_id) if menu_item_id is not None else None,
+        "menu_item_name": menu_item["name"] if menu_item else None,
+        "count": document["count"],
+        "p50_seconds": round(p50, 1),
+        "p95_seconds": round(p95, 1)
+    }
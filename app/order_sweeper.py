@@ -0,0 +1,98 @@
+"""
+Cancellation of unpaid orders.
+
+An order still `pending` PENDING_ORDER_TTL_SECONDS after its creation is
+cancelled by the OrderSweeper thread of each worker, every
+ORDER_SWEEP_INTERVAL seconds. A sweep claims up to ORDER_SWEEP_BATCH_SIZE
+expired orders with one conditional update_many (still pending, so an order
+paid meanwhile or claimed by another worker's sweep is left alone; paying is
+conditional on `pending` too, so a swept order cannot be paid), reads
+back the orders it actually claimed, returns their stock and logs their
+cancellation to the order events. Abandoned carts need no sweep: they expire
+through the TTL index on `updated_at` (CART_TTL_SECONDS).
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, UTC
+from typing import Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from schemas.order import OrderStatus
+from tenancy import truck_collections
+from user_orders import status_changed
+import inventory
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_batch(collections: dict, now: datetime) -> Tuple[int, int]:
+    """Cancel one batch of expired pending orders, all trucks. Returns (expired found, cancelled)."""
+    orders = collections["orders"]
+    cutoff = now - timedelta(seconds=config.PENDING_ORDER_TTL_SECONDS)
+    candidates = [
+        order["_id"] for order in orders.find(
+            {"status": OrderStatus.PENDING, "created_at": {"$lt": cutoff}},
+            {"_id": 1}
+        ).limit(config.ORDER_SWEEP_BATCH_SIZE)
+    ]
+    if not candidates:
+        return 0, 0
+    sweep_id = ObjectId()
+    orders.update_many(
+        {"_id": {"$in": candidates}, "status": OrderStatus.PENDING},
+        {"$set": {"status": OrderStatus.CANCELLED, "updated_at": now, "expired_by": sweep_id}}
+    )
+    cancelled = list(orders.find(
+        {"_id": {"$in": candidates}, "expired_by": sweep_id},
+        {"truck_id": 1, "user_id": 1, "items": 1, "reservations": 1}
+    ))
+    for order in cancelled:
+        scoped = truck_collections(collections, order["truck_id"])
+        inventory.release(order.get("reservations", []), scoped)
+        status_changed(scoped, order, OrderStatus.CANCELLED, OrderStatus.PENDING)
+    return len(candidates), len(cancelled)
+
+
+def sweep_once(collections: dict, now: Optional[datetime] = None) -> int:
+    """Cancel every expired pending order, batch after batch."""
+    now = now or datetime.now(UTC)
+    total = 0
+    while True:
+        found, cancelled = sweep_batch(collections, now)
+        total += cancelled
+        # A short batch was the last one
+        if found < config.ORDER_SWEEP_BATCH_SIZE:
+            return total
+
+
+class OrderSweeper:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._collections: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, collections: dict) -> None:
+        self._collections = collections
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                cancelled = sweep_once(self._collections)
+                if cancelled:
+                    logger.info("Cancelled %d unpaid orders", cancelled)
+            except PyMongoError:
+                logger.exception("Order sweep failed")
+
+
+order_sweeper = OrderSweeper(config.ORDER_SWEEP_INTERVAL)
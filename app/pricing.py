@@ -0,0 +1,115 @@
+"""
+Price calculation shared by the cart, the orders and the quote engine.
+
+Item total = (base price + sum of the selected option prices) x quantity.
+Cart, order and quote totals are the sum of the item totals minus the
+discounts of the active pricing rules (see pricing_rules.py).
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+from zoneinfo import ZoneInfo
+from catalog import catalog_cache
+import config
+
+
+def option_prices(options: Iterable[dict]) -> dict:
+    """Option price by reference: by name, and by ObjectId when the document has one."""
+    prices = {}
+    for option in options:
+        prices[option["name"]] = option["price"]
+        if "_id" in option:
+            prices[option["_id"]] = option["price"]
+    return prices
+
+
+def calculate_item_total(base_price: float, quantity: int, selected_options: List, available_options: List[dict]) -> float:
+    """Calculates total price for an item including options (unknown options cost nothing)"""
+    prices = option_prices(available_options)
+    options_total = sum(prices.get(ref, 0) for ref in selected_options)
+    return (base_price + options_total) * quantity
+
+
+def pricing_now() -> datetime:
+    """Current time in the truck's timezone, for time-windowed rules."""
+    return datetime.now(ZoneInfo(config.PRICING_TIMEZONE))
+
+
+def discount_totals(lines: List[dict], menu_by_id: dict, engine, now: Optional[datetime] = None) -> dict:
+    """
+    Totals of priced lines (`menu_item_id`, `quantity`, `total_price`) after
+    the pricing rules. `menu_by_id` (string id -> menu item) provides the base
+    prices for combos.
+    """
+    subtotal = sum(line["total_price"] for line in lines)
+    discounts = []
+    if engine.rules:
+        evaluated = []
+        for line in lines:
+            if line["quantity"] <= 0:
+                continue
+            menu_item_id = str(line["menu_item_id"])
+            unit_price = line["total_price"] / line["quantity"]
+            menu_item = menu_by_id.get(menu_item_id)
+            evaluated.append({
+                "menu_item_id": menu_item_id,
+                "quantity": line["quantity"],
+                "unit_price": unit_price,
+                "base_price": menu_item["price"] if menu_item else unit_price
+            })
+        discounts = engine.evaluate(evaluated, now or pricing_now())
+    discount_amount = round(sum(discount["amount"] for discount in discounts), 2)
+    return {
+        "discounts": discounts,
+        "discount_amount": discount_amount,
+        "total_amount": subtotal - discount_amount
+    }
+
+
+async def apply_pricing_rules(lines: List[dict], collections: dict, menu_by_id: Optional[dict] = None) -> dict:
+    """discount_totals with the cached rules (and cached menu unless given)."""
+    rules = await catalog_cache.get("pricing_rules", collections)
+    if menu_by_id is None and rules["engine"].rules:
+        menu_by_id = (await catalog_cache.get("menu", collections))["by_id"]
+    return discount_totals(lines, menu_by_id or {}, rules["engine"])
+
+
+def quote_line(item, menu_by_id: dict, options_by_name: dict) -> dict:
+    """
+    Price and validate one cart line against the cached catalog, without
+    touching the database. Errors are reported on the line instead of raised.
+    """
+    line = {
+        "menu_item_id": item.menu_item_id,
+        "quantity": item.quantity,
+        "selected_options": item.selected_options,
+        "unit_price": 0.0,
+        "total_price": 0.0,
+        "error": None
+    }
+    menu_item = menu_by_id.get(item.menu_item_id)
+    if menu_item is None:
+        line["error"] = "Menu item not found"
+        return line
+    if not menu_item.get("available", True):
+        line["error"] = f"Menu item '{menu_item['name']}' is currently not available"
+        return line
+
+    offered = set(menu_item.get("options", []))
+    for option_name in item.selected_options:
+        if option_name not in offered or option_name not in options_by_name:
+            line["error"] = f"Option '{option_name}' is not available for this menu item"
+            return line
+
+    selected = [options_by_name[name] for name in item.selected_options]
+    line["unit_price"] = calculate_item_total(menu_item["price"], 1, item.selected_options, selected)
+    line["total_price"] = calculate_item_total(menu_item["price"], item.quantity, item.selected_options, selected)
+    return line
+
+
+def quote_items(items: list, menu_by_id: dict, options_by_name: dict, engine, now: Optional[datetime] = None) -> dict:
+    lines = [quote_line(item, menu_by_id, options_by_name) for item in items]
+    return {
+        "items": lines,
+        **discount_totals([line for line in lines if line["error"] is None], menu_by_id, engine, now),
+        "valid": all(line["error"] is None for line in lines)
+    }
@@ -0,0 +1,150 @@
+"""
+Pricing rules engine: combos, percentage and fixed discounts and buy X get Y,
+each optionally limited to a daily time window (happy hours) and to some days
+of the week.
+
+Rules live in the `pricing_rules` collection and are compiled into a
+PricingEngine whenever the catalog cache (re)loads them, so nothing is read
+from MongoDB at checkout. The engine indexes rules by menu item, and resolves
+the rules active at a given minute of the week once, then memoizes them:
+evaluating a cart is a few dict lookups per line.
+
+Discounts never stack on a unit. Combos are applied first, on base prices
+(selected options stay charged); every remaining unit then gets the best
+single percentage, fixed or buy X get Y rule of its line.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """"HH:MM" -> minutes since midnight."""
+    if value is None:
+        return None
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class CompiledRule:
+    def __init__(self, rule: dict):
+        self.id = rule["id"]
+        self.name = rule["name"]
+        self.type = rule["type"]
+        self.menu_item_ids = list(dict.fromkeys(rule.get("menu_item_ids", [])))
+        self.value = rule.get("value", 0)
+        self.buy_quantity = rule.get("buy_quantity", 1)
+        self.get_quantity = rule.get("get_quantity", 1)
+        self.start = parse_time(rule.get("start_time"))
+        self.end = parse_time(rule.get("end_time"))
+        self.days = frozenset(rule.get("days", []))
+
+    def applies_at(self, weekday: int, minute: int) -> bool:
+        if self.start is None:
+            return not self.days or weekday in self.days
+        if self.start <= self.end:
+            return (not self.days or weekday in self.days) and self.start <= minute < self.end
+        # Overnight window (e.g. 22:00-02:00): the early hours belong to the previous day
+        if minute >= self.start:
+            return not self.days or weekday in self.days
+        return minute < self.end and (not self.days or (weekday - 1) % 7 in self.days)
+
+    def line_discount(self, units: int, unit_price: float) -> float:
+        if self.type == "percentage":
+            return units * unit_price * self.value / 100
+        if self.type == "fixed":
+            return units * min(self.value, unit_price)
+        if self.type == "buy_x_get_y":
+            free_units = units // (self.buy_quantity + self.get_quantity) * self.get_quantity
+            return free_units * unit_price
+        return 0.0
+
+
+class ActiveRules:
+    """Rules active at one minute of the week, indexed by menu item."""
+
+    def __init__(self, rules: List[CompiledRule]):
+        self.by_item: dict = {}
+        self.whole_menu: List[CompiledRule] = []
+        self.combos: List[CompiledRule] = []
+        for rule in rules:
+            if rule.type == "combo":
+                self.combos.append(rule)
+            elif rule.menu_item_ids:
+                for menu_item_id in rule.menu_item_ids:
+                    self.by_item.setdefault(menu_item_id, []).append(rule)
+            else:
+                self.whole_menu.append(rule)
+
+    def line_rules(self, menu_item_id: str) -> List[CompiledRule]:
+        return self.by_item.get(menu_item_id, []) + self.whole_menu
+
+
+class PricingEngine:
+    def __init__(self, rules: List[dict]):
+        self.rules = [CompiledRule(rule) for rule in rules if rule.get("active", True)]
+        self._active: dict = {}
+
+    def active_at(self, now: datetime) -> ActiveRules:
+        key = (now.weekday(), now.hour * 60 + now.minute)
+        active = self._active.get(key)
+        if active is None:
+            active = ActiveRules([rule for rule in self.rules if rule.applies_at(*key)])
+            self._active[key] = active
+        return active
+
+    def evaluate(self, lines: List[dict], now: datetime) -> List[dict]:
+        """
+        Discounts for priced lines (`menu_item_id`, `quantity`, `unit_price`,
+        `base_price`), aggregated per rule: [{rule_id, name, amount}].
+        """
+        if not self.rules or not lines:
+            return []
+        active = self.active_at(now)
+        amounts: dict = {}
+        remaining = [line["quantity"] for line in lines]
+
+        # Combos, most valuable first, consume units across lines
+        if active.combos:
+            units_by_item: dict = {}
+            for index, line in enumerate(lines):
+                units_by_item.setdefault(line["menu_item_id"], []).append(index)
+            base_prices = {line["menu_item_id"]: line["base_price"] for line in lines}
+            combos = []
+            for rule in active.combos:
+                if all(menu_item_id in base_prices for menu_item_id in rule.menu_item_ids):
+                    saving = sum(base_prices[menu_item_id] for menu_item_id in rule.menu_item_ids) - rule.value
+                    if saving > 0:
+                        combos.append((saving, rule))
+            for saving, rule in sorted(combos, key=lambda combo: combo[0], reverse=True):
+                count = min(
+                    sum(remaining[index] for index in units_by_item[menu_item_id])
+                    for menu_item_id in rule.menu_item_ids
+                )
+                if count <= 0:
+                    continue
+                for menu_item_id in rule.menu_item_ids:
+                    needed = count
+                    for index in units_by_item[menu_item_id]:
+                        taken = min(needed, remaining[index])
+                        remaining[index] -= taken
+                        needed -= taken
+                amounts[rule] = amounts.get(rule, 0.0) + count * saving
+
+        # Best single line rule for the units left
+        for line, units in zip(lines, remaining):
+            if units <= 0:
+                continue
+            best_rule, best_amount = None, 0.0
+            for rule in active.line_rules(line["menu_item_id"]):
+                amount = rule.line_discount(units, line["unit_price"])
+                if amount > best_amount:
+                    best_rule, best_amount = rule, amount
+            if best_rule is not None:
+                amounts[best_rule] = amounts.get(best_rule, 0.0) + best_amount
+
+        return [
+            {"rule_id": rule.id, "name": rule.name, "amount": round(amount, 2)}
+            for rule, amount in amounts.items()
+        ]
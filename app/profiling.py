@@ -0,0 +1,139 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import config
+
+PROFILE_HEADER = "x-profile"
+PROFILE_OUTPUT_HEADER = "x-profile-output"
+
+
+def profiling_enabled() -> bool:
+    """The middleware is only installed when a token or a sampling rate is configured."""
+    return bool(config.PROFILING_TOKEN) or config.PROFILING_SAMPLE_RATE > 0
+
+
+def rotate_profiles(directory: str, keep: int) -> None:
+    """Delete the oldest profiles so that at most `keep` files remain."""
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".prof")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(len(profiles) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def render_stats(profiler: cProfile.Profile, limit: int = 50) -> str:
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Captures a cProfile of a single request when it carries the authorized
+    `X-Profile` header or is picked by the sampling rate.
+
+    cProfile only sees the event loop thread: the profile covers routing,
+    validation, the handler and the database calls it makes inline, but not
+    the work run in threads (coalesced reads and catalog loads through
+    `run_in_threadpool`, bulk import writes, password hashing), which shows up
+    as time spent awaiting.
+    Profiles are written to PROFILING_DIR (keeping the newest PROFILING_MAX_FILES)
+    or, with `X-Profile-Output: inline` and the token, returned as a text
+    report instead of the normal response body.
+
+    cProfile follows the event loop thread, not the request: the profile also
+    includes the requests interleaved with the profiled one at its awaits.
+    Only one request per process is profiled at a time (a second profiler
+    cannot be enabled on Python 3.12+); requests overlapping it are served
+    without a profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = (config.PROFILING_TOKEN or "").encode()
+        self.sample_rate = config.PROFILING_SAMPLE_RATE
+        self.directory = config.PROFILING_DIR
+        self.keep = config.PROFILING_MAX_FILES
+        self._in_flight = threading.Lock()
+
+    def is_authorized(self, headers: dict) -> bool:
+        provided = headers.get(PROFILE_HEADER.encode())
+        return provided is not None and bool(self.token) and hmac.compare_digest(provided, self.token)
+
+    def should_profile(self, headers: dict) -> bool:
+        if headers.get(PROFILE_HEADER.encode()) is not None and self.token:
+            return self.is_authorized(headers)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not self.should_profile(headers) or not self._in_flight.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.profile(scope, receive, send, headers)
+        finally:
+            self._in_flight.release()
+
+    async def profile(self, scope, receive, send, headers: dict):
+        # Sampled requests always go to disk, only the token holder may replace the body
+        inline = headers.get(PROFILE_OUTPUT_HEADER.encode()) == b"inline" and self.is_authorized(headers)
+        profiler = cProfile.Profile()
+
+        if inline:
+            # Swallow the handler's response, the report replaces it
+            async def capture(message):
+                pass
+            profiler.enable()
+            try:
+                await self.app(scope, receive, capture)
+            finally:
+                profiler.disable()
+            body = render_stats(profiler).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        filename = "{:.0f}-{}-{}.prof".format(
+            time.time() * 1000,
+            scope["method"],
+            scope["path"].strip("/").replace("/", "_") or "root"
+        )
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"x-profile-id", filename.encode())]
+                }
+            await send(message)
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.directory, filename))
+            rotate_profiles(self.directory, self.keep)
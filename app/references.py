@@ -0,0 +1,76 @@
+"""
+Cart and order lines reference their menu item and options by ObjectId
+(`menu_item_id`, `selected_options`). The public API keeps exposing the menu
+item id as a string and the options by name, so lines are converted on the way
+out.
+
+Lines written before the migration (see migrate_references.py) still hold the
+menu item id as a string and the options by name. Both forms are accepted
+until every document has been converted.
+"""
+from typing import Iterable, List
+from bson import ObjectId
+from catalog import catalog_cache
+
+
+def split_refs(refs: Iterable) -> tuple:
+    """(ObjectIds, legacy option names) of a list of option references."""
+    ids, names = [], []
+    for ref in refs:
+        (ids if isinstance(ref, ObjectId) else names).append(ref)
+    return ids, names
+
+
+def find_options(refs: List, options_collection) -> list:
+    """Option documents referenced by a line, by ObjectId and/or legacy name."""
+    ids, names = split_refs(refs)
+    options = []
+    if ids:
+        options.extend(options_collection.find({"_id": {"$in": ids}}))
+    if names:
+        options.extend(options_collection.find({"name": {"$in": names}}))
+    return options
+
+
+def options_by_ref(options: Iterable[dict]) -> dict:
+    """Index option documents by both of their possible references."""
+    return {key: option for option in options for key in (option["_id"], option["name"])}
+
+
+async def resolve_option_names(lines: List[dict], collections: dict, known: Iterable[dict] = ()) -> dict:
+    """
+    ObjectId -> name of the options referenced by `lines`. `known` option
+    documents (already fetched by the caller) are used first, then the cached
+    catalog, then MongoDB for options created since the cache was loaded.
+    """
+    ids = {ref for line in lines for ref in line.get("selected_options", []) if isinstance(ref, ObjectId)}
+    names = {option["_id"]: option["name"] for option in known if option["_id"] in ids}
+    missing = ids - names.keys()
+    if missing:
+        entry = await catalog_cache.get("options", collections)
+        for option_id in list(missing):
+            option = entry["by_id"].get(str(option_id))
+            if option:
+                names[option_id] = option["name"]
+                missing.discard(option_id)
+    if missing:
+        for option in collections["options"].find({"_id": {"$in": list(missing)}}):
+            names[option["_id"]] = option["name"]
+    return names
+
+
+def to_public_line(line: dict, option_names: dict) -> dict:
+    # An option deleted since the line was written keeps its id as a name
+    return {
+        **line,
+        "menu_item_id": str(line["menu_item_id"]),
+        "selected_options": [
+            option_names.get(ref, str(ref)) if isinstance(ref, ObjectId) else ref
+            for ref in line.get("selected_options", [])
+        ]
+    }
+
+
+async def public_lines(lines: List[dict], collections: dict, known: Iterable[dict] = ()) -> list:
+    option_names = await resolve_option_names(lines, collections, known)
+    return [to_public_line(line, option_names) for line in lines]
@@ -0,0 +1,139 @@
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import Optional
+from collections import Counter, OrderedDict
+from datetime import datetime, UTC
+import gc
+import hmac
+import os
+import tracemalloc
+from pydantic import BaseModel
+import config
+
+router = APIRouter()
+
+# Snapshots taken through the API, oldest first (per process)
+MAX_SNAPSHOTS = 5
+snapshots: "OrderedDict[int, dict]" = OrderedDict()
+_next_snapshot_id = 1
+
+# Only our own pydantic models are counted by /objects
+MODEL_MODULE_PREFIXES = ("models.", "schemas.")
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def format_stats(stats: list, limit: int) -> list:
+    """Serialize tracemalloc Statistic / StatisticDiff entries."""
+    result = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        entry = {
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        if hasattr(stat, "size_diff"):
+            entry["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+            entry["count_diff"] = stat.count_diff
+        result.append(entry)
+    return result
+
+def current_rss_kb() -> Optional[int]:
+    """Resident set size of this process, when /proc is available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+def count_model_instances() -> dict:
+    counts = Counter(
+        type(obj).__name__
+        for obj in gc.get_objects()
+        if isinstance(obj, BaseModel) and type(obj).__module__.startswith(MODEL_MODULE_PREFIXES)
+    )
+    return dict(counts.most_common())
+
+def get_snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    if snapshot_id not in snapshots:
+        raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found")
+    return snapshots[snapshot_id]["snapshot"]
+
+@router.post("/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def start_tracemalloc(frames: int = 1):
+    if tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="tracemalloc is already running")
+    tracemalloc.start(frames)
+    return {"message": "tracemalloc started", "frames": frames, "pid": os.getpid()}
+
+@router.post("/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def stop_tracemalloc():
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="tracemalloc is not running")
+    tracemalloc.stop()
+    # Snapshots are meaningless once tracing stops, drop them to free their memory
+    snapshots.clear()
+    return {"message": "tracemalloc stopped", "pid": os.getpid()}
+
+@router.post("/memory/snapshots", dependencies=[Depends(require_admin)])
+async def take_snapshot(limit: int = 20):
+    global _next_snapshot_id
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="tracemalloc is not running")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    snapshot_id = _next_snapshot_id
+    _next_snapshot_id += 1
+    snapshots[snapshot_id] = {"snapshot": snapshot, "taken_at": datetime.now(UTC)}
+    while len(snapshots) > MAX_SNAPSHOTS:
+        snapshots.popitem(last=False)
+
+    traced, peak = tracemalloc.get_traced_memory()
+    return {
+        "id": snapshot_id,
+        "pid": os.getpid(),
+        "taken_at": snapshots[snapshot_id]["taken_at"],
+        "traced_kb": round(traced / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top": format_stats(snapshot.statistics("lineno"), limit)
+    }
+
+@router.get("/memory/snapshots", dependencies=[Depends(require_admin)])
+async def list_snapshots():
+    return [
+        {"id": snapshot_id, "taken_at": entry["taken_at"]}
+        for snapshot_id, entry in snapshots.items()
+    ]
+
+@router.get("/memory/snapshots/{snapshot_id}", dependencies=[Depends(require_admin)])
+async def get_snapshot_top(snapshot_id: int, limit: int = 20, group_by: str = "lineno"):
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    snapshot = get_snapshot(snapshot_id)
+    return {"id": snapshot_id, "top": format_stats(snapshot.statistics(group_by), limit)}
+
+@router.get("/memory/diff", dependencies=[Depends(require_admin)])
+async def diff_snapshots(from_id: int, to_id: int, limit: int = 20):
+    old = get_snapshot(from_id)
+    new = get_snapshot(to_id)
+    return {
+        "from_id": from_id,
+        "to_id": to_id,
+        "top": format_stats(new.compare_to(old, "lineno"), limit)
+    }
+
+@router.get("/memory/objects", dependencies=[Depends(require_admin)])
+async def get_object_counts():
+    return {
+        "pid": os.getpid(),
+        "rss_kb": current_rss_kb(),
+        "tracing": tracemalloc.is_tracing(),
+        "models": count_model_instances()
+    }
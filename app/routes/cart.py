@@ -2,28 +2,38 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from datetime import datetime, UTC
 from bson import ObjectId
-from database import get_collections
+from auth import get_user_collections
 from schemas.cart import Cart, CartItem
 from models.cart import CartItemModel, CartModel
+from references import public_lines
+from pricing import apply_pricing_rules, calculate_item_total
 from pymongo import ReturnDocument
 
 router = APIRouter()
 
-def calculate_item_total(base_price: float, quantity: int, selected_options: List[str], menu_item_options: List[dict]) -> float:
-    option_prices = {opt["name"]: opt["price"] for opt in menu_item_options}
-    options_total = sum(option_prices.get(name, 0) for name in selected_options)
-    return (base_price + options_total) * quantity
+async def cart_response(cart: dict, cart_id, collections: dict, known_options: List[dict] = ()) -> dict:
+    """Cart document with its lines converted to the public format."""
+    items = await public_lines(cart["items"], collections, known_options)
+    return {**cart, "items": items, "id": str(cart_id)}
+
+async def update_totals(cart_model: CartModel, collections: dict) -> None:
+    """Cart total after the discounts of the active pricing rules."""
+    totals = await apply_pricing_rules([item.model_dump() for item in cart_model.items], collections)
+    cart_model.total_amount = totals["total_amount"]
+    cart_model.discounts = totals["discounts"]
+    cart_model.discount_amount = totals["discount_amount"]
 
 @router.post("/items", response_model=Cart)
 async def add_to_cart(
     item: CartItem,
-    collections: dict = Depends(get_collections)
+    collections: dict = Depends(get_user_collections)
 ):
     cart_collection = collections["carts"]
     menu_collection = collections["menu"]
     options_collection = collections["options"]
 
-    # Verify if menu item exists and get its details
+    # Verify if menu item exists and get its details (from MongoDB, not the
+    # cached catalog, so a just flipped `available` flag is always seen)
     menu_item = menu_collection.find_one({"_id": ObjectId(item.menu_item_id)})
     if not menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
@@ -53,11 +63,12 @@ async def add_to_cart(
                 detail=f"Option '{option_name}' is not available for this menu item"
             )
 
-    # Create cart item model with calculated total price
+    # Create cart item model with calculated total price, referencing by ObjectId
+    option_ids = {opt["name"]: opt["_id"] for opt in available_options}
     item_data = CartItemModel(
-        menu_item_id=item.menu_item_id,
+        menu_item_id=menu_item["_id"],
         quantity=item.quantity,
-        selected_options=item.selected_options,
+        selected_options=[option_ids[name] for name in item.selected_options],
         special_instructions=item.special_instructions,
         total_price=calculate_item_total(
             menu_item["price"],
@@ -79,13 +90,14 @@ async def add_to_cart(
             created_at=current_time,
             updated_at=current_time
         )
+        await update_totals(cart_data, collections)
         result = cart_collection.insert_one(cart_data.model_dump())
-        return {**cart_data.model_dump(), "id": str(result.inserted_id)}
+        return await cart_response(cart_data.model_dump(), result.inserted_id, collections, available_options)
     
     # Update existing cart
     cart_model = CartModel(**cart)
     cart_model.items.append(item_data)
-    cart_model.total_amount = sum(item.total_price for item in cart_model.items)
+    await update_totals(cart_model, collections)
     cart_model.updated_at = current_time
     
     result = cart_collection.find_one_and_update(
@@ -93,21 +105,21 @@ async def add_to_cart(
         {"$set": cart_model.model_dump(exclude={"id"})},
         return_document=ReturnDocument.AFTER
     )
-    return {**result, "id": str(result["_id"])}
+    return await cart_response(result, result["_id"], collections, available_options)
 
 @router.get("/", response_model=Cart)
-async def get_cart(collections: dict = Depends(get_collections)):
+async def get_cart(collections: dict = Depends(get_user_collections)):
     cart_collection = collections["carts"]
     cart = cart_collection.find_one(sort=[("created_at", -1)])
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
-    return {**cart, "id": str(cart["_id"])}
+    return await cart_response(cart, cart["_id"], collections)
 
 @router.put("/items/{item_id}", response_model=Cart)
 async def update_cart_item(
     item_id: str, 
     updated_item: CartItem,
-    collections: dict = Depends(get_collections)
+    collections: dict = Depends(get_user_collections)
 ):
     cart_collection = collections["carts"]
     menu_collection = collections["menu"]
@@ -120,7 +132,7 @@ async def update_cart_item(
     # Find the item in the cart
     item_index = None
     for i, item in enumerate(cart["items"]):
-        if item["menu_item_id"] == item_id:
+        if str(item["menu_item_id"]) == item_id:
             item_index = i
             break
     
@@ -157,11 +169,12 @@ async def update_cart_item(
                 detail=f"Option '{option_name}' is not available for this menu item"
             )
 
-    # Create updated cart item model
+    # Create updated cart item model, referencing by ObjectId
+    option_ids = {opt["name"]: opt["_id"] for opt in available_options}
     item_data = CartItemModel(
-        menu_item_id=updated_item.menu_item_id,
+        menu_item_id=menu_item["_id"],
         quantity=updated_item.quantity,
-        selected_options=updated_item.selected_options,
+        selected_options=[option_ids[name] for name in updated_item.selected_options],
         special_instructions=updated_item.special_instructions,
         total_price=calculate_item_total(
             menu_item["price"],
@@ -174,7 +187,7 @@ async def update_cart_item(
     # Update cart
     cart_model = CartModel(**cart)
     cart_model.items[item_index] = item_data
-    cart_model.total_amount = sum(item.total_price for item in cart_model.items)
+    await update_totals(cart_model, collections)
     cart_model.updated_at = datetime.now(UTC)
     
     result = cart_collection.find_one_and_update(
@@ -182,12 +195,12 @@ async def update_cart_item(
         {"$set": cart_model.model_dump(exclude={"id"})},
         return_document=ReturnDocument.AFTER
     )
-    return {**result, "id": str(result["_id"])}
+    return await cart_response(result, result["_id"], collections, available_options)
 
 @router.delete("/items/{item_id}")
 async def remove_from_cart(
     item_id: str,
-    collections: dict = Depends(get_collections)
+    collections: dict = Depends(get_user_collections)
 ):
     cart_collection = collections["carts"]
     cart = cart_collection.find_one(sort=[("created_at", -1)])
@@ -196,8 +209,8 @@ async def remove_from_cart(
     
     # Remove the item from the cart
     cart_model = CartModel(**cart)
-    cart_model.items = [item for item in cart_model.items if item.menu_item_id != item_id]
-    cart_model.total_amount = sum(item.total_price for item in cart_model.items)
+    cart_model.items = [item for item in cart_model.items if str(item.menu_item_id) != item_id]
+    await update_totals(cart_model, collections)
     cart_model.updated_at = datetime.now(UTC)
     
     cart_collection.find_one_and_update(
@@ -207,7 +220,7 @@ async def remove_from_cart(
     return {"message": "Item removed from cart"}
 
 @router.delete("/")
-async def clear_cart(collections: dict = Depends(get_collections)):
+async def clear_cart(collections: dict = Depends(get_user_collections)):
     cart_collection = collections["carts"]
     cart = cart_collection.find_one(sort=[("created_at", -1)])
     if not cart:
@@ -0,0 +1,57 @@
+from fastapi import APIRouter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from datetime import datetime, UTC
+import time
+import pymongo
+from database import get_client
+from catalog import catalog_cache, catalog_events
+from catalog_watcher import catalog_watcher
+from metrics import pool_listener
+import config
+
+router = APIRouter()
+
+# Last ping result, reused for READINESS_CACHE_TTL seconds
+_last_check = {"checked_at": None, "result": None}
+
+def ping_database() -> dict:
+    start = time.perf_counter()
+    try:
+        with pymongo.timeout(config.READINESS_PING_TIMEOUT):
+            get_client().admin.command("ping")
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+def check_database() -> dict:
+    checked_at = _last_check["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < config.READINESS_CACHE_TTL:
+        return {**_last_check["result"], "cached": True}
+
+    result = {**ping_database(), "checked_at": datetime.now(UTC)}
+    _last_check["checked_at"] = time.monotonic()
+    _last_check["result"] = result
+    return {**result, "cached": False}
+
+# Liveness: the process is up and serving, no I/O
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# Readiness: MongoDB answers a ping (result cached), plus pool and catalog cache state
+@router.get("/readyz")
+async def readyz():
+    database = check_database()
+    body = {
+        "status": "ready" if database["ok"] else "unavailable",
+        "database": database,
+        "pool": pool_listener.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "catalog_watcher": {
+            "mode": catalog_watcher.mode,
+            "trucks": len(catalog_events.versions),
+            "subscribers": catalog_events.subscriber_count()
+        }
+    }
+    return JSONResponse(status_code=200 if database["ok"] else 503, content=jsonable_encoder(body))
@@ -0,0 +1,220 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import AsyncIterator
+import json
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+from database import get_collections
+from catalog import catalog_changed, next_change_seq
+from schemas.menu import MenuItemCreate
+from schemas.option import OptionCreate
+from schemas.imports import ImportResult, ImportRowError
+import config
+
+router = APIRouter()
+
+# Row type -> (collection, schema)
+ROW_TYPES = {
+    "option": ("options", OptionCreate),
+    "menu_item": ("menu", MenuItemCreate)
+}
+
+DUPLICATE_KEY_ERROR = 11000
+
+def line_too_long() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Import lines must not exceed {config.IMPORT_MAX_LINE_BYTES} bytes"
+    )
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """
+    Yield the lines of a streamed NDJSON body without buffering all of it.
+    Only each new chunk is split; the pieces of a line spanning chunks are
+    joined once it is complete.
+    """
+    pieces, size = [], 0
+    async for chunk in request.stream():
+        *ends, rest = chunk.split(b"\n")
+        for end in ends:
+            if size + len(end) > config.IMPORT_MAX_LINE_BYTES:
+                raise line_too_long()
+            pieces.append(end)
+            yield b"".join(pieces)
+            pieces, size = [], 0
+        pieces.append(rest)
+        size += len(rest)
+        if size > config.IMPORT_MAX_LINE_BYTES:
+            raise line_too_long()
+    if size:
+        yield b"".join(pieces)
+
+class CatalogImporter:
+    """
+    Validates import rows one at a time and writes them with unordered
+    `bulk_write` upserts (keyed by name) in batches of IMPORT_BATCH_SIZE.
+    Each batch first reads the documents it names: rows identical to them are
+    not written, and the others only `$set` their changed fields, so only
+    real changes get a new `seq` and show up in delta syncs.
+
+    Option references of menu items are checked against a single in-memory
+    set: the option names already in the database plus the options imported
+    earlier in the same request. Pending options are always written before a
+    batch of menu items, whose rows referencing an option that failed to
+    write are rejected. Rejected rows are reported, never fatal.
+    """
+
+    def __init__(self, collections: dict):
+        self.collections = collections
+        self.seq = next_change_seq(collections)
+        self.stored_options = set(collections["options"].distinct("name"))
+        self.option_names = set(self.stored_options)
+        self.seen = {name: set() for name in ("options", "menu")}
+        self.pending = {name: [] for name in ("options", "menu")}
+        self.result = ImportResult()
+
+    def reject(self, row: int, error: str, row_type=None, name=None) -> None:
+        self.result.errors.append(ImportRowError(row=row, type=row_type, name=name, error=error))
+
+    async def add_line(self, row: int, line: bytes) -> None:
+        if not line.strip():
+            return
+        try:
+            data = json.loads(line)
+        except ValueError:
+            self.result.rows += 1
+            self.reject(row, "Invalid JSON")
+            return
+        await self.add(row, data)
+
+    async def add(self, row: int, data) -> None:
+        self.result.rows += 1
+        if not isinstance(data, dict) or data.get("type") not in ROW_TYPES:
+            self.reject(row, "Row must be an object with type 'option' or 'menu_item'")
+            return
+
+        row_type = data["type"]
+        collection_name, schema = ROW_TYPES[row_type]
+        fields = {key: value for key, value in data.items() if key != "type"}
+        try:
+            document = schema(**fields).model_dump()
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            self.reject(row, f"{location}: {error['msg']}", row_type, fields.get("name"))
+            return
+
+        name = document["name"]
+        if name in self.seen[collection_name]:
+            self.reject(row, f"Duplicate name '{name}' in import", row_type, name)
+            return
+
+        if collection_name == "menu":
+            missing = [option for option in document["options"] if option not in self.option_names]
+            if missing:
+                self.reject(row, f"Option(s) not found: {', '.join(missing)}", row_type, name)
+                return
+        else:
+            self.option_names.add(name)
+
+        self.seen[collection_name].add(name)
+        self.pending[collection_name].append((row, name, document))
+        if len(self.pending[collection_name]) >= config.IMPORT_BATCH_SIZE:
+            if collection_name == "menu":
+                # Menu items must not reach the database before their options
+                await self.flush("options")
+            await self.flush(collection_name)
+
+    async def flush(self, collection_name: str) -> None:
+        pending = self.pending[collection_name]
+        self.pending[collection_name] = []
+        if collection_name == "menu":
+            pending = [entry for entry in pending if self.options_written(*entry)]
+        if not pending:
+            return
+        collection = self.collections[collection_name]
+        counts = getattr(self.result, collection_name)
+        existing = await run_in_threadpool(
+            lambda: {doc["name"]: doc for doc in collection.find({"name": {"$in": [name for _, name, _ in pending]}})}
+        )
+        writes = []
+        for row, name, document in pending:
+            current = existing.get(name, {})
+            changed = {field: value for field, value in document.items() if current.get(field) != value}
+            if not changed:
+                counts.unchanged += 1
+                continue
+            writes.append((row, name, UpdateOne({"name": name}, {"$set": {**changed, "seq": self.seq}}, upsert=True)))
+        if not writes:
+            return
+        try:
+            result = await run_in_threadpool(
+                collection.bulk_write, [operation for _, _, operation in writes], ordered=False
+            )
+            details = {
+                "nUpserted": result.upserted_count,
+                "nModified": result.modified_count,
+                "nMatched": result.matched_count
+            }
+        except BulkWriteError as e:
+            details = e.details
+            row_type = "option" if collection_name == "options" else "menu_item"
+            for write_error in details.get("writeErrors", []):
+                row, name, _ = writes[write_error["index"]]
+                if collection_name == "options" and name not in self.stored_options:
+                    self.option_names.discard(name)
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    message = f"Name '{name}' conflicts with a concurrent write"
+                else:
+                    message = write_error.get("errmsg", "Write failed")
+                self.reject(row, message, row_type, name)
+        counts.upserted += details.get("nUpserted", 0)
+        counts.modified += details.get("nModified", 0)
+        counts.unchanged += details.get("nMatched", 0) - details.get("nModified", 0)
+
+    def options_written(self, row: int, name: str, document: dict) -> bool:
+        missing = [option for option in document["options"] if option not in self.option_names]
+        if missing:
+            self.reject(row, f"Option(s) not written: {', '.join(missing)}", "menu_item", name)
+        return not missing
+
+    async def finish(self) -> ImportResult:
+        await self.flush("options")
+        await self.flush("menu")
+        for collection_name in ("options", "menu"):
+            counts = getattr(self.result, collection_name)
+            if counts.upserted or counts.modified:
+                catalog_changed(collection_name, self.collections)
+        self.result.errors.sort(key=lambda error: error.row)
+        return self.result
+
+# Bulk import options and menu items from NDJSON (streamed) or a JSON array.
+# Each row is {"type": "option" | "menu_item", ...fields}; rows are upserted by
+# name and options must come before the menu items that reference them.
+@router.post("/import", response_model=ImportResult)
+async def import_catalog(request: Request, collections: dict = Depends(get_collections)):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in ("application/x-ndjson", "application/json"):
+        raise HTTPException(
+            status_code=415,
+            detail="Send application/x-ndjson (one row per line) or a application/json array"
+        )
+
+    importer = CatalogImporter(collections)
+    if content_type == "application/x-ndjson":
+        row = 0
+        async for line in iter_ndjson_lines(request):
+            row += 1
+            await importer.add_line(row, line)
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of rows")
+        for row, data in enumerate(rows, start=1):
+            await importer.add(row, data)
+
+    return await importer.finish()
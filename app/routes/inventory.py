@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List
+from bson import ObjectId
+from database import get_collections
+from schemas.inventory import InventoryKind, StockUpdate, StockLevel
+import inventory
+
+router = APIRouter()
+
+def parse_item_id(kind: InventoryKind, item_id: str, collections: dict) -> ObjectId:
+    try:
+        object_id = ObjectId(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid item ID")
+    if not collections[kind.value].find_one({"_id": object_id}):
+        raise HTTPException(status_code=404, detail="Item not found")
+    return object_id
+
+# Get the stock of all tracked menu items and options
+@router.get("/", response_model=List[StockLevel])
+async def get_stock_levels(collections: dict = Depends(get_collections)):
+    return inventory.stock_levels(collections)
+
+# Get the stock of a menu item or option
+@router.get("/{kind}/{item_id}", response_model=StockLevel)
+async def get_stock_level(
+    kind: InventoryKind,
+    item_id: str,
+    collections: dict = Depends(get_collections)
+):
+    levels = inventory.stock_levels(collections, {"item_id": parse_item_id(kind, item_id, collections)})
+    if not levels:
+        raise HTTPException(status_code=404, detail="Item stock is not tracked")
+    return levels[0]
+
+# Set the stock of a menu item or option (starts tracking it)
+@router.put("/{kind}/{item_id}", response_model=StockLevel)
+async def set_stock_level(
+    kind: InventoryKind,
+    item_id: str,
+    update: StockUpdate,
+    collections: dict = Depends(get_collections)
+):
+    object_id = parse_item_id(kind, item_id, collections)
+    inventory.set_stock(kind.value, object_id, update.stock, collections)
+    return StockLevel(kind=kind, item_id=str(object_id), stock=update.stock)
+
+# Stop tracking the stock of a menu item or option (unlimited again)
+@router.delete("/{kind}/{item_id}")
+async def delete_stock_level(
+    kind: InventoryKind,
+    item_id: str,
+    collections: dict = Depends(get_collections)
+):
+    object_id = parse_item_id(kind, item_id, collections)
+    if inventory.stop_tracking(kind.value, object_id, collections) == 0:
+        raise HTTPException(status_code=404, detail="Item stock is not tracked")
+    return {"message": "Item stock is no longer tracked"}
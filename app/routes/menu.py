@@ -1,14 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from typing import List, Optional
 from bson import ObjectId
 from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from database import get_collections
-from schemas.menu import MenuItemCreate, MenuItemUpdate, MenuItemResponse
+from catalog import (
+    catalog_cache, catalog_changed, catalog_events, catalog_response, next_change_seq, record_deletion,
+    get_changes, read_catalog_version
+)
+from schemas.menu import (
+    MenuItemCreate, MenuItemUpdate, MenuItemResponse, CatalogChanges, AvailabilityUpdate, AvailabilityResult
+)
 from schemas.option import OptionResponse
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from batch import catalog_batch_get, find_by_ids, parse_ids, valid_ids
+from tenancy import collections_truck
+import config
 
 router = APIRouter()
 
+DEFAULT_SEARCH_LIMIT = 50
+menu_list_adapter = TypeAdapter(List[MenuItemResponse])
+
 # Check if option names exist in the database
 async def validate_option_names(option_names: List[str], collections: dict) -> None:
     options_collection = collections["options"]
@@ -20,11 +37,61 @@ async def validate_option_names(option_names: List[str], collections: dict) -> N
     if missing_options:
         raise HTTPException(status_code=400, detail=f"Option(s) not found: {', '.join(missing_options)}")
 
-# Get all menu items
+# Build the Mongo filter for menu search (served by the text and compound indexes)
+def build_menu_query(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    available: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    options: Optional[List[str]] = None
+) -> dict:
+    query = {}
+    if q:
+        query["$text"] = {"$search": q}
+    if category is not None:
+        query["category"] = category
+    if available is not None:
+        query["available"] = available
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = min_price
+        if max_price is not None:
+            query["price"]["$lte"] = max_price
+    if options:
+        query["options"] = {"$all": options}
+    return query
+
+# Get all menu items, or search them when any filter is given
 @router.get("/", response_model=List[MenuItemResponse])
-async def get_menu_items(collections: dict = Depends(get_collections)):
-    menu_collection = collections["menu"]
-    menu_items = list(menu_collection.find())
+async def get_menu_items(
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Full-text search over name and description"),
+    category: Optional[str] = None,
+    available: Optional[bool] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    option: Optional[List[str]] = Query(None, description="Only items offering all of these options"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Default: 50 for searches, all items otherwise"),
+    collections: dict = Depends(get_collections)
+):
+    query = build_menu_query(q, category, available, min_price, max_price, option)
+    if not query:
+        # Unfiltered listing: the cached catalog, with ETag support
+        entry = await catalog_cache.get("menu", collections)
+        if skip == 0 and limit is None:
+            return catalog_response(request, entry)
+        page = entry["items"][skip:None if limit is None else skip + limit]
+        return catalog_response(request, entry, lambda: menu_list_adapter.dump_json(menu_list_adapter.validate_python(page)))
+
+    if q:
+        cursor = collections["menu"].find(query, {"score": {"$meta": "textScore"}})
+        cursor = cursor.sort([("score", {"$meta": "textScore"}), ("name", 1)])
+    else:
+        cursor = collections["menu"].find(query).sort([("name", 1)])
+    menu_items = cursor.skip(skip).limit(limit or DEFAULT_SEARCH_LIMIT)
     return [{**item, "id": str(item["_id"])} for item in menu_items]
 
 # Create a new menu item (Ensures unique name and valid option names)
@@ -38,7 +105,9 @@ async def create_menu_item(
     await validate_option_names(menu_item.options, collections)
 
     try:
-        result = menu_collection.insert_one(menu_item.model_dump())
+        seq = next_change_seq(collections)
+        result = menu_collection.insert_one({**menu_item.model_dump(), "seq": seq})
+        catalog_changed("menu", collections)
         return MenuItemResponse(**menu_item.model_dump(), id=str(result.inserted_id))
     except DuplicateKeyError:
         raise HTTPException(status_code=400, detail=f"A menu item with the name '{menu_item.name}' already exists")
@@ -60,30 +129,117 @@ async def update_menu(
         await validate_option_names(update_data["options"], collections)
 
     try:
+        seq = next_change_seq(collections)
         result = menu_collection.find_one_and_update(
             {"_id": ObjectId(menu_item_id)},
-            {"$set": update_data},
+            {"$set": {**update_data, "seq": seq}},
             return_document=ReturnDocument.AFTER
         )
 
         if not result:
             raise HTTPException(status_code=404, detail="Menu not found")
 
+        catalog_changed("menu", collections)
         return MenuItemResponse(**result, id=str(result["_id"]))
     except DuplicateKeyError:
         raise HTTPException(status_code=400, detail=f"A menu item with the name '{updated_menu_item.name}' already exists")
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid menu item ID")
 
+# Get menu items and options changed since a change sequence number (delta sync)
+@router.get("/changes", response_model=CatalogChanges)
+async def get_catalog_changes(
+    since: int = Query(0, ge=0, description="`next_since` of the previous sync, 0 for a full sync"),
+    collections: dict = Depends(get_collections)
+):
+    return get_changes(since, collections)
+
+# Set the availability of several menu items in one write (e.g. sold out)
+@router.post("/availability", response_model=AvailabilityResult)
+async def set_menu_availability(
+    update: AvailabilityUpdate,
+    collections: dict = Depends(get_collections)
+):
+    object_ids = parse_ids(update.ids)
+    invalid = [id_ for id_, object_id in object_ids.items() if object_id is None]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid menu item ID(s): {', '.join(invalid)}")
+
+    ids = valid_ids(object_ids)
+    seq = next_change_seq(collections)
+    # Only items whose flag changes are written (and show up in delta syncs);
+    # a manual change overrides the sold out flag set by the inventory
+    result = collections["menu"].update_many(
+        {"_id": {"$in": ids}, "available": {"$ne": update.available}},
+        {"$set": {"available": update.available, "seq": seq}, "$unset": {"sold_out": ""}}
+    )
+    not_found = []
+    if result.modified_count < len(ids):
+        found = find_by_ids(collections["menu"], ids)
+        not_found = [id_ for id_, object_id in object_ids.items() if str(object_id) not in found]
+
+    # New version: every worker drops its cached menu, subscribers are notified
+    version = catalog_changed("menu", collections)
+    return AvailabilityResult(
+        available=update.available, modified=result.modified_count, not_found=not_found, version=version
+    )
+
+def catalog_event(version: int) -> str:
+    return f"id: {version}\nevent: catalog\ndata: {json.dumps({'version': version})}\n\n"
+
+async def catalog_event_stream(queue: asyncio.Queue, truck_id: Optional[str], version: int):
+    try:
+        yield catalog_event(version)
+        while True:
+            try:
+                version = await asyncio.wait_for(queue.get(), timeout=config.CATALOG_EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield catalog_event(version)
+    finally:
+        catalog_events.unsubscribe(truck_id, queue)
+
+# Catalog versions as server-sent events, then GET /menu/changes?since= to sync
+@router.get("/events")
+async def get_catalog_events(collections: dict = Depends(get_collections)):
+    truck_id = collections_truck(collections)
+    queue = catalog_events.subscribe(truck_id)
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Too many event subscribers")
+    version = catalog_events.versions.get(truck_id) or read_catalog_version(collections)[0]
+    return StreamingResponse(
+        catalog_event_stream(queue, truck_id, version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Get several menu items at once, in request order (from the cached catalog)
+@router.post(":batchGet", response_model=BatchGetResponse[MenuItemResponse])
+async def batch_get_menu_items(
+    batch: BatchGetRequest,
+    collections: dict = Depends(get_collections)
+):
+    return {"results": await catalog_batch_get("menu", batch.ids, collections)}
+
 # Get a specific menu item by ID
 @router.get("/{menu_item_id}", response_model=MenuItemResponse)
 async def get_menu_item(
     menu_item_id: str,
+    request: Request,
     collections: dict = Depends(get_collections)
 ):
-    menu_collection = collections["menu"]
+    # Served from the cached catalog, which also provides the ETag
+    entry = await catalog_cache.get("menu", collections)
     try:
-        menu_item = menu_collection.find_one({"_id": ObjectId(menu_item_id)})
+        object_id = ObjectId(menu_item_id)
+        menu_item = entry["by_id"].get(str(object_id))
+        if menu_item:
+            return catalog_response(
+                request, entry, lambda: MenuItemResponse(**menu_item).model_dump_json().encode()
+            )
+        # Created (through another worker) since the catalog was cached
+        menu_item = collections["menu"].find_one({"_id": object_id})
         if not menu_item:
             raise HTTPException(status_code=404, detail="Menu item not found")
         return MenuItemResponse(**menu_item, id=str(menu_item["_id"]))
@@ -98,11 +254,15 @@ async def delete_menu_item(
 ):
     menu_collection = collections["menu"]
     try:
-        result = menu_collection.delete_one({"_id": ObjectId(menu_item_id)})
+        object_id = ObjectId(menu_item_id)
+        seq = next_change_seq(collections)
+        result = menu_collection.delete_one({"_id": object_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Menu item not found")
         
+        record_deletion("menu", object_id, seq, collections)
+        catalog_changed("menu", collections)
         return {"message": "Menu item deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid menu item ID")
@@ -1,19 +1,48 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import List
 from bson import ObjectId
 from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from database import get_collections
+from catalog import catalog_cache, catalog_changed, catalog_response, next_change_seq, record_deletion
+from singleflight import single_flight
 from schemas.option import OptionCreate, OptionUpdate, OptionResponse
+from schemas.menu import MenuItemResponse
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from batch import catalog_batch_get
+from tenancy import collections_truck
 
 router = APIRouter()
 
+# Menu items reference options by name: rewrite every reference in one
+# update_many (served by the multikey index on menu.options). Cart lines hold
+# option ids, only those not migrated yet (migrate_references.py) hold names.
+def rename_option_references(old_name: str, new_name: str, seq: int, collections: dict) -> dict:
+    menu_result = collections["menu"].update_many(
+        {"options": old_name},
+        {"$set": {"options.$[option]": new_name, "seq": seq}},
+        array_filters=[{"option": old_name}]
+    )
+    carts_result = collections["carts"].update_many(
+        {"items.selected_options": old_name},
+        {"$set": {"items.$[].selected_options.$[option]": new_name}},
+        array_filters=[{"option": old_name}]
+    )
+    return {"menu_items": menu_result.modified_count, "carts": carts_result.modified_count}
+
 # Get all options
 @router.get("/", response_model=List[OptionResponse])
-async def get_options(collections: dict = Depends(get_collections)):
-    options_collection = collections["options"]
-    options = list(options_collection.find())
-    return [{**option, "id": str(option["_id"])} for option in options]
+async def get_options(request: Request, collections: dict = Depends(get_collections)):
+    entry = await catalog_cache.get("options", collections)
+    return catalog_response(request, entry)
+
+# Get several options at once, in request order (from the cached catalog)
+@router.post(":batchGet", response_model=BatchGetResponse[OptionResponse])
+async def batch_get_options(
+    batch: BatchGetRequest,
+    collections: dict = Depends(get_collections)
+):
+    return {"results": await catalog_batch_get("options", batch.ids, collections)}
 
 # Get a specific option by its ID
 @router.get("/{option_id}", response_model=OptionResponse)
@@ -24,13 +53,35 @@ async def get_option(
     options_collection = collections["options"]
     try:
         # Convert string ID to ObjectId for MongoDB query
-        option = options_collection.find_one({"_id": ObjectId(option_id)})
+        object_id = ObjectId(option_id)
+        option = await single_flight.do(
+            "options.get", (collections_truck(collections), object_id), lambda: options_collection.find_one({"_id": object_id})
+        )
         if not option:
             raise HTTPException(status_code=404, detail="Option not found")
         return OptionResponse(**option, id=str(option["_id"]))
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid option ID")
 
+# Get the menu items offering an option (from the cached reverse index)
+@router.get("/{option_id}/menu-items", response_model=List[MenuItemResponse])
+async def get_option_menu_items(
+    option_id: str,
+    collections: dict = Depends(get_collections)
+):
+    try:
+        object_id = ObjectId(option_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid option ID")
+
+    options_entry = await catalog_cache.get("options", collections)
+    option = options_entry["by_id"].get(str(object_id))
+    if not option:
+        raise HTTPException(status_code=404, detail="Option not found")
+
+    menu_entry = await catalog_cache.get("menu", collections)
+    return [menu_entry["by_id"][item_id] for item_id in menu_entry["by_option"].get(option["name"], [])]
+
 # Create a new option (Ensures unique name)
 @router.post("/", response_model=OptionResponse)
 async def create_option(
@@ -39,7 +90,9 @@ async def create_option(
 ):
     options_collection = collections["options"]
     try:
-        result = options_collection.insert_one(option.model_dump())
+        seq = next_change_seq(collections)
+        result = options_collection.insert_one({**option.model_dump(), "seq": seq})
+        catalog_changed("options", collections)
         return OptionResponse(**option.model_dump(), id=str(result.inserted_id))
     except DuplicateKeyError:
         raise HTTPException(status_code=400, detail=f"An option with the name '{option.name}' already exists")
@@ -58,15 +111,27 @@ async def update_option(
         raise HTTPException(status_code=400, detail="No valid fields to update")
 
     try:
+        option = options_collection.find_one({"_id": ObjectId(option_id)})
+        if not option:
+            raise HTTPException(status_code=404, detail="Option not found")
+        old_name = option["name"]
+
+        seq = next_change_seq(collections)
         result = options_collection.find_one_and_update(
             {"_id": ObjectId(option_id)},
-            {"$set": update_data},
+            {"$set": {**update_data, "seq": seq}},
             return_document=ReturnDocument.AFTER
         )
 
         if not result:
             raise HTTPException(status_code=404, detail="Option not found")
 
+        # Renaming cascades to the menu items and open carts using the option
+        if update_data.get("name", old_name) != old_name:
+            rename_option_references(old_name, update_data["name"], seq, collections)
+            catalog_changed("menu", collections)
+
+        catalog_changed("options", collections)
         return OptionResponse(**result, id=str(result["_id"]))
     except DuplicateKeyError:
         raise HTTPException(status_code=400, detail=f"An option with the name '{updated_option.name}' already exists")
@@ -88,16 +153,23 @@ async def delete_option(
         if not option:
             raise HTTPException(status_code=404, detail="Option not found")
 
-        # Check if any menu items use this option
-        menu_items_with_option = menu_collection.find_one({"options": option["name"]})
-        if menu_items_with_option:
+        # Check if any menu items use this option: the cached reverse index
+        # answers "in use" without a query, the indexed lookup confirms "unused"
+        menu_entry = await catalog_cache.get("menu", collections)
+        in_use = bool(menu_entry["by_option"].get(option["name"]))
+        if not in_use:
+            in_use = menu_collection.find_one({"options": option["name"]}) is not None
+        if in_use:
             raise HTTPException(
                 status_code=400,
                 detail="Cannot delete option as it is being used in menu items"
             )
 
         # Delete the option if it's not being used
-        result = options_collection.delete_one({"_id": ObjectId(option_id)})
+        seq = next_change_seq(collections)
+        result = options_collection.delete_one({"_id": option["_id"]})
+        record_deletion("options", option["_id"], seq, collections)
+        catalog_changed("options", collections)
         return {"message": "Option deleted successfully"}
 
     except HTTPException as e:
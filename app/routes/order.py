@@ -1,29 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from bson import ObjectId
 from pymongo import ReturnDocument
 from database import get_collections
-from schemas.order import Order, OrderStatus, OrderResponse
+from auth import get_user_collections
+from singleflight import single_flight
+from schemas.order import Order, OrderStatus, OrderResponse, StageGrouping, StageDurations
 from schemas.cart import CartItem
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from references import find_options, options_by_ref, public_lines
+from pricing import apply_pricing_rules, calculate_item_total
+from batch import batch_results, find_by_ids, parse_ids, valid_ids
+from catalog import catalog_cache
+from tenancy import collections_truck
+from order_events import order_events, stage_duration, stage_durations_pipeline
+from user_orders import status_changed
+import inventory
 
 router = APIRouter()
 
 def generate_order_number(collections: dict) -> str:
+    """
+    Next order number of the truck, `FT-<year>-<n>`. `collections` must be the
+    truck's (not a user's): numbers are allocated atomically from the
+    `order_number:<year>` counter, so concurrent checkouts never share one.
+    """
     year = datetime.now(UTC).year
-    orders_collection = collections["orders"]
-    latest_order = orders_collection.find_one(
-        {"order_number": {"$regex": f"^FT-{year}-"}},
-        sort=[("order_number", -1)]
+    counter_id = f"order_number:{year}"
+    counters_collection = collections["counters"]
+    if counters_collection.find_one({"_id": counter_id}) is None:
+        # Orders numbered before the counter existed: continue after them
+        latest_order = collections["orders"].find_one(
+            {"order_number": {"$regex": f"^FT-{year}-"}},
+            sort=[("order_number", -1)]
+        )
+        if latest_order:
+            last_number = int(latest_order["order_number"].split("-")[-1])
+            counters_collection.update_one({"_id": counter_id}, {"$max": {"seq": last_number}}, upsert=True)
+
+    counter = counters_collection.find_one_and_update(
+        {"_id": counter_id},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    if latest_order:
-        last_number = int(latest_order["order_number"].split("-")[-1])
-        new_number = last_number + 1
-    else:
-        new_number = 1
-    
-    return f"FT-{year}-{new_number:04d}"
+    return f"FT-{year}-{counter['seq']:04d}"
 
 def validate_menu_item_and_options(menu_item_id: str, selected_options: List[str], collections: dict) -> tuple:
     """
@@ -57,47 +79,60 @@ def validate_menu_item_and_options(menu_item_id: str, selected_options: List[str
 
     return menu_item, available_options
 
-def calculate_item_total(base_price: float, quantity: int, selected_options: List[str], available_options: List[dict]) -> float:
-    """Calculates total price for an item including options"""
-    option_prices = {opt["name"]: opt["price"] for opt in available_options}
-    options_total = sum(option_prices.get(name, 0) for name in selected_options)
-    return (base_price + options_total) * quantity
+def line_references(items: List[dict], collections: dict, option_refs: Optional[list] = None) -> tuple:
+    """
+    (menu items by string id, options by reference) of cart / order lines:
+    one query for the menu items and one per kind of option reference
+    (`option_refs`, default all of them) instead of a round of queries per line.
+    """
+    menu_items = find_by_ids(collections["menu"], list({ObjectId(item["menu_item_id"]) for item in items}))
+    if option_refs is None:
+        option_refs = [ref for item in items for ref in item["selected_options"]]
+    options = options_by_ref(find_options(list(set(option_refs)), collections["options"])) if option_refs else {}
+    return menu_items, options
 
 def validate_menu_items(items: List[dict], collections: dict):
-    menu_collection = collections["menu"]
+    # Options referenced by name (lines not yet migrated) are checked as they are
+    option_ids = [ref for item in items for ref in item["selected_options"] if not isinstance(ref, str)]
+    menu_items, options = line_references(items, collections, option_ids)
     for item in items:
-        menu_item = menu_collection.find_one({"_id": ObjectId(item["menu_item_id"])})
+        menu_item = menu_items.get(str(item["menu_item_id"]))
         if not menu_item:
             raise HTTPException(status_code=404, detail=f"Menu item {item['menu_item_id']} not found")
-        if not all(option in menu_item["options"] for option in item["selected_options"]):
+        if not menu_item.get("available", True):
+            raise HTTPException(status_code=400, detail=f"Menu item '{menu_item['name']}' is currently not available")
+        selected = [
+            ref if isinstance(ref, str) else options[ref]["name"] if ref in options else None
+            for ref in item["selected_options"]
+        ]
+        if not all(option in menu_item["options"] for option in selected):
             raise HTTPException(status_code=400, detail=f"Invalid options for menu item {item['menu_item_id']}")
 
-def calculate_total_amount(items: List[dict], collections: dict) -> float:
-    menu_collection = collections["menu"]
-    options_collection = collections["options"]
-    total = 0.0
+def calculate_line_totals(items: List[dict], collections: dict) -> List[tuple]:
+    """(menu item, item total) of each line, priced against the current menu and options"""
+    menu_items, options = line_references(items, collections)
+    totals = []
     for item in items:
-        menu_item = menu_collection.find_one({"_id": ObjectId(item["menu_item_id"])})
+        menu_item = menu_items.get(str(item["menu_item_id"]))
         if not menu_item:
             raise HTTPException(status_code=404, detail=f"Menu item {item['menu_item_id']} not found")
         
-        # Get option prices
-        if item["selected_options"]:
-            available_options = list(options_collection.find(
-                {"name": {"$in": item["selected_options"]}}
-            ))
-            option_prices = {opt["name"]: opt["price"] for opt in available_options}
-            options_total = sum(option_prices.get(name, 0) for name in item["selected_options"])
-        else:
-            options_total = 0
-            
         # Calculate total including options
-        item_total = (menu_item["price"] + options_total) * item["quantity"]
-        total += item_total
-    return total
+        available_options = [options[ref] for ref in item["selected_options"] if ref in options]
+        totals.append((menu_item, calculate_item_total(
+            menu_item["price"], item["quantity"], item["selected_options"], available_options
+        )))
+    return totals
 
+def calculate_total_amount(items: List[dict], collections: dict) -> float:
+    return sum(total for _, total in calculate_line_totals(items, collections))
+
+# Customer routes (create, cancel, pay) only reach the orders of the signed-in user
 @router.post("/", response_model=OrderResponse)
-async def create_order(collections: dict = Depends(get_collections)):
+async def create_order(
+    collections: dict = Depends(get_user_collections),
+    truck_scoped: dict = Depends(get_collections)
+):
     orders_collection = collections["orders"]
     carts_collection = collections["carts"]
 
@@ -112,32 +147,49 @@ async def create_order(collections: dict = Depends(get_collections)):
     # Validate all menu items exist and have valid options
     validate_menu_items(cart["items"], collections)
     
-    # Calculate total amount
-    total_amount = calculate_total_amount(cart["items"], collections)
-    
-    # Generate order number
-    order_number = generate_order_number(collections)
-    
-    # Create order document
-    order_data = {
-        "order_number": order_number,
-        "items": cart["items"],
-        "total_amount": total_amount,
-        "status": OrderStatus.PENDING,
-        "created_at": datetime.now(UTC),
-        "updated_at": datetime.now(UTC)
-    }
+    # Calculate total amount, then the discounts of the active pricing rules
+    priced = calculate_line_totals(cart["items"], collections)
+    totals = await apply_pricing_rules(
+        [{**item, "total_price": total} for item, (_, total) in zip(cart["items"], priced)],
+        collections,
+        {str(menu_item["_id"]): menu_item for menu_item, _ in priced}
+    )
     
-    # Insert order
-    result = orders_collection.insert_one(order_data)
+    # Take the stock of tracked menu items and options (409 when short)
+    reservations = inventory.reserve(cart["items"], collections)
+
+    # Number and insert the order, giving the stock back if either fails
+    try:
+        # Generate order number (numbered per truck, not per user)
+        order_number = generate_order_number(truck_scoped)
+        
+        # Create order document
+        order_data = {
+            "order_number": order_number,
+            "items": cart["items"],
+            "total_amount": totals["total_amount"],
+            "discounts": totals["discounts"],
+            "discount_amount": totals["discount_amount"],
+            "reservations": reservations,
+            "status": OrderStatus.PENDING,
+            "created_at": datetime.now(UTC),
+            "updated_at": datetime.now(UTC)
+        }
+        result = orders_collection.insert_one(order_data)
+    except Exception:
+        inventory.release(reservations, collections)
+        raise
     
+    status_changed(collections, order_data, OrderStatus.PENDING)
+
     # Clear the cart after successful order creation
     carts_collection.delete_one({"_id": cart["_id"]})
     
-    # Return order with string ID
-    order_data["_id"] = result.inserted_id
-    order_data["id"] = str(order_data.pop("_id"))
-    return OrderResponse(**order_data)
+    # Return order with string ID and public item references
+    order_data.pop("_id", None)
+    order_data.pop("reservations")
+    items = await public_lines(order_data["items"], collections)
+    return OrderResponse(**{**order_data, "items": items, "id": str(result.inserted_id)})
 
 @router.get("/", response_model=List[OrderResponse])
 async def get_orders(
@@ -154,12 +206,55 @@ async def get_orders(
     # Get orders
     orders = list(orders_collection.find(query))
     
-    # Convert ObjectId to string for response
+    # Convert ObjectIds to strings (and option ids to names) for response
+    lines = await public_lines([line for order in orders for line in order["items"]], collections)
     for order in orders:
         order["id"] = str(order.pop("_id"))
+        order["items"], lines = lines[:len(order["items"])], lines[len(order["items"]):]
     
     return orders
 
+# Get several orders at once with a single query, in request order
+@router.post(":batchGet", response_model=BatchGetResponse[OrderResponse])
+async def batch_get_orders(
+    batch: BatchGetRequest,
+    collections: dict = Depends(get_collections)
+):
+    object_ids = parse_ids(batch.ids)
+    orders = find_by_ids(collections["orders"], valid_ids(object_ids))
+
+    # Convert ObjectIds to strings (and option ids to names) for response
+    lines = await public_lines([line for order in orders.values() for line in order["items"]], collections)
+    found = {}
+    for order_id, order in orders.items():
+        items, lines = lines[:len(order["items"])], lines[len(order["items"]):]
+        found[order_id] = {**order, "id": order_id, "items": items}
+    return {"results": batch_results(batch.ids, object_ids, found)}
+
+# p50 / p95 time spent in each status, per hour or per menu item (from the event log)
+@router.get("/stats/stage-durations", response_model=StageDurations)
+async def get_stage_durations(
+    since: Optional[datetime] = Query(None, description="Default: 24 hours before `until`"),
+    until: Optional[datetime] = Query(None, description="Default: now"),
+    group_by: StageGrouping = StageGrouping.HOUR,
+    collections: dict = Depends(get_collections)
+):
+    until = until or datetime.now(UTC)
+    since = since or until - timedelta(hours=24)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="`since` must be before `until`")
+
+    # Events still buffered by this worker are part of the answer
+    order_events.flush()
+    documents = list(collections["order_events"].aggregate(stage_durations_pipeline(since, until, group_by.value)))
+    menu_by_id = (await catalog_cache.get("menu", collections))["by_id"] if group_by == StageGrouping.MENU_ITEM else {}
+    return {
+        "since": since,
+        "until": until,
+        "group_by": group_by,
+        "stages": [stage_duration(document, menu_by_id) for document in documents]
+    }
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: str,
@@ -168,12 +263,16 @@ async def get_order(
     orders_collection = collections["orders"]
     
     try:
-        order = orders_collection.find_one({"_id": ObjectId(order_id)})
+        object_id = ObjectId(order_id)
+        order = await single_flight.do(
+            "orders.get", (collections_truck(collections), object_id), lambda: orders_collection.find_one({"_id": object_id})
+        )
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        # Convert ObjectId to string for response
-        order["id"] = str(order.pop("_id"))
+        # The document may be shared with coalesced requests, convert a copy
+        order = {**order, "id": str(order["_id"])}
+        order["items"] = await public_lines(order["items"], collections)
         return OrderResponse(**order)
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid order ID")
@@ -187,9 +286,13 @@ async def update_order_status(
     orders_collection = collections["orders"]
     
     try:
-        # Update order status
-        result = orders_collection.update_one(
-            {"_id": ObjectId(order_id)},
+        query = {"_id": ObjectId(order_id)}
+        if status == OrderStatus.CANCELLED:
+            # Cancelling from any status returns the reserved stock, once
+            query["status"] = {"$ne": OrderStatus.CANCELLED}
+        # Update order status, reading the previous one for the event log
+        order = orders_collection.find_one_and_update(
+            query,
             {
                 "$set": {
                     "status": status,
@@ -198,9 +301,12 @@ async def update_order_status(
             }
         )
         
-        if result.modified_count == 0:
+        if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
+        if status == OrderStatus.CANCELLED:
+            inventory.release(order.get("reservations", []), collections)
+        status_changed(collections, order, status, order["status"])
         return {"message": f"Order status updated to {status}"}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid order ID")
@@ -208,7 +314,7 @@ async def update_order_status(
 @router.post("/{order_id}/cancel", response_model=Order)
 async def cancel_order(
     order_id: str,
-    collections: dict = Depends(get_collections)
+    collections: dict = Depends(get_user_collections)
 ):
     orders_collection = collections["orders"]
     try:
@@ -222,8 +328,9 @@ async def cancel_order(
                 detail="Can only cancel pending orders"
             )
         
+        # Conditional on the status, so concurrent cancellations return the stock once
         result = orders_collection.find_one_and_update(
-            {"_id": ObjectId(order_id)},
+            {"_id": ObjectId(order_id), "status": OrderStatus.PENDING},
             {
                 "$set": {
                     "status": OrderStatus.CANCELLED,
@@ -238,14 +345,17 @@ async def cancel_order(
                 status_code=400,
                 detail="Failed to cancel order"
             )
-        return {**result, "id": str(result["_id"])}
+        inventory.release(result.get("reservations", []), collections)
+        status_changed(collections, result, OrderStatus.CANCELLED, OrderStatus.PENDING)
+        items = await public_lines(result["items"], collections)
+        return {**result, "items": items, "id": str(result["_id"])}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid order ID " + str(e))
 
 @router.post("/{order_id}/pay", response_model=Order)
 async def mark_order_as_paid(
     order_id: str,
-    collections: dict = Depends(get_collections)
+    collections: dict = Depends(get_user_collections)
 ):
     orders_collection = collections["orders"]
     try:
@@ -259,8 +369,9 @@ async def mark_order_as_paid(
                 detail="Can only pay for pending orders"
             )
         
+        # Conditional on the status: the order sweeper may have cancelled it meanwhile
         result = orders_collection.find_one_and_update(
-            {"_id": ObjectId(order_id)},
+            {"_id": ObjectId(order_id), "status": OrderStatus.PENDING},
             {
                 "$set": {
                     "status": OrderStatus.IN_PREPARATION,
@@ -269,6 +380,14 @@ async def mark_order_as_paid(
             },
             return_document=ReturnDocument.AFTER
         )
-        return {**result, "id": str(result["_id"])}
+        
+        if not result:
+            raise HTTPException(
+                status_code=400,
+                detail="Failed to pay order"
+            )
+        status_changed(collections, result, OrderStatus.IN_PREPARATION, order["status"])
+        items = await public_lines(result["items"], collections)
+        return {**result, "items": items, "id": str(result["_id"])}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid order ID " + str(e)) 
\ No newline at end of file
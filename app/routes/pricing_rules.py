@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import List
+from bson import ObjectId
+from pymongo import ReturnDocument
+from database import get_collections
+from catalog import catalog_cache, catalog_changed, catalog_response
+from batch import find_by_ids
+from schemas.pricing_rule import PricingRuleCreate, PricingRuleResponse
+
+router = APIRouter()
+
+# Check that the menu items a rule refers to exist
+def validate_rule_menu_items(rule: PricingRuleCreate, collections: dict) -> None:
+    invalid = [menu_item_id for menu_item_id in rule.menu_item_ids if not ObjectId.is_valid(menu_item_id)]
+    if not invalid:
+        found = find_by_ids(collections["menu"], [ObjectId(menu_item_id) for menu_item_id in rule.menu_item_ids])
+        invalid = [menu_item_id for menu_item_id in rule.menu_item_ids if str(ObjectId(menu_item_id)) not in found]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Menu item(s) not found: {', '.join(invalid)}")
+
+# Get all pricing rules
+@router.get("/", response_model=List[PricingRuleResponse])
+async def get_pricing_rules(request: Request, collections: dict = Depends(get_collections)):
+    entry = await catalog_cache.get("pricing_rules", collections)
+    return catalog_response(request, entry)
+
+# Create a pricing rule (applied to carts, quotes and new orders right away)
+@router.post("/", response_model=PricingRuleResponse)
+async def create_pricing_rule(
+    rule: PricingRuleCreate,
+    collections: dict = Depends(get_collections)
+):
+    validate_rule_menu_items(rule, collections)
+    result = collections["pricing_rules"].insert_one(rule.model_dump())
+    catalog_changed("pricing_rules", collections)
+    return PricingRuleResponse(**rule.model_dump(), id=str(result.inserted_id))
+
+# Replace a pricing rule
+@router.put("/{rule_id}", response_model=PricingRuleResponse)
+async def update_pricing_rule(
+    rule_id: str,
+    rule: PricingRuleCreate,
+    collections: dict = Depends(get_collections)
+):
+    try:
+        object_id = ObjectId(rule_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pricing rule ID")
+
+    validate_rule_menu_items(rule, collections)
+    result = collections["pricing_rules"].find_one_and_update(
+        {"_id": object_id},
+        {"$set": rule.model_dump()},
+        return_document=ReturnDocument.AFTER
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="Pricing rule not found")
+
+    catalog_changed("pricing_rules", collections)
+    return PricingRuleResponse(**result, id=str(result["_id"]))
+
+# Delete a pricing rule
+@router.delete("/{rule_id}")
+async def delete_pricing_rule(
+    rule_id: str,
+    collections: dict = Depends(get_collections)
+):
+    try:
+        object_id = ObjectId(rule_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pricing rule ID")
+
+    result = collections["pricing_rules"].delete_one({"_id": object_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Pricing rule not found")
+
+    catalog_changed("pricing_rules", collections)
+    return {"message": "Pricing rule deleted successfully"}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from database import get_collections
+from catalog import catalog_cache
+from pricing import pricing_now, quote_items
+from schemas.quote import QuoteRequest, QuoteBatchRequest, Quote, QuoteBatch
+
+router = APIRouter()
+
+# Price a cart without storing it, validated in memory against the cached catalog
+@router.post("/quote", response_model=Quote)
+async def quote_cart(cart: QuoteRequest, collections: dict = Depends(get_collections)):
+    menu = await catalog_cache.get("menu", collections)
+    options = await catalog_cache.get("options", collections)
+    rules = await catalog_cache.get("pricing_rules", collections)
+    return quote_items(cart.items, menu["by_id"], options["by_name"], rules["engine"])
+
+# Price several cart variants in one call
+@router.post("/quote:batch", response_model=QuoteBatch)
+async def quote_cart_variants(batch: QuoteBatchRequest, collections: dict = Depends(get_collections)):
+    menu = await catalog_cache.get("menu", collections)
+    options = await catalog_cache.get("options", collections)
+    rules = await catalog_cache.get("pricing_rules", collections)
+    now = pricing_now()
+    return {
+        "quotes": [
+            quote_items(variant.items, menu["by_id"], options["by_name"], rules["engine"], now)
+            for variant in batch.variants
+        ]
+    }
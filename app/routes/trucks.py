@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from database import get_collections, get_truck_id
+from locations import nearby_pipeline, nearby_truck, store_location
+from schemas.truck import TruckUpdate, LocationUpdate, LocationUpdateResult, NearbyTruck
+import config
+
+router = APIRouter()
+
+# Open trucks near a point, nearest first, optionally only those serving an item
+@router.get("/nearby", response_model=List[NearbyTruck])
+async def get_nearby_trucks(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    item: Optional[str] = Query(None, min_length=1, description="Name of an available menu item"),
+    max_distance: float = Query(config.NEARBY_DEFAULT_MAX_DISTANCE, gt=0, le=config.NEARBY_MAX_DISTANCE, description="Meters"),
+    limit: int = Query(10, ge=1, le=config.NEARBY_MAX_LIMIT),
+    collections: dict = Depends(get_collections)
+):
+    pipeline = nearby_pipeline(lat, lng, item, max_distance, limit)
+    return [nearby_truck(document) for document in collections["trucks"].aggregate(pipeline)]
+
+# Update the profile (name, open) of the requesting truck
+@router.put("/me")
+async def update_truck(
+    update: TruckUpdate,
+    truck_id: str = Depends(get_truck_id),
+    collections: dict = Depends(get_collections)
+):
+    fields = {k: v for k, v in update.model_dump().items() if v is not None}
+    if fields:
+        collections["trucks"].update_one({"_id": truck_id}, {"$set": fields}, upsert=True)
+    return {"truck_id": truck_id, **fields}
+
+# Report the position of the requesting truck (cheap, may be called every few seconds)
+@router.put("/me/location", response_model=LocationUpdateResult)
+async def update_truck_location(
+    location: LocationUpdate,
+    truck_id: str = Depends(get_truck_id),
+    collections: dict = Depends(get_collections)
+):
+    return {"stored": store_location(collections["trucks"], truck_id, location.lat, location.lng)}
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
+from datetime import datetime, UTC
+from bson import ObjectId
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+from database import database_collections, get_collections, get_database
+from auth import create_token, get_current_user, hash_password, revoke, verify_password
+from schemas.user import UserCreate, UserLogin, UserResponse, Token
+from schemas.order import OrderSummary, UserOrders
+from user_orders import history_page, user_active_orders
+import config
+
+router = APIRouter()
+
+def user_response(user: dict) -> UserResponse:
+    return UserResponse(
+        id=str(user["_id"]),
+        email=user["email"],
+        full_name=user["full_name"],
+        phone_number=user["phone_number"],
+        is_active=user["is_active"],
+        created_at=user["created_at"],
+        updated_at=user["updated_at"]
+    )
+
+def token_response(user: dict) -> dict:
+    access_token, expires_at = create_token(str(user["_id"]))
+    return {"access_token": access_token, "expires_at": expires_at, "user": user_response(user)}
+
+# Create an account and sign in
+@router.post("/signup", response_model=Token)
+async def signup(
+    user: UserCreate,
+    collections: dict = Depends(get_collections)
+):
+    now = datetime.now(UTC)
+    user_data = {
+        **user.model_dump(exclude={"password"}),
+        "email": user.email.lower(),
+        "password_hash": await hash_password(user.password),
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now
+    }
+    try:
+        result = collections["users"].insert_one(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return token_response({**user_data, "_id": result.inserted_id})
+
+@router.post("/login", response_model=Token)
+async def login(
+    credentials: UserLogin,
+    collections: dict = Depends(get_collections)
+):
+    user = collections["users"].find_one({"email": credentials.email.lower()})
+    valid = await verify_password(credentials.password, user["password_hash"] if user else None)
+    if not valid or not user["is_active"]:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    return token_response(user)
+
+# Revoke the token used for this request
+@router.post("/logout")
+async def logout(
+    user: dict = Depends(get_current_user),
+    collections: dict = Depends(get_collections)
+):
+    revoke(user, collections)
+    return {"message": "Logged out"}
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(
+    user: dict = Depends(get_current_user),
+    collections: dict = Depends(get_collections)
+):
+    document = collections["users"].find_one({"_id": ObjectId(user["sub"])})
+    if not document:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_response(document)
+
+# Order history of the signed-in user, all trucks, newest first
+@router.get("/me/orders", response_model=UserOrders)
+async def get_my_orders(
+    before: Optional[str] = Query(None, description="`next_before` of the previous page"),
+    limit: int = Query(20, ge=1, le=config.USER_ORDERS_MAX_LIMIT),
+    user: dict = Depends(get_current_user),
+    db: Database = Depends(get_database)
+):
+    try:
+        orders, next_before = history_page(database_collections(db)["orders"], user["sub"], before, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"orders": orders, "next_before": next_before}
+
+# Orders of the signed-in user not delivered or cancelled yet (cached per worker)
+@router.get("/me/orders/active", response_model=List[OrderSummary])
+async def get_my_active_orders(
+    user: dict = Depends(get_current_user),
+    db: Database = Depends(get_database)
+):
+    return user_active_orders(database_collections(db)["orders"], user["sub"])
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import Generic, List, Optional, TypeVar
+import config
+
+T = TypeVar("T")
+
+# Schema for a multi-get request (POST /menu:batchGet, /options:batchGet, /orders:batchGet)
+class BatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=config.BATCH_GET_MAX_IDS)
+
+# Result for one requested id: the item, or why it is missing ("not_found", "invalid_id")
+class BatchGetResult(BaseModel, Generic[T]):
+    id: str
+    found: bool
+    item: Optional[T] = None
+    error: Optional[str] = None
+
+# Schema for responding to a multi-get, results in request order
+class BatchGetResponse(BaseModel, Generic[T]):
+    results: List[BatchGetResult[T]]
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime, UTC
+from schemas.pricing_rule import AppliedDiscount
 
 class CartItem(BaseModel):
     menu_item_id: str = Field(..., description="ID of the menu item")
@@ -11,7 +12,9 @@ class CartItem(BaseModel):
 class Cart(BaseModel):
     id: Optional[str] = None
     items: List[CartItem] = Field(default_factory=list, description="List of items in the cart")
-    total_amount: float = Field(default=0, description="Total amount of all items including options")
+    total_amount: float = Field(default=0, description="Total amount of all items including options, after discounts")
+    discounts: List[AppliedDiscount] = Field(default_factory=list, description="Pricing rules applied to the cart")
+    discount_amount: float = Field(default=0, description="Sum of the discounts")
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
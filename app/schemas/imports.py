@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Error of one rejected import row (1-based row number in the request)
+class ImportRowError(BaseModel):
+    row: int
+    type: Optional[str] = None
+    name: Optional[str] = None
+    error: str
+
+# Write counts per collection
+class ImportCounts(BaseModel):
+    upserted: int = 0
+    modified: int = 0
+    unchanged: int = 0
+
+# Schema for responding to a bulk catalog import
+class ImportResult(BaseModel):
+    rows: int = Field(0, description="Rows read from the request")
+    options: ImportCounts = Field(default_factory=ImportCounts)
+    menu: ImportCounts = Field(default_factory=ImportCounts)
+    errors: List[ImportRowError] = []
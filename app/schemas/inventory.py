@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from enum import Enum
+
+class InventoryKind(str, Enum):
+    MENU = "menu"
+    OPTIONS = "options"
+
+# Schema for setting the stock of a menu item or option
+class StockUpdate(BaseModel):
+    stock: int = Field(..., ge=0, description="Units available (0 marks a menu item sold out)")
+
+# Schema for responding with the stock of a menu item or option
+class StockLevel(BaseModel):
+    kind: InventoryKind
+    item_id: str
+    stock: int
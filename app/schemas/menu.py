@@ -1,11 +1,14 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from schemas.option import OptionResponse
+import config
 
 # Schema for creating a menu item (Referencing options by name)
 class MenuItemCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
     price: float = Field(..., gt=0)
+    category: Optional[str] = Field(None, max_length=50)
     available: bool = True
     options: List[str] = []  # 🔥 Storing option names only
 
@@ -14,9 +17,35 @@ class MenuItemUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
     price: Optional[float] = Field(None, gt=0)
+    category: Optional[str] = Field(None, max_length=50)
     available: Optional[bool] = None
     options: Optional[List[str]] = None  # 🔥 Storing option names only
 
+# Schema for setting the availability of several menu items at once
+class AvailabilityUpdate(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=config.BATCH_GET_MAX_IDS)
+    available: bool
+
+# Schema for responding to an availability update
+class AvailabilityResult(BaseModel):
+    available: bool
+    modified: int = Field(..., description="Menu items whose availability changed")
+    not_found: List[str] = []
+    version: int = Field(..., description="Catalog version after the update")
+
 # Schema for responding with a menu item
 class MenuItemResponse(MenuItemCreate):
-    id: str
\ No newline at end of file
+    id: str
+
+# Ids of catalog documents deleted since the requested sequence
+class DeletedCatalogItems(BaseModel):
+    menu: List[str] = []
+    options: List[str] = []
+
+# Schema for responding to a delta sync (GET /menu/changes)
+class CatalogChanges(BaseModel):
+    since: int
+    next_since: int
+    menu: List[MenuItemResponse]
+    options: List[OptionResponse]
+    deleted: DeletedCatalogItems
@@ -2,6 +2,7 @@ from typing import List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime, UTC
 from enum import Enum
+from schemas.pricing_rule import AppliedDiscount
 
 class OrderStatus(str, Enum):
     PENDING = "pending"
@@ -21,6 +22,8 @@ class OrderResponse(BaseModel):
     order_number: str
     items: List[OrderItem]
     total_amount: float
+    discounts: List[AppliedDiscount] = []
+    discount_amount: float = 0
     status: OrderStatus
     created_at: datetime
     updated_at: datetime
@@ -29,7 +32,9 @@ class Order(BaseModel):
     id: Optional[str] = None
     order_number: str = Field(..., description="Unique order number")
     items: List[OrderItem] = Field(..., description="List of items in the order")
-    total_amount: float = Field(..., description="Total amount of the order")
+    total_amount: float = Field(..., description="Total amount of the order, after discounts")
+    discounts: List[AppliedDiscount] = Field(default_factory=list, description="Pricing rules applied to the order")
+    discount_amount: float = Field(default=0, description="Sum of the discounts")
     status: OrderStatus = Field(default=OrderStatus.PENDING)
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -50,4 +55,37 @@ class Order(BaseModel):
                 "status": "pending"
             }
         }
-    ) 
\ No newline at end of file
+    ) 
+# Order as listed in a user's history
+class OrderSummary(BaseModel):
+    id: str
+    truck_id: Optional[str] = None
+    order_number: str
+    status: OrderStatus
+    total_amount: float
+    item_count: int
+    created_at: datetime
+
+class UserOrders(BaseModel):
+    orders: List[OrderSummary]
+    next_before: Optional[str] = Field(None, description="`before` of the next page, null on the last one")
+
+class StageGrouping(str, Enum):
+    HOUR = "hour"
+    MENU_ITEM = "menu_item"
+
+# Time spent in a status, per hour it was entered or per menu item ordered
+class StageDuration(BaseModel):
+    stage: OrderStatus
+    hour: Optional[datetime] = None
+    menu_item_id: Optional[str] = None
+    menu_item_name: Optional[str] = None
+    count: int = Field(..., description="Orders that left the stage")
+    p50_seconds: float
+    p95_seconds: float
+
+class StageDurations(BaseModel):
+    since: datetime
+    until: datetime
+    group_by: StageGrouping
+    stages: List[StageDuration]
@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+from enum import Enum
+
+class PricingRuleType(str, Enum):
+    PERCENTAGE = "percentage"     # `value` % off the line
+    FIXED = "fixed"               # `value` off each unit
+    COMBO = "combo"               # one of each `menu_item_ids` for `value` (options charged extra)
+    BUY_X_GET_Y = "buy_x_get_y"   # every `buy_quantity` units, `get_quantity` more are free
+
+TIME_PATTERN = r"^([01]\d|2[0-3]):[0-5]\d$"
+
+# Schema for creating a pricing rule
+class PricingRuleCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    type: PricingRuleType
+    menu_item_ids: List[str] = Field(default_factory=list, description="Items the rule applies to (empty: whole menu, percentage and fixed only)")
+    value: float = Field(0, ge=0)
+    buy_quantity: int = Field(1, gt=0)
+    get_quantity: int = Field(1, gt=0)
+    start_time: Optional[str] = Field(None, pattern=TIME_PATTERN, description="Daily window start (HH:MM), e.g. happy hours")
+    end_time: Optional[str] = Field(None, pattern=TIME_PATTERN, description="Daily window end (HH:MM, exclusive)")
+    days: List[int] = Field(default_factory=list, description="Days of the week (0 = Monday), empty: every day")
+    active: bool = True
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        if (self.start_time is None) != (self.end_time is None):
+            raise ValueError("start_time and end_time must be set together")
+        if any(day < 0 or day > 6 for day in self.days):
+            raise ValueError("days must be between 0 (Monday) and 6 (Sunday)")
+        if self.type == PricingRuleType.PERCENTAGE and self.value > 100:
+            raise ValueError("A percentage discount cannot exceed 100")
+        if self.type == PricingRuleType.COMBO and len(set(self.menu_item_ids)) < 2:
+            raise ValueError("A combo needs at least two menu items")
+        if self.type == PricingRuleType.BUY_X_GET_Y and not self.menu_item_ids:
+            raise ValueError("A buy X get Y rule needs menu items")
+        return self
+
+# Schema for responding with a pricing rule
+class PricingRuleResponse(PricingRuleCreate):
+    id: str
+
+# Discount granted by one rule on a cart, order or quote
+class AppliedDiscount(BaseModel):
+    rule_id: str
+    name: str
+    amount: float
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from schemas.cart import CartItem
+from schemas.pricing_rule import AppliedDiscount
+import config
+
+# Schema for quoting one (hypothetical) cart
+class QuoteRequest(BaseModel):
+    items: List[CartItem] = Field(..., max_length=config.QUOTE_MAX_ITEMS)
+
+# Schema for quoting several cart variants in one call
+class QuoteBatchRequest(BaseModel):
+    variants: List[QuoteRequest] = Field(..., min_length=1, max_length=config.QUOTE_MAX_VARIANTS)
+
+# Priced line; `error` is set (and the line priced 0) when it cannot be ordered
+class QuoteLine(BaseModel):
+    menu_item_id: str
+    quantity: int
+    selected_options: List[str]
+    unit_price: float
+    total_price: float
+    error: Optional[str] = None
+
+# Schema for responding with a quote
+class Quote(BaseModel):
+    items: List[QuoteLine]
+    total_amount: float = Field(..., description="Sum of the valid lines, after discounts")
+    discounts: List[AppliedDiscount] = []
+    discount_amount: float = 0
+    valid: bool = Field(..., description="False when any line has an error")
+
+# Schema for responding to a batch quote, in request order
+class QuoteBatch(BaseModel):
+    quotes: List[Quote]
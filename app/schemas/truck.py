@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+# Schema for updating the profile of the requesting truck
+class TruckUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    open: Optional[bool] = None
+
+# Schema for a location report (sent every few seconds while driving)
+class LocationUpdate(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+class LocationUpdateResult(BaseModel):
+    stored: bool = Field(..., description="False when the move was too small to be written")
+
+class Location(BaseModel):
+    lat: float
+    lng: float
+
+# Menu item matching the `item` searched near the user
+class NearbyItem(BaseModel):
+    id: str
+    name: str
+    price: float
+
+# Schema for responding with a truck near the user
+class NearbyTruck(BaseModel):
+    truck_id: str
+    name: Optional[str] = None
+    distance: float = Field(..., description="Meters from the requested point")
+    location: Location
+    item: Optional[NearbyItem] = None
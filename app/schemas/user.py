@@ -33,4 +33,9 @@ class User(UserBase):
 
 class UserResponse(User):
     """User model returned to clients (without sensitive data)"""
-    pass 
\ No newline at end of file
+    pass 
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: datetime
+    user: UserResponse
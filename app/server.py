@@ -0,0 +1,65 @@
+"""
+Production entrypoint: `python app/server.py`
+
+Runs Gunicorn with `config.WORKERS` Uvicorn worker processes. The app is
+imported once in the master (preload) and forked into the workers; uvloop and
+httptools are used when installed. Each worker opens its own MongoDB pool in
+the app lifespan, i.e. after the fork.
+"""
+import glob
+import os
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+import config
+import metrics
+
+
+class FoodTruckWorker(UvicornWorker):
+    # "auto" picks uvloop / httptools when available and falls back to asyncio / h11
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+
+def on_starting(server):
+    # Metric files left by a previous run would be aggregated with the new workers
+    if config.PROMETHEUS_MULTIPROC_DIR:
+        os.makedirs(config.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+        for path in glob.glob(os.path.join(config.PROMETHEUS_MULTIPROC_DIR, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    metrics.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        return app
+
+
+def server_options() -> dict:
+    return {
+        "bind": f"{config.HOST}:{config.PORT}",
+        "workers": config.WORKERS,
+        "worker_class": FoodTruckWorker,
+        "preload_app": True,
+        "keepalive": config.KEEPALIVE,
+        "backlog": config.BACKLOG,
+        "graceful_timeout": config.GRACEFUL_TIMEOUT,
+        "timeout": config.WORKER_TIMEOUT,
+        "on_starting": on_starting,
+        "child_exit": child_exit,
+        "accesslog": "-",
+    }
+
+
+if __name__ == "__main__":
+    Server(server_options()).run()
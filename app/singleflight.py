@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Callable, Hashable
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from metrics import SINGLEFLIGHT_REQUESTS
+import config
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads: the first caller for a key (the
+    leader) runs the blocking DB call in the threadpool, callers arriving while
+    it is in flight await the same result instead of issuing their own query.
+
+    `name` identifies the kind of read (e.g. "menu.get") and is the metrics
+    label; `key` identifies the exact request (e.g. the menu item id). At most
+    `max_waiters` callers may wait on one call, the next ones get a 503.
+
+    Results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_waiters: int):
+        self.max_waiters = max_waiters
+        self._calls: dict = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        call_key = (name, key)
+        call = self._calls.get(call_key)
+        if call is not None:
+            if call["waiters"] >= self.max_waiters:
+                SINGLEFLIGHT_REQUESTS.labels(name, "rejected").inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many concurrent identical requests, retry shortly",
+                    headers={"Retry-After": "1"}
+                )
+            call["waiters"] += 1
+            SINGLEFLIGHT_REQUESTS.labels(name, "shared").inc()
+            # Shielded so that a disconnecting waiter does not cancel the leader's call
+            return await asyncio.shield(call["future"])
+
+        future = asyncio.get_running_loop().create_future()
+        call = {"future": future, "waiters": 0}
+        self._calls[call_key] = call
+        SINGLEFLIGHT_REQUESTS.labels(name, "leader").inc()
+        try:
+            result = await run_in_threadpool(fn)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            if call["waiters"] == 0:
+                # Nobody else will retrieve it, avoid the "never retrieved" warning
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[call_key]
+
+
+single_flight = SingleFlight(config.SINGLEFLIGHT_MAX_WAITERS)
@@ -0,0 +1,168 @@
+"""
+Truck tenancy: one deployment serves several food trucks.
+
+Every document carries a `truck_id` partition key. Requests reach MongoDB
+through TruckCollection, which adds the truck to every filter (and to every
+inserted or upserted document), so a query can neither forget the key nor
+read another truck's data, and every index is led by `truck_id`: a truck's
+traffic only ever scans its own index ranges, and `{truck_id: 1, _id: 1}` is
+a natural shard key.
+
+Counters (catalog version, checkpoints) are keyed by string `_id`s, which
+are prefixed with the truck (`<truck_id>:catalog`) so that each truck has its
+own sequences.
+
+Carts and orders are further scoped to the signed-in user (`user_id`, None
+for anonymous ones) by the customer-facing routes, the same way.
+"""
+import copy
+import re
+from typing import Any, List, Optional
+from pymongo import InsertOne, ReplaceOne
+
+TRUCK_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Collections partitioned by truck; `counters` also gets prefixed ids
+TRUCK_COLLECTIONS = (
+    "menu", "options", "carts", "orders", "counters", "tombstones", "pricing_rules", "inventory", "order_events"
+)
+
+# Collections also partitioned by customer account
+USER_COLLECTIONS = ("carts", "orders")
+
+
+def is_valid_truck_id(truck_id: str) -> bool:
+    return bool(TRUCK_ID_PATTERN.match(truck_id))
+
+
+def truck_counter_id(truck_id: str, counter_id: str) -> str:
+    return f"{truck_id}:{counter_id}"
+
+
+class ScopedCollection:
+    """A pymongo collection restricted to the documents whose `field` is `value`."""
+
+    def __init__(self, collection, field: str, value: Any):
+        self.collection = collection
+        self.field = field
+        self.value = value
+
+    @property
+    def name(self) -> str:
+        return self.collection.name
+
+    def scope(self, filter: Optional[dict] = None) -> dict:
+        scoped = dict(filter or {})
+        scoped[self.field] = self.value
+        return scoped
+
+    def stamp(self, document: dict) -> dict:
+        document[self.field] = self.value
+        return document
+
+    def scope_request(self, request):
+        request = copy.copy(request)
+        if isinstance(request, InsertOne):
+            request._doc = self.stamp(dict(request._doc))
+            return request
+        request._filter = self.scope(request._filter)
+        if isinstance(request, ReplaceOne):
+            request._doc = self.stamp(dict(request._doc))
+        return request
+
+    def scope_pipeline(self, pipeline: List[dict]) -> List[dict]:
+        if pipeline and "$geoNear" in pipeline[0]:
+            # $geoNear must stay the first stage, scope its query instead
+            geo_near = {**pipeline[0]["$geoNear"]}
+            geo_near["query"] = self.scope(geo_near.get("query"))
+            return [{"$geoNear": geo_near}] + list(pipeline[1:])
+        return [{"$match": {self.field: self.value}}] + list(pipeline)
+
+    # Reads
+    def find(self, filter: Optional[dict] = None, *args, **kwargs):
+        return self.collection.find(self.scope(filter), *args, **kwargs)
+
+    def find_one(self, filter: Optional[dict] = None, *args, **kwargs) -> Optional[dict]:
+        return self.collection.find_one(self.scope(filter), *args, **kwargs)
+
+    def count_documents(self, filter: dict, **kwargs) -> int:
+        return self.collection.count_documents(self.scope(filter), **kwargs)
+
+    def distinct(self, key: str, filter: Optional[dict] = None, **kwargs) -> list:
+        return self.collection.distinct(key, self.scope(filter), **kwargs)
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        return self.collection.aggregate(self.scope_pipeline(pipeline), **kwargs)
+
+    # Writes
+    def insert_one(self, document: dict, **kwargs):
+        return self.collection.insert_one(self.stamp(document), **kwargs)
+
+    def insert_many(self, documents: List[dict], **kwargs):
+        return self.collection.insert_many([self.stamp(document) for document in documents], **kwargs)
+
+    def update_one(self, filter: dict, update: Any, **kwargs):
+        return self.collection.update_one(self.scope(filter), update, **kwargs)
+
+    def update_many(self, filter: dict, update: Any, **kwargs):
+        return self.collection.update_many(self.scope(filter), update, **kwargs)
+
+    def replace_one(self, filter: dict, replacement: dict, **kwargs):
+        return self.collection.replace_one(self.scope(filter), self.stamp(dict(replacement)), **kwargs)
+
+    def find_one_and_update(self, filter: dict, update: Any, *args, **kwargs) -> Optional[dict]:
+        return self.collection.find_one_and_update(self.scope(filter), update, *args, **kwargs)
+
+    def find_one_and_delete(self, filter: dict, *args, **kwargs) -> Optional[dict]:
+        return self.collection.find_one_and_delete(self.scope(filter), *args, **kwargs)
+
+    def delete_one(self, filter: dict, **kwargs):
+        return self.collection.delete_one(self.scope(filter), **kwargs)
+
+    def delete_many(self, filter: dict, **kwargs):
+        return self.collection.delete_many(self.scope(filter), **kwargs)
+
+    def bulk_write(self, requests: list, **kwargs):
+        return self.collection.bulk_write([self.scope_request(request) for request in requests], **kwargs)
+
+
+class TruckCollection(ScopedCollection):
+    """A pymongo collection restricted to the documents of one truck."""
+
+    def __init__(self, collection, truck_id: str, prefix_ids: bool = False):
+        super().__init__(collection, "truck_id", truck_id)
+        self.truck_id = truck_id
+        self.prefix_ids = prefix_ids
+
+    def scope(self, filter: Optional[dict] = None) -> dict:
+        scoped = super().scope(filter)
+        if self.prefix_ids and isinstance(scoped.get("_id"), str):
+            scoped["_id"] = truck_counter_id(self.truck_id, scoped["_id"])
+        return scoped
+
+    def stamp(self, document: dict) -> dict:
+        if self.prefix_ids and isinstance(document.get("_id"), str):
+            document["_id"] = truck_counter_id(self.truck_id, document["_id"])
+        return super().stamp(document)
+
+
+def truck_collections(collections: dict, truck_id: str) -> dict:
+    """Scope the partitioned collections of `collections` to one truck."""
+    return {
+        name: TruckCollection(collection, truck_id, prefix_ids=name == "counters")
+        if name in TRUCK_COLLECTIONS else collection
+        for name, collection in collections.items()
+    }
+
+
+def collections_truck(collections: dict) -> Optional[str]:
+    """Truck the collections are scoped to (None when unscoped)."""
+    return getattr(collections.get("counters"), "truck_id", None)
+
+
+def user_collections(collections: dict, user_id: Optional[str]) -> dict:
+    """Scope the carts and orders of `collections` to one user (None: anonymous ones)."""
+    return {
+        name: ScopedCollection(collection, "user_id", user_id) if name in USER_COLLECTIONS else collection
+        for name, collection in collections.items()
+    }
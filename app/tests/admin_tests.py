@@ -0,0 +1,68 @@
+import tracemalloc
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+import config
+from models.cart import CartModel
+from routes import admin
+
+ADMIN_HEADERS = {"X-Admin-Token": "secret"}
+
+# Setup test client
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    yield TestClient(app)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    admin.snapshots.clear()
+
+# Test cases
+def test_admin_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", None)
+    response = TestClient(app).get("/admin/memory/objects", headers=ADMIN_HEADERS)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin endpoints are disabled"
+
+def test_admin_rejects_wrong_token(client):
+    response = client.get("/admin/memory/objects", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Invalid admin token"
+
+def test_snapshot_requires_tracing(client):
+    response = client.post("/admin/memory/snapshots", headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "tracemalloc is not running"
+
+def test_start_snapshot_diff_stop(client):
+    response = client.post("/admin/memory/tracemalloc/start", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+
+    first = client.post("/admin/memory/snapshots", headers=ADMIN_HEADERS).json()
+    leak = [bytearray(1024) for _ in range(100)]
+    second = client.post("/admin/memory/snapshots", headers=ADMIN_HEADERS).json()
+    assert second["id"] == first["id"] + 1
+    assert "top" in second
+
+    response = client.get(
+        f"/admin/memory/diff?from_id={first['id']}&to_id={second['id']}",
+        headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 200
+    assert any(entry["size_diff_kb"] > 0 for entry in response.json()["top"])
+    del leak
+
+    response = client.post("/admin/memory/tracemalloc/stop", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert admin.snapshots == {}
+
+def test_diff_unknown_snapshot(client):
+    response = client.get("/admin/memory/diff?from_id=998&to_id=999", headers=ADMIN_HEADERS)
+    assert response.status_code == 404
+
+def test_object_counts_include_models(client):
+    carts = [CartModel(items=[], total_amount=0) for _ in range(3)]
+    response = client.get("/admin/memory/objects", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["models"]["CartModel"] >= 3
+    del carts
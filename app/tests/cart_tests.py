@@ -88,13 +88,14 @@ class MockCollection:
             for item in document["items"]:
                 menu_item = next(
                     (m for m in mock_get_collections()["menu"].data 
-                     if str(m["_id"]) == item["menu_item_id"]),
+                     if str(m["_id"]) == str(item["menu_item_id"])),
                     None
                 )
                 if menu_item:
                     options = [
                         opt for opt in mock_get_collections()["options"].data
                         if opt["name"] in item["selected_options"]
+                        or opt["_id"] in item["selected_options"]
                     ]
                     base_price = menu_item["price"]
                     options_total = sum(opt["price"] for opt in options)
@@ -115,13 +116,14 @@ class MockCollection:
                     for cart_item in update["$set"]["items"]:
                         menu_item = next(
                             (m for m in mock_get_collections()["menu"].data 
-                             if str(m["_id"]) == cart_item["menu_item_id"]),
+                             if str(m["_id"]) == str(cart_item["menu_item_id"])),
                             None
                         )
                         if menu_item:
                             options = [
                                 opt for opt in mock_get_collections()["options"].data
                                 if opt["name"] in cart_item["selected_options"]
+                        or opt["_id"] in cart_item["selected_options"]
                             ]
                             base_price = menu_item["price"]
                             options_total = sum(opt["price"] for opt in options)
@@ -147,12 +149,19 @@ class MockCollection:
                 break
         return type("DeleteResult", (), {"deleted_count": 1 if item_to_delete else 0})
 
+# Mock counters collection (the catalog version is never bumped here)
+class MockCounters:
+    def find_one(self, query):
+        return None
+
 # Mock database dependency
 def mock_get_collections():
     return {
         "menu": MockCollection([mock_menu_item_1.copy(), mock_menu_item_2.copy()]),
         "options": MockCollection(mock_options),
-        "carts": MockCollection([mock_cart.copy()])
+        "carts": MockCollection([mock_cart.copy()]),
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([])
     }
 
 # Setup test client
@@ -175,7 +184,9 @@ def test_get_cart_not_found(client):
     app.dependency_overrides[get_collections] = lambda: {
         "menu": MockCollection([mock_menu_item_1.copy()]),
         "options": MockCollection(mock_options),
-        "carts": MockCollection([])
+        "carts": MockCollection([]),
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([])
     }
     response = client.get("/cart/")
     assert response.status_code == 404
@@ -186,7 +197,9 @@ def test_add_to_cart_new_cart(client):
     app.dependency_overrides[get_collections] = lambda: {
         "menu": MockCollection([mock_menu_item_1.copy()]),
         "options": MockCollection(mock_options),
-        "carts": MockCollection([])
+        "carts": MockCollection([]),
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([])
     }
     
     new_item = {
@@ -263,3 +276,48 @@ def test_update_cart_item_not_found(client):
     response = client.put(f"/cart/items/{str(ObjectId())}", json=update_data)
     assert response.status_code == 404
     assert response.json()["detail"] == "Item not found in cart"
+
+def test_add_to_cart_stores_object_ids(client):
+    carts = MockCollection([])
+    app.dependency_overrides[get_collections] = lambda: {
+        "menu": MockCollection([mock_menu_item_1.copy()]),
+        "options": MockCollection(mock_options),
+        "carts": carts,
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([])
+    }
+    new_item = {
+        "menu_item_id": str(mock_menu_item_1["_id"]),
+        "quantity": 1,
+        "selected_options": ["Bacon"]
+    }
+    response = client.post("/cart/items", json=new_item)
+    assert response.status_code == 200
+    # Public API unchanged: string id and option names
+    item = response.json()["items"][0]
+    assert item["menu_item_id"] == str(mock_menu_item_1["_id"])
+    assert item["selected_options"] == ["Bacon"]
+    # Stored as ObjectId references
+    stored = carts.data[0]["items"][0]
+    assert stored["menu_item_id"] == mock_menu_item_1["_id"]
+    assert stored["selected_options"] == [mock_options[1]["_id"]]
+
+def test_add_to_cart_applies_pricing_rules(client):
+    rule = {"_id": ObjectId(), "name": "1 off pizzas", "type": "fixed", "menu_item_ids": [str(mock_menu_item_1["_id"])], "value": 1.0}
+    app.dependency_overrides[get_collections] = lambda: {
+        "menu": MockCollection([mock_menu_item_1.copy()]),
+        "options": MockCollection(mock_options),
+        "carts": MockCollection([]),
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([rule])
+    }
+    new_item = {
+        "menu_item_id": str(mock_menu_item_1["_id"]),
+        "quantity": 2,
+        "selected_options": ["Extra Cheese"]
+    }
+    response = client.post("/cart/items", json=new_item)
+    assert response.status_code == 200
+    cart = response.json()
+    assert cart["discount_amount"] == 2.0
+    assert cart["total_amount"] == pytest.approx(26.98, rel=1e-9)  # (12.99 + 1.50) * 2 - 2 * 1.00
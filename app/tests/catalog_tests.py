@@ -0,0 +1,153 @@
+import asyncio
+import re
+from datetime import datetime, UTC
+from bson import ObjectId
+from catalog import CatalogCache, CatalogEvents, bump_catalog_version, catalog_cache, catalog_events, etag_matches
+from catalog_watcher import CatalogWatcher
+from tenancy import truck_collections
+
+class CountingCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = 0
+
+    def find(self, filter=None):
+        self.calls += 1
+        return self.docs
+
+class MockCounters:
+    def __init__(self, seq=0):
+        self.data = {"catalog": {"_id": "catalog", "seq": seq, "updated_at": datetime.now(UTC)}}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def find(self, query, projection=None):
+        return [counter for _id, counter in self.data.items() if re.search(query["_id"]["$regex"], _id)]
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {**query, "seq": 0})
+        counter["seq"] += update["$inc"]["seq"]
+        counter.update(update["$set"])
+        return counter
+
+def make_collections(menu=None, options=None, seq=0):
+    return {
+        "menu": CountingCollection(menu or []),
+        "options": CountingCollection(options or []),
+        "counters": MockCounters(seq)
+    }
+
+def get(cache, name, collections):
+    return asyncio.run(cache.get(name, collections))
+
+# Test cases
+def test_get_converts_ids_renders_body_and_caches():
+    option = {"_id": ObjectId(), "name": "Bacon", "price": 2.0}
+    collections = make_collections(options=[option], seq=7)
+    cache = CatalogCache(ttl=60)
+    first = get(cache, "options", collections)
+    second = get(cache, "options", collections)
+    assert first is second
+    assert first["items"][0]["id"] == str(option["_id"])
+    assert b'"name":"Bacon"' in first["body"]
+    assert first["etag"] == '"options-7"'
+    assert collections["options"].calls == 1
+
+def test_expired_entry_is_reloaded():
+    collections = make_collections()
+    cache = CatalogCache(ttl=0)
+    get(cache, "menu", collections)
+    get(cache, "menu", collections)
+    assert collections["menu"].calls == 2
+
+def test_invalidate_one_entry():
+    collections = make_collections()
+    cache = CatalogCache(ttl=60)
+    get(cache, "menu", collections)
+    get(cache, "options", collections)
+    cache.invalidate("menu")
+    get(cache, "menu", collections)
+    get(cache, "options", collections)
+    assert collections["menu"].calls == 2
+    assert collections["options"].calls == 1
+
+def test_load_interrupted_by_write_is_not_stored():
+    cache = CatalogCache(ttl=60)
+    collections = make_collections()
+
+    class InvalidatingCollection:
+        def find(self):
+            cache.invalidate("menu")
+            return []
+
+    collections["menu"] = InvalidatingCollection()
+    get(cache, "menu", collections)
+    assert cache.stats() == {}
+
+def test_stats_report_freshness():
+    cache = CatalogCache(ttl=60)
+    assert cache.stats() == {}
+    get(cache, "options", make_collections(options=[{"_id": ObjectId(), "name": "Bacon", "price": 2.0}]))
+    stats = cache.stats()["options"]
+    assert stats["items"] == 1
+    assert stats["fresh"] is True
+
+def test_bump_catalog_version():
+    collections = make_collections(seq=3)
+    assert bump_catalog_version(collections) == 4
+    assert bump_catalog_version(collections) == 5
+
+def test_etag_matches():
+    assert etag_matches('"menu-3"', '"menu-3"')
+    assert etag_matches('"menu-1", W/"menu-3"', '"menu-3"')
+    assert etag_matches("*", '"menu-3"')
+    assert not etag_matches('"menu-2"', '"menu-3"')
+
+def test_events_keep_only_the_latest_version():
+    async def scenario():
+        events = CatalogEvents(max_subscribers=1)
+        queue = events.subscribe("food-1")
+        assert events.subscribe("food-1") is None
+        events.publish("food-1", 3)
+        events.publish("food-1", 5)
+        # Older versions and other trucks are ignored
+        events.publish("food-1", 4)
+        events.publish("food-2", 9)
+        assert queue.qsize() == 1
+        assert await queue.get() == 5
+        events.unsubscribe("food-1", queue)
+        assert events.subscriber_count() == 0
+    asyncio.run(scenario())
+
+def test_watcher_invalidates_on_new_version():
+    raw = make_collections()
+    collections = truck_collections(raw, "food-1")
+    other_truck = truck_collections(raw, "food-2")
+    bump_catalog_version(collections)
+    watcher = CatalogWatcher(poll_interval=1)
+    watcher._collections = raw
+    assert watcher.poll_once()
+    get(catalog_cache, "menu", collections)
+    get(catalog_cache, "menu", other_truck)
+
+    # Unchanged version: the cached menus are kept
+    assert not watcher.poll_once()
+    get(catalog_cache, "menu", collections)
+    assert raw["menu"].calls == 2
+
+    # A write to the first truck through another worker
+    bump_catalog_version(collections)
+    assert watcher.poll_once()
+    assert catalog_events.versions == {"food-1": 2}
+    get(catalog_cache, "menu", collections)
+    get(catalog_cache, "menu", other_truck)
+    assert raw["menu"].calls == 3
+
+def test_cache_is_per_truck():
+    raw = make_collections(menu=[{"_id": ObjectId(), "name": "Burger", "price": 10.0}])
+    first = get(catalog_cache, "menu", truck_collections(raw, "food-1"))
+    second = get(catalog_cache, "menu", truck_collections(raw, "food-2"))
+    assert first is not second
+    catalog_cache.invalidate("menu", "food-1")
+    assert set(catalog_cache.stats()) == {"food-2:menu"}
@@ -1,6 +1,22 @@
 import os
 import sys
+import pytest
 
 # Add the app directory to the Python path
 app_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-sys.path.insert(0, app_path) 
\ No newline at end of file
+sys.path.insert(0, app_path)
+
+from catalog import catalog_cache, catalog_events, settled_versions
+from order_events import order_events
+from user_orders import active_orders
+
+# The catalog cache is per process, start every test from an empty one
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    catalog_cache.invalidate()
+    catalog_events.versions.clear()
+    settled_versions.clear()
+    order_events.pending.clear()
+    active_orders.invalidate()
+    yield
+    catalog_cache.invalidate()
@@ -0,0 +1,52 @@
+import pytest
+import mongomock
+import database
+
+@pytest.fixture(autouse=True)
+def fresh_client():
+    database.close_client()
+    yield
+    database.close_client()
+
+# Test cases
+def test_client_is_shared_within_process():
+    assert database.get_client() is database.get_client()
+
+def test_close_client_opens_new_pool_next_time():
+    first = database.get_client()
+    database.close_client()
+    assert database.get_client() is not first
+
+def test_client_is_forgotten_after_fork():
+    first = database.get_client()
+    database._forget_client_after_fork()
+    assert database._client is None
+    assert database.get_client() is not first
+    first.close()
+
+def test_ttl_index_is_created_then_changed_in_place(monkeypatch):
+    db = mongomock.MongoClient().db
+    commands = []
+    monkeypatch.setattr(db, "command", lambda *args, **kwargs: commands.append((args, kwargs)))
+    database.ensure_ttl_index(db["carts"], "updated_at", 60)
+    assert db["carts"].index_information()["updated_at_1"]["expireAfterSeconds"] == 60
+
+    # Same delay: nothing to do; another one: collMod instead of a conflicting create_index
+    database.ensure_ttl_index(db["carts"], "updated_at", 60)
+    assert commands == []
+    database.ensure_ttl_index(db["carts"], "updated_at", 120)
+    assert commands == [(
+        ("collMod", "carts"),
+        {"index": {"keyPattern": {"updated_at": 1}, "expireAfterSeconds": 120}}
+    )]
+
+def test_timeseries_retention_is_changed_in_place(monkeypatch):
+    db = mongomock.MongoClient().db
+    commands = []
+    collections = [{"name": "order_events", "options": {"expireAfterSeconds": 60}}]
+    monkeypatch.setattr(db, "list_collections", lambda filter: iter(collections))
+    monkeypatch.setattr(db, "command", lambda *args, **kwargs: commands.append((args, kwargs)))
+    database.ensure_timeseries_expiry(db, "order_events", 60)
+    assert commands == []
+    database.ensure_timeseries_expiry(db, "order_events", 120)
+    assert commands == [(("collMod", "order_events"), {"expireAfterSeconds": 120})]
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+import config
+from routes import health
+
+# Setup test client with a fake ping counting its calls
+@pytest.fixture
+def pings(monkeypatch):
+    calls = {"count": 0, "ok": True}
+
+    def fake_ping():
+        calls["count"] += 1
+        if calls["ok"]:
+            return {"ok": True, "latency_ms": 0.5}
+        return {"ok": False, "error": "timed out"}
+
+    monkeypatch.setattr(health, "ping_database", fake_ping)
+    monkeypatch.setattr(config, "READINESS_CACHE_TTL", 60)
+    health._last_check.update(checked_at=None, result=None)
+    yield calls
+    health._last_check.update(checked_at=None, result=None)
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+# Test cases
+def test_healthz(client):
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+def test_readyz_ready(client, pings):
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["database"]["cached"] is False
+    assert set(body["pool"]) == {"open", "in_use", "waiting"}
+    assert "catalog_cache" in body
+    assert body["catalog_watcher"]["subscribers"] == 0
+
+def test_readyz_caches_ping(client, pings):
+    client.get("/readyz")
+    response = client.get("/readyz")
+    assert response.json()["database"]["cached"] is True
+    assert pings["count"] == 1
+
+def test_readyz_rechecks_after_ttl(client, pings, monkeypatch):
+    client.get("/readyz")
+    monkeypatch.setattr(config, "READINESS_CACHE_TTL", 0)
+    client.get("/readyz")
+    assert pings["count"] == 2
+
+def test_readyz_unavailable(client, pings):
+    pings["ok"] = False
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+    assert response.json()["database"]["error"] == "timed out"
@@ -0,0 +1,196 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from main import app
+from database import get_collections
+import config
+
+# Mock data
+mock_options = [
+    {"_id": ObjectId(), "name": "Extra Cheese", "price": 1.5}
+]
+
+# Collections written to, in order
+writes = []
+
+# Mock Collection class supporting the calls made by the importer
+class MockCollection:
+    def __init__(self, data=None, fail_names=()):
+        self.data = data or []
+        self.fail_names = set(fail_names)
+        self.batches = []
+
+    def distinct(self, field):
+        return list({item[field] for item in self.data})
+
+    def find(self, query):
+        return [item for item in self.data if item["name"] in query["name"]["$in"]]
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(len(operations))
+        writes.append(self)
+        upserted, modified, errors = 0, 0, []
+        for index, operation in enumerate(operations):
+            name = operation._filter["name"]
+            if name in self.fail_names:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+                continue
+            existing = next((item for item in self.data if item["name"] == name), None)
+            if existing:
+                existing.update(operation._doc["$set"])
+                modified += 1
+            else:
+                self.data.append({"_id": ObjectId(), **operation._doc["$set"]})
+                upserted += 1
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "nUpserted": upserted, "nModified": modified, "nMatched": modified
+            })
+        return type("BulkWriteResult", (), {
+            "upserted_count": upserted, "modified_count": modified, "matched_count": modified
+        })
+
+class MockCounters:
+    def __init__(self):
+        self.seq = 0
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.seq += 1
+        return {"_id": query["_id"], "seq": self.seq}
+
+@pytest.fixture
+def collections():
+    writes.clear()
+    return {
+        "menu": MockCollection(),
+        "options": MockCollection([option.copy() for option in mock_options]),
+        "counters": MockCounters()
+    }
+
+# Setup test client
+@pytest.fixture
+def client(collections):
+    app.dependency_overrides[get_collections] = lambda: collections
+    return TestClient(app)
+
+def ndjson(rows):
+    return "\n".join(json.dumps(row) for row in rows) + "\n"
+
+# Test cases
+def test_import_ndjson(client, collections):
+    body = ndjson([
+        {"type": "option", "name": "Bacon", "price": 2.0},
+        {"type": "menu_item", "name": "Burger", "price": 10.5, "options": ["Bacon", "Extra Cheese"]},
+        {"type": "menu_item", "name": "Fries", "price": 4.0}
+    ])
+    response = client.post("/menu/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["rows"] == 3
+    assert result["options"]["upserted"] == 1
+    assert result["menu"]["upserted"] == 2
+    assert result["errors"] == []
+    assert {item["name"] for item in collections["menu"].data} == {"Burger", "Fries"}
+
+def test_import_json_array_reports_row_errors(client, collections):
+    rows = [
+        {"type": "menu_item", "name": "Burger", "price": 10.5, "options": ["Unknown"]},
+        {"type": "option", "name": "Bacon", "price": -1},
+        {"type": "menu_item", "name": "Fries", "price": 4.0},
+        {"type": "menu_item", "name": "Fries", "price": 4.5},
+        {"type": "dessert", "name": "Cake"}
+    ]
+    response = client.post("/menu/import", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["menu"]["upserted"] == 1
+    errors = {error["row"]: error["error"] for error in result["errors"]}
+    assert errors[1] == "Option(s) not found: Unknown"
+    assert errors[2].startswith("price")
+    assert errors[4] == "Duplicate name 'Fries' in import"
+    assert 5 in errors
+
+def test_import_updates_existing_by_name(client, collections):
+    response = client.post("/menu/import", json=[{"type": "option", "name": "Extra Cheese", "price": 1.75}])
+    result = response.json()
+    assert result["options"] == {"upserted": 0, "modified": 1, "unchanged": 0}
+    assert collections["options"].data[0]["price"] == 1.75
+
+def test_reimport_leaves_unchanged_rows_alone(client, collections):
+    rows = [
+        {"type": "option", "name": "Extra Cheese", "price": 1.5},
+        {"type": "menu_item", "name": "Burger", "price": 10.5, "options": ["Extra Cheese"]}
+    ]
+    client.post("/menu/import", json=rows)
+    seq = collections["menu"].data[0]["seq"]
+    rows[1]["price"] = 11.0
+    result = client.post("/menu/import", json=rows).json()
+    assert result["options"] == {"upserted": 0, "modified": 0, "unchanged": 1}
+    assert result["menu"] == {"upserted": 0, "modified": 1, "unchanged": 0}
+    assert collections["menu"].data[0]["seq"] > seq
+    # The option is already stored as imported, so it was never written
+    assert collections["options"].batches == []
+    result = client.post("/menu/import", json=rows).json()
+    assert result["menu"] == {"upserted": 0, "modified": 0, "unchanged": 1}
+
+def test_import_invalid_ndjson_line(client):
+    body = '{"type": "option", "name": "Bacon", "price": 2.0}\nnot json\n'
+    response = client.post("/menu/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    result = response.json()
+    assert result["options"]["upserted"] == 1
+    assert result["errors"] == [{"row": 2, "type": None, "name": None, "error": "Invalid JSON"}]
+
+def test_import_writes_in_batches(client, collections, monkeypatch):
+    monkeypatch.setattr(config, "IMPORT_BATCH_SIZE", 2)
+    rows = [{"type": "menu_item", "name": f"Item {i}", "price": 5.0} for i in range(5)]
+    response = client.post("/menu/import", json=rows)
+    assert response.json()["menu"]["upserted"] == 5
+    assert collections["menu"].batches == [2, 2, 1]
+
+def test_import_reports_write_errors(client, collections):
+    collections["menu"].fail_names = {"Burger"}
+    rows = [
+        {"type": "menu_item", "name": "Burger", "price": 10.5},
+        {"type": "menu_item", "name": "Fries", "price": 4.0}
+    ]
+    result = client.post("/menu/import", json=rows).json()
+    assert result["menu"]["upserted"] == 1
+    assert result["errors"][0]["row"] == 1
+    assert result["errors"][0]["name"] == "Burger"
+
+def test_import_rejects_unsupported_content_type(client):
+    response = client.post("/menu/import", content="a,b", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 415
+
+def test_import_writes_options_before_menu_items(client, collections, monkeypatch):
+    monkeypatch.setattr(config, "IMPORT_BATCH_SIZE", 2)
+    collections["options"].fail_names = {"Ketchup"}
+    rows = [
+        {"type": "option", "name": "Bacon", "price": 2.0},
+        {"type": "option", "name": "Onions", "price": 0.5},
+        {"type": "option", "name": "Ketchup", "price": 0.2},
+        {"type": "menu_item", "name": "Burger", "price": 10.5, "options": ["Onions"]},
+        {"type": "menu_item", "name": "Hot Dog", "price": 6.0, "options": ["Ketchup"]},
+        {"type": "menu_item", "name": "Fries", "price": 4.0, "options": ["Extra Cheese"]}
+    ]
+    result = client.post("/menu/import", json=rows).json()
+    # The pending Ketchup was written (and failed) before the first menu batch
+    assert writes == [collections["options"], collections["options"], collections["menu"], collections["menu"]]
+    assert {item["name"] for item in collections["menu"].data} == {"Burger", "Fries"}
+    errors = {error["row"]: error["error"] for error in result["errors"]}
+    assert errors[5] == "Option(s) not written: Ketchup"
+
+def test_import_ndjson_lines_across_chunks(client, collections, monkeypatch):
+    body = ndjson([
+        {"type": "option", "name": "Bacon", "price": 2.0},
+        {"type": "menu_item", "name": "Burger", "price": 10.5, "options": ["Bacon"]}
+    ]).encode()
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    response = client.post("/menu/import", content=iter(chunks), headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["menu"]["upserted"] == 1
+
+    monkeypatch.setattr(config, "IMPORT_MAX_LINE_BYTES", 40)
+    response = client.post("/menu/import", content=iter(chunks), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
@@ -0,0 +1,296 @@
+import pytest
+from fastapi.testclient import TestClient
+from bson import ObjectId
+from datetime import datetime, UTC
+from main import app
+from database import get_collections
+import inventory
+from routes import order as order_routes
+
+# Mock data
+burger = {"_id": ObjectId(), "name": "Burger", "price": 10.0, "options": ["Bacon"], "available": True}
+fries = {"_id": ObjectId(), "name": "Fries", "price": 4.0, "options": [], "available": True}
+bacon = {"_id": ObjectId(), "name": "Bacon", "price": 2.0}
+
+def cart_line(menu_item, quantity, *options):
+    return {
+        "menu_item_id": menu_item["_id"],
+        "quantity": quantity,
+        "selected_options": [option["_id"] for option in options],
+        "special_instructions": None,
+        "total_price": 0
+    }
+
+# Mock collection supporting the queries of the inventory and order routes
+class MockCollection:
+    def __init__(self, data=None):
+        self.data = data or []
+
+    def matches(self, document, query):
+        for field, condition in query.items():
+            if isinstance(condition, dict) and "$in" in condition:
+                if document.get(field) not in condition["$in"]:
+                    return False
+            elif isinstance(document.get(field), list):
+                if condition not in document[field]:
+                    return False
+            elif document.get(field) != condition:
+                return False
+        return True
+
+    def find(self, query=None, projection=None):
+        return [document for document in self.data if self.matches(document, query or {})]
+
+    def find_one(self, query=None, projection=None, sort=None):
+        documents = self.find(query)
+        if sort:
+            documents = sorted(documents, key=lambda document: document[sort[0][0]])[-1:]
+        return documents[0] if documents else None
+
+    def insert_one(self, document):
+        document["_id"] = ObjectId()
+        self.data.append({**document})
+        return type("InsertOneResult", (), {"inserted_id": document["_id"]})
+
+    def find_one_and_update(self, query, update, return_document=None):
+        document = self.find_one(query)
+        if document:
+            document.update(update["$set"])
+        return document
+
+    def update_many(self, query, update):
+        documents = self.find(query)
+        for document in documents:
+            document.update(update.get("$set", {}))
+            for field in update.get("$unset", {}):
+                document.pop(field, None)
+        return type("UpdateResult", (), {"modified_count": len(documents)})
+
+    def delete_one(self, query):
+        document = self.find_one(query)
+        if document:
+            self.data.remove(document)
+        return type("DeleteResult", (), {"deleted_count": 1 if document else 0})
+
+# Mock inventory collection: shard upserts, conditional $inc updates and reservation tags
+class MockInventory(MockCollection):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.before_write = None
+
+    def bulk_write(self, operations, ordered=True):
+        if self.before_write:
+            # Simulate a concurrent order between the read and the write
+            self.before_write, before_write = None, self.before_write
+            before_write()
+        self.batches.append(len(operations))
+        matched = sum(self.apply(operation._filter, operation._doc, operation._upsert) for operation in operations)
+        return type("BulkWriteResult", (), {"matched_count": matched})
+
+    def apply(self, query, update, upsert):
+        shard = next((doc for doc in self.data if doc["_id"] == query["_id"]), None)
+        if shard is None and not upsert:
+            return 0
+        if shard and shard["stock"] < query.get("stock", {}).get("$gte", 0):
+            return 0
+        if shard is None:
+            shard = {"_id": query["_id"], "stock": 0}
+            self.data.append(shard)
+        shard.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            shard[field] += amount
+        for field, push in update.get("$push", {}).items():
+            shard[field] = (shard.get(field, []) + push["$each"])[push["$slice"]:]
+        return 1
+
+    def delete_many(self, query):
+        documents = self.find(query)
+        for document in documents:
+            self.data.remove(document)
+        return type("DeleteResult", (), {"deleted_count": len(documents)})
+
+# Mock time-series collection of order events
+class MockEvents:
+    def __init__(self):
+        self.data = []
+
+    def insert_many(self, documents, ordered=True):
+        self.data.extend(documents)
+
+# Mock counters collection holding the catalog version
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, amount in update.get("$inc", {}).items():
+            counter[field] = counter.get(field, 0) + amount
+        return counter
+
+@pytest.fixture
+def collections():
+    return {
+        "menu": MockCollection([burger.copy(), fries.copy()]),
+        "options": MockCollection([bacon.copy()]),
+        "carts": MockCollection([]),
+        "orders": MockCollection([]),
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([]),
+        "inventory": MockInventory(),
+        "order_events": MockEvents()
+    }
+
+def stock(collections, item):
+    return sum(shard["stock"] for shard in collections["inventory"].find({"item_id": item["_id"]}))
+
+# Test cases
+def test_set_stock_spreads_over_shards(collections):
+    inventory.set_stock("menu", burger["_id"], 10, collections)
+    shards = collections["inventory"].find({"item_id": burger["_id"]})
+    assert sorted(shard["stock"] for shard in shards) == [2, 2, 3, 3]
+    assert inventory.stock_levels(collections) == [{"kind": "menu", "item_id": str(burger["_id"]), "stock": 10}]
+
+def test_reserve_in_one_bulk_write(collections):
+    inventory.set_stock("menu", burger["_id"], 10, collections)
+    inventory.set_stock("options", bacon["_id"], 3, collections)
+    collections["inventory"].batches = []
+
+    # Fries are not tracked: unlimited
+    reservations = inventory.reserve([cart_line(burger, 3, bacon), cart_line(fries, 5)], collections)
+    assert stock(collections, burger) == 7
+    assert stock(collections, bacon) == 0
+    assert sum(reservation["quantity"] for reservation in reservations) == 6
+    assert len(collections["inventory"].batches) == 1
+
+    inventory.release(reservations, collections)
+    assert stock(collections, burger) == 10
+    assert stock(collections, bacon) == 3
+
+def test_reserve_not_enough_stock(collections):
+    inventory.set_stock("menu", burger["_id"], 2, collections)
+    with pytest.raises(Exception) as error:
+        inventory.reserve([cart_line(burger, 3)], collections)
+    assert error.value.status_code == 409
+    assert error.value.detail == "Not enough stock for: Burger"
+    assert stock(collections, burger) == 2
+
+def test_reserve_retries_after_concurrent_update(collections):
+    inventory.set_stock("menu", burger["_id"], 8, collections)
+
+    def concurrent_order():
+        for shard in collections["inventory"].data:
+            shard["stock"] -= 1
+
+    collections["inventory"].batches = []
+    collections["inventory"].before_write = concurrent_order
+    reservations = inventory.reserve([cart_line(burger, 3)], collections)
+    # The first attempt failed on some shards, was compensated, then retried
+    assert len(collections["inventory"].batches) >= 3
+    assert sum(reservation["quantity"] for reservation in reservations) == 3
+    assert stock(collections, burger) == 1
+    assert all(shard["stock"] >= 0 for shard in collections["inventory"].data)
+    # A failed condition never creates a shard
+    assert len(collections["inventory"].data) == 4
+    assert all("item_id" in shard for shard in collections["inventory"].data)
+    assert collections["menu"].find_one({"_id": burger["_id"]})["available"] is True
+
+def test_sold_out_and_restock(collections):
+    inventory.set_stock("menu", burger["_id"], 2, collections)
+    reservations = inventory.reserve([cart_line(burger, 2)], collections)
+    menu_item = collections["menu"].find_one({"_id": burger["_id"]})
+    assert menu_item["available"] is False
+    assert menu_item["sold_out"] is True
+    seq = menu_item["seq"]
+
+    inventory.release(reservations, collections)
+    menu_item = collections["menu"].find_one({"_id": burger["_id"]})
+    assert menu_item["available"] is True
+    assert "sold_out" not in menu_item
+    # Both flips show up in delta syncs
+    assert menu_item["seq"] > seq
+
+def test_sold_out_by_concurrent_order(collections, monkeypatch):
+    inventory.set_stock("menu", burger["_id"], 3, collections)
+    planned = []
+    plan_reservation = inventory.plan_reservation
+
+    def plan(needs, shards):
+        plan, short = plan_reservation(needs, shards)
+        planned.extend(shard for shard, _, _ in plan)
+        return plan, short
+
+    def concurrent_order():
+        # Takes every unit but the one planned by this order
+        for shard in collections["inventory"].data:
+            if shard["_id"] not in planned:
+                shard["stock"] = 0
+
+    monkeypatch.setattr(inventory, "plan_reservation", plan)
+    collections["inventory"].before_write = concurrent_order
+    inventory.reserve([cart_line(burger, 1)], collections)
+    assert stock(collections, burger) == 0
+    assert collections["menu"].find_one({"_id": burger["_id"]})["sold_out"] is True
+
+def test_restock_keeps_items_disabled_by_hand(collections):
+    collections["menu"].find_one({"_id": fries["_id"]})["available"] = False
+    inventory.set_stock("menu", fries["_id"], 5, collections)
+    assert collections["menu"].find_one({"_id": fries["_id"]})["available"] is False
+
+# Route tests
+@pytest.fixture
+def client(collections):
+    app.dependency_overrides[get_collections] = lambda: collections
+    return TestClient(app)
+
+def test_stock_routes(client):
+    response = client.put(f"/inventory/menu/{burger['_id']}", json={"stock": 5})
+    assert response.status_code == 200
+    assert response.json() == {"kind": "menu", "item_id": str(burger["_id"]), "stock": 5}
+    assert client.get(f"/inventory/menu/{burger['_id']}").json()["stock"] == 5
+    assert len(client.get("/inventory/").json()) == 1
+
+    assert client.delete(f"/inventory/menu/{burger['_id']}").status_code == 200
+    assert client.get(f"/inventory/menu/{burger['_id']}").status_code == 404
+
+def test_stock_routes_invalid(client):
+    assert client.put(f"/inventory/menu/{bacon['_id']}", json={"stock": 5}).status_code == 404
+    assert client.put("/inventory/menu/not-an-id", json={"stock": 5}).status_code == 400
+    assert client.put(f"/inventory/drinks/{burger['_id']}", json={"stock": 5}).status_code == 422
+    assert client.put(f"/inventory/menu/{burger['_id']}", json={"stock": -1}).status_code == 422
+
+def test_order_reserves_and_cancel_returns_stock(client, collections):
+    inventory.set_stock("menu", burger["_id"], 4, collections)
+    cart = {"items": [cart_line(burger, 3, bacon)], "created_at": datetime.now(UTC)}
+
+    collections["carts"].insert_one({**cart})
+    response = client.post("/orders/")
+    assert response.status_code == 200
+    assert stock(collections, burger) == 1
+
+    # Not enough left for a second order, which is not created
+    collections["carts"].insert_one({**cart})
+    response = client.post("/orders/")
+    assert response.status_code == 409
+    assert len(collections["orders"].data) == 1
+
+    order_id = collections["orders"].data[0]["_id"]
+    assert client.post(f"/orders/{order_id}/cancel").status_code == 200
+    assert stock(collections, burger) == 4
+
+def test_order_numbering_failure_returns_stock(client, collections, monkeypatch):
+    inventory.set_stock("menu", burger["_id"], 4, collections)
+    collections["carts"].insert_one({"items": [cart_line(burger, 3)], "created_at": datetime.now(UTC)})
+
+    def failing_order_number(collections):
+        raise RuntimeError("counters unavailable")
+
+    monkeypatch.setattr(order_routes, "generate_order_number", failing_order_number)
+    with pytest.raises(RuntimeError):
+        client.post("/orders/")
+    assert stock(collections, burger) == 4
+    assert collections["orders"].data == []
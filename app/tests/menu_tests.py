@@ -1,11 +1,16 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from bson import ObjectId
-from datetime import datetime
+import time
+from datetime import datetime, UTC
 from pymongo.errors import DuplicateKeyError
 from main import app
 from database import get_collections
 from schemas.menu import MenuItemCreate, MenuItemUpdate
+from routes.menu import build_menu_query, catalog_event_stream
+from catalog import catalog_events
+import config
 
 # Mock data
 mock_menu_item_1 = {
@@ -41,6 +46,11 @@ mock_options = [
     }
 ]
 
+# Mock cursor supporting sort on a single field
+class MockCursor(list):
+    def sort(self, field, direction=1):
+        return MockCursor(sorted(self, key=lambda item: item.get(field, 0), reverse=direction == -1))
+
 # Mock Collection class
 class MockCollection:
     def __init__(self, data=None):
@@ -51,7 +61,13 @@ class MockCollection:
             # Handle options query for validation
             valid_names = set(query["name"]["$in"])
             return [item for item in self.data if item["name"] in valid_names]
-        return self.data
+        if query and "_id" in query and "$in" in query["_id"]:
+            # Handle multi-get query
+            return [item for item in self.data if item["_id"] in query["_id"]["$in"]]
+        if query and "seq" in query:
+            # Handle delta sync query
+            return MockCursor(item for item in self.data if item.get("seq", 0) > query["seq"]["$gt"])
+        return MockCursor(self.data)
 
     def find_one(self, query):
         if "_id" in query:
@@ -84,16 +100,61 @@ class MockCollection:
         self.data = [item for item in self.data if item["_id"] != query["_id"]]
         return type("DeleteResult", (), {"deleted_count": initial_length - len(self.data)})
 
+    def update_many(self, query, update):
+        items = [
+            item for item in self.data
+            if item["_id"] in query["_id"]["$in"] and item.get("available") != query["available"]["$ne"]
+        ]
+        for item in items:
+            item.update(update["$set"])
+            for field in update.get("$unset", {}):
+                item.pop(field, None)
+        return type("UpdateResult", (), {"matched_count": len(items), "modified_count": len(items)})
+
+# Mock counters collection holding the catalog version
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, amount in update.get("$inc", {}).items():
+            counter[field] = counter.get(field, 0) + amount
+        counter.update(update.get("$set", {}))
+        return counter
+
+mock_counters = MockCounters()
+
+# Mock tombstones collection shared across requests
+class MockTombstones:
+    def __init__(self):
+        self.data = []
+
+    def insert_one(self, document):
+        self.data.append(document)
+
+    def find(self, query):
+        return MockCursor(item for item in self.data if item["seq"] > query["seq"]["$gt"])
+
+mock_tombstones = MockTombstones()
+
 # Mock database dependency
 def mock_get_collections():
     return {
         "menu": MockCollection([mock_menu_item_1.copy(), mock_menu_item_2.copy()]),
-        "options": MockCollection(mock_options)  # Include mock options for validation
+        "options": MockCollection(mock_options),  # Include mock options for validation
+        "counters": mock_counters,
+        "tombstones": mock_tombstones
     }
 
 # Setup test client
 @pytest.fixture
 def client():
+    mock_counters.data = {}
+    mock_tombstones.data = []
     app.dependency_overrides[get_collections] = mock_get_collections
     return TestClient(app)
 
@@ -106,6 +167,13 @@ def test_get_menu_items(client):
     assert menu_items[0]["name"] == "Margherita Pizza"
     assert menu_items[1]["name"] == "Pepperoni Pizza"
 
+def test_get_menu_items_page(client):
+    response = client.get("/menu/?limit=1")
+    assert [item["name"] for item in response.json()] == ["Margherita Pizza"]
+    assert "etag" in response.headers
+    response = client.get("/menu/?skip=1&limit=5")
+    assert [item["name"] for item in response.json()] == ["Pepperoni Pizza"]
+
 def test_get_menu_item_by_id(client):
     menu_item_id = str(mock_menu_item_1["_id"])
     response = client.get(f"/menu/{menu_item_id}")
@@ -210,4 +278,232 @@ def test_delete_menu_item(client):
 def test_delete_menu_item_not_found(client):
     response = client.delete(f"/menu/{str(ObjectId())}")
     assert response.status_code == 400
-    assert response.json()["detail"] == "Invalid menu item ID" 
\ No newline at end of file
+    assert response.json()["detail"] == "Invalid menu item ID" 
+def test_get_menu_items_returns_validators(client):
+    response = client.get("/menu/")
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"menu-0"'
+
+def test_get_menu_items_not_modified(client):
+    etag = client.get("/menu/").headers["etag"]
+    response = client.get("/menu/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_get_menu_item_not_modified(client):
+    menu_item_id = str(mock_menu_item_1["_id"])
+    etag = client.get(f"/menu/{menu_item_id}").headers["etag"]
+    response = client.get(f"/menu/{menu_item_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_write_changes_etag(client):
+    etag = client.get("/menu/").headers["etag"]
+    client.put(f"/menu/{str(mock_menu_item_1['_id'])}", json={"price": 15.99})
+    response = client.get("/menu/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "last-modified" in response.headers
+
+def test_get_changes_full_sync(client):
+    response = client.get("/menu/changes")
+    assert response.status_code == 200
+    changes = response.json()
+    assert len(changes["menu"]) == 2
+    assert len(changes["options"]) == 2
+    assert changes["deleted"] == {"menu": [], "options": []}
+
+def test_get_changes_since_returns_only_changed(client):
+    menu_item_id = str(mock_menu_item_1["_id"])
+    app.dependency_overrides[get_collections] = lambda: {
+        **mock_get_collections(),
+        "menu": MockCollection([
+            {**mock_menu_item_1, "price": 15.99, "seq": 5},
+            {**mock_menu_item_2, "seq": 2}
+        ])
+    }
+    changes = client.get("/menu/changes?since=4").json()
+    assert [item["id"] for item in changes["menu"]] == [menu_item_id]
+    assert changes["menu"][0]["price"] == 15.99
+    assert changes["options"] == []
+    assert changes["next_since"] == 5
+
+def test_get_changes_reports_deletions(client, monkeypatch):
+    monkeypatch.setattr(config, "CATALOG_CHANGES_SETTLE_SECONDS", 0)
+    client.put(f"/menu/{str(mock_menu_item_2['_id'])}", json={"price": 9.99})
+    since = mock_counters.data["catalog"]["seq"]
+    menu_item_id = str(mock_menu_item_1["_id"])
+    client.delete(f"/menu/{menu_item_id}")
+    changes = client.get(f"/menu/changes?since={since}").json()
+    assert changes["deleted"]["menu"] == [menu_item_id]
+    assert changes["next_since"] > since
+
+def test_get_changes_next_since_trails_recent_writes(client, monkeypatch):
+    # Seq 6 committed, seq 5 may still be in flight on another worker
+    mock_counters.data["catalog"] = {"_id": "catalog", "seq": 6, "updated_at": datetime.now(UTC)}
+    app.dependency_overrides[get_collections] = lambda: {
+        **mock_get_collections(),
+        "menu": MockCollection([{**mock_menu_item_1, "seq": 6}])
+    }
+    changes = client.get("/menu/changes?since=4").json()
+    assert len(changes["menu"]) == 1
+    assert changes["next_since"] == 4
+    # Once the version seen has settled, the sync moves on
+    clock = time.time()
+    monkeypatch.setattr(time, "time", lambda: clock + config.CATALOG_CHANGES_SETTLE_SECONDS + 1)
+    assert client.get("/menu/changes?since=4").json()["next_since"] == 6
+
+def test_get_changes_rejects_negative_since(client):
+    response = client.get("/menu/changes?since=-1")
+    assert response.status_code == 422
+
+# Mock collection recording the search query and cursor operations
+class RecordingCursor(list):
+    def __init__(self, data, calls):
+        super().__init__(data)
+        self.calls = calls
+
+    def sort(self, keys):
+        self.calls["sort"] = keys
+        return self
+
+    def skip(self, count):
+        self.calls["skip"] = count
+        return self
+
+    def limit(self, count):
+        self.calls["limit"] = count
+        return self
+
+class RecordingCollection:
+    def __init__(self, data):
+        self.data = data
+        self.calls = {}
+
+    def find(self, query=None, projection=None):
+        self.calls["query"] = query
+        self.calls["projection"] = projection
+        return RecordingCursor(self.data, self.calls)
+
+def test_build_menu_query():
+    query = build_menu_query(
+        q="pizza", category="Pizza", available=True, min_price=10, max_price=14, options=["Bacon"]
+    )
+    assert query == {
+        "$text": {"$search": "pizza"},
+        "category": "Pizza",
+        "available": True,
+        "price": {"$gte": 10, "$lte": 14},
+        "options": {"$all": ["Bacon"]}
+    }
+    assert build_menu_query() == {}
+
+def test_search_menu_items_by_text(client):
+    menu = RecordingCollection([mock_menu_item_1.copy()])
+    app.dependency_overrides[get_collections] = lambda: {**mock_get_collections(), "menu": menu}
+    response = client.get("/menu/?q=margherita&skip=10&limit=5")
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Margherita Pizza"
+    assert menu.calls["query"] == {"$text": {"$search": "margherita"}}
+    assert menu.calls["projection"] == {"score": {"$meta": "textScore"}}
+    assert menu.calls["sort"][0] == ("score", {"$meta": "textScore"})
+    assert (menu.calls["skip"], menu.calls["limit"]) == (10, 5)
+
+def test_filter_menu_items(client):
+    menu = RecordingCollection([mock_menu_item_2.copy()])
+    app.dependency_overrides[get_collections] = lambda: {**mock_get_collections(), "menu": menu}
+    response = client.get("/menu/?category=Pizza&max_price=15&option=Extra%20Cheese")
+    assert response.status_code == 200
+    assert menu.calls["query"] == {
+        "category": "Pizza",
+        "price": {"$lte": 15.0},
+        "options": {"$all": ["Extra Cheese"]}
+    }
+    assert menu.calls["sort"] == [("name", 1)]
+    assert "etag" not in response.headers
+
+def test_search_limit_is_bounded(client):
+    response = client.get("/menu/?q=pizza&limit=1000")
+    assert response.status_code == 422
+
+def test_batch_get_menu_items(client):
+    missing_id = str(ObjectId())
+    ids = [str(mock_menu_item_2["_id"]), missing_id, "not-an-id", str(mock_menu_item_1["_id"])]
+    response = client.post("/menu:batchGet", json={"ids": ids})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["id"] for result in results] == ids
+    assert results[0]["item"]["name"] == mock_menu_item_2["name"]
+    assert results[1] == {"id": missing_id, "found": False, "item": None, "error": "not_found"}
+    assert results[2]["error"] == "invalid_id"
+    assert results[3]["item"]["name"] == mock_menu_item_1["name"]
+
+def test_batch_get_menu_items_not_in_cache(client):
+    menu = MockCollection([mock_menu_item_1.copy()])
+    app.dependency_overrides[get_collections] = lambda: {
+        "menu": menu,
+        "options": MockCollection(mock_options),
+        "counters": mock_counters,
+        "tombstones": mock_tombstones
+    }
+    client.get("/menu/")
+    # Created by another worker after this one loaded its cache
+    menu.data.append(mock_menu_item_2.copy())
+    response = client.post("/menu:batchGet", json={"ids": [str(mock_menu_item_2["_id"])]})
+    assert response.json()["results"][0]["item"]["name"] == mock_menu_item_2["name"]
+
+def test_get_menu_item_not_in_cache(client):
+    menu = MockCollection([mock_menu_item_1.copy()])
+    app.dependency_overrides[get_collections] = lambda: {**mock_get_collections(), "menu": menu}
+    client.get("/menu/")
+    # Created by another worker after this one loaded its cache
+    menu.data.append(mock_menu_item_2.copy())
+    response = client.get(f"/menu/{mock_menu_item_2['_id']}")
+    assert response.status_code == 200
+    assert response.json()["name"] == mock_menu_item_2["name"]
+
+def test_batch_get_menu_items_limits(client):
+    assert client.post("/menu:batchGet", json={"ids": []}).status_code == 422
+    ids = [str(ObjectId()) for _ in range(101)]
+    assert client.post("/menu:batchGet", json={"ids": ids}).status_code == 422
+
+def test_set_menu_availability(client):
+    menu = MockCollection([mock_menu_item_1.copy(), {**mock_menu_item_2, "available": False, "sold_out": True}])
+    app.dependency_overrides[get_collections] = lambda: {**mock_get_collections(), "menu": menu}
+    # Cached before the update
+    assert all(item["available"] for item in client.get("/menu/").json()[:1])
+
+    missing_id = str(ObjectId())
+    response = client.post("/menu/availability", json={
+        "ids": [str(mock_menu_item_1["_id"]), str(mock_menu_item_2["_id"]), missing_id],
+        "available": False
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["modified"] == 1
+    assert result["not_found"] == [missing_id]
+    assert result["version"] == mock_counters.data["catalog"]["seq"]
+
+    # The cached menu was dropped, only the flipped item is stamped for delta syncs
+    assert [item["available"] for item in client.get("/menu/").json()] == [False, False]
+    assert menu.data[0]["seq"] == result["version"] - 1
+    assert "seq" not in menu.data[1]
+
+    # Setting it by hand clears the inventory's sold out flag
+    client.post("/menu/availability", json={"ids": [str(mock_menu_item_2["_id"])], "available": True})
+    assert "sold_out" not in menu.data[1]
+
+def test_set_menu_availability_invalid(client):
+    response = client.post("/menu/availability", json={"ids": ["not-an-id"], "available": False})
+    assert response.status_code == 400
+    assert client.post("/menu/availability", json={"ids": [], "available": False}).status_code == 422
+
+def test_catalog_event_stream():
+    async def scenario():
+        queue = catalog_events.subscribe(None)
+        stream = catalog_event_stream(queue, None, 3)
+        assert await anext(stream) == 'id: 3\nevent: catalog\ndata: {"version": 3}\n\n'
+        catalog_events.publish(None, 4)
+        assert await anext(stream) == 'id: 4\nevent: catalog\ndata: {"version": 4}\n\n'
+        await stream.aclose()
+        assert catalog_events.subscriber_count() == 0
+    asyncio.run(scenario())
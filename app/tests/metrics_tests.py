@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+from bson import ObjectId
+from main import app
+from database import get_collections
+from metrics import CommandMetricsListener, PoolMetricsListener, REGISTRY
+
+mock_option = {
+    "_id": ObjectId(),
+    "name": "Extra Cheese",
+    "price": 1.5
+}
+
+# Mock Collection class
+class MockCollection:
+    def __init__(self, data=None):
+        self.data = data or []
+
+    def find(self, query=None):
+        return self.data
+
+    def find_one(self, query):
+        return next((item for item in self.data if item["_id"] == query["_id"]), None)
+
+# Mock database dependency
+def mock_get_collections():
+    return {
+        "options": MockCollection([mock_option.copy()]),
+        "menu": MockCollection([])
+    }
+
+# Setup test client
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_collections] = mock_get_collections
+    return TestClient(app)
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+# Fake PyMongo events carrying only the attributes the listeners read
+class FakeCommandEvent:
+    def __init__(self, command_name, duration_micros):
+        self.command_name = command_name
+        self.duration_micros = duration_micros
+
+class FakePoolEvent:
+    def __init__(self, duration, reason=None):
+        self.duration = duration
+        self.reason = reason
+
+# Test cases
+def test_metrics_endpoint_exposes_prometheus_format(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_requests_in_flight" in response.text
+
+def test_requests_labelled_by_route_template(client):
+    labels = {"method": "GET", "route": "/options/{option_id}", "status": "200"}
+    before = sample("http_requests_total", labels)
+    response = client.get(f"/options/{mock_option['_id']}")
+    assert response.status_code == 200
+    assert sample("http_requests_total", labels) == before + 1
+    assert sample(
+        "http_request_duration_seconds_count",
+        {"method": "GET", "route": "/options/{option_id}"}
+    ) >= 1
+
+def test_error_status_codes_are_counted(client):
+    labels = {"method": "GET", "route": "/options/{option_id}", "status": "400"}
+    before = sample("http_requests_total", labels)
+    client.get("/options/not-an-object-id")
+    assert sample("http_requests_total", labels) == before + 1
+
+def test_unmatched_paths_share_one_label(client):
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = sample("http_requests_total", labels)
+    client.get("/does-not-exist")
+    assert sample("http_requests_total", labels) == before + 1
+
+def test_command_listener_records_count_and_latency():
+    listener = CommandMetricsListener()
+    before = sample("mongo_commands_total", {"command": "find", "outcome": "success"})
+    listener.succeeded(FakeCommandEvent("find", 1500))
+    listener.failed(FakeCommandEvent("find", 500))
+    assert sample("mongo_commands_total", {"command": "find", "outcome": "success"}) == before + 1
+    assert sample("mongo_commands_total", {"command": "find", "outcome": "failure"}) >= 1
+    assert sample("mongo_command_duration_seconds_count", {"command": "find"}) >= 2
+
+def test_pool_listener_records_checkout_wait():
+    listener = PoolMetricsListener()
+    before = sample("mongo_pool_checkout_wait_seconds_count", {})
+    listener.connection_checked_out(FakePoolEvent(0.002))
+    listener.connection_check_out_failed(FakePoolEvent(0.5, reason="timeout"))
+    assert sample("mongo_pool_checkout_wait_seconds_count", {}) == before + 2
+    assert sample("mongo_pool_checkout_failures_total", {"reason": "timeout"}) >= 1
@@ -0,0 +1,117 @@
+import pytest
+from bson import ObjectId
+from migrate_references import checkpoint_id, convert_line, migrate
+
+# Mock data
+cheese = {"_id": ObjectId(), "name": "Extra Cheese", "price": 1.5}
+bacon = {"_id": ObjectId(), "name": "Bacon", "price": 2.0}
+menu_item_id = ObjectId()
+
+def legacy_line(*options):
+    return {
+        "menu_item_id": str(menu_item_id),
+        "quantity": 1,
+        "selected_options": list(options),
+        "special_instructions": None,
+        "total_price": 12.99
+    }
+
+# Mock collection supporting the queries of the migration
+class MockCollection:
+    def __init__(self, data=None):
+        self.data = data or []
+        self.batches = []
+
+    def find(self, query=None, projection=None, sort=None, limit=0):
+        documents = sorted(self.data, key=lambda doc: doc["_id"])
+        if query and "_id" in query:
+            documents = [doc for doc in documents if doc["_id"] > query["_id"]["$gt"]]
+        return documents[:limit] if limit else documents
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(len(operations))
+        matched = 0
+        for operation in operations:
+            document = next((doc for doc in self.data if doc["_id"] == operation._filter["_id"]), None)
+            if document and document["items"] == operation._filter["items"]:
+                document.update(operation._doc["$set"])
+                matched += 1
+        return type("BulkWriteResult", (), {"matched_count": matched, "modified_count": matched})
+
+# Mock counters collection holding the checkpoints
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+        self.checkpoints = []
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        self.data.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+        self.checkpoints.append(update["$set"]["last_id"])
+
+    def delete_one(self, query):
+        self.data.pop(query["_id"], None)
+
+@pytest.fixture
+def collections():
+    return {
+        "options": MockCollection([cheese, bacon]),
+        "carts": MockCollection([
+            {"_id": ObjectId(), "items": [legacy_line("Extra Cheese")]} for _ in range(5)
+        ]),
+        "orders": MockCollection([
+            {"_id": ObjectId(), "items": [legacy_line("Bacon", "Extra Cheese"), legacy_line()]}
+        ]),
+        "counters": MockCounters()
+    }
+
+# Test cases
+def test_convert_line():
+    line = convert_line(legacy_line("Bacon", "Removed Option"), {"Bacon": bacon["_id"]})
+    assert line["menu_item_id"] == menu_item_id
+    # Unknown names are left as they are
+    assert line["selected_options"] == [bacon["_id"], "Removed Option"]
+    assert convert_line(line, {"Bacon": bacon["_id"]}) == line
+
+def test_migrate_in_batches(collections):
+    report = migrate(collections, batch_size=2)
+    assert report["carts"] == {"scanned": 5, "converted": 5, "conflicts": 0, "passes": 1}
+    assert report["orders"]["converted"] == 1
+    assert collections["carts"].batches == [2, 2, 1]
+    for cart in collections["carts"].data:
+        assert cart["items"][0]["menu_item_id"] == menu_item_id
+        assert cart["items"][0]["selected_options"] == [cheese["_id"]]
+    assert collections["orders"].data[0]["items"][0]["selected_options"] == [bacon["_id"], cheese["_id"]]
+    # Checkpoints are removed once a collection is done
+    assert collections["counters"].data == {}
+
+def test_migrate_resumes_from_checkpoint(collections):
+    carts = collections["carts"].find()
+    collections["counters"].data[checkpoint_id("carts")] = {"last_id": carts[2]["_id"]}
+    report = migrate(collections, names=["carts"], batch_size=10)
+    assert report["carts"]["converted"] == 2
+    assert [cart["items"][0]["selected_options"] for cart in carts] == [["Extra Cheese"]] * 3 + [[cheese["_id"]]] * 2
+
+def test_migrate_restart_ignores_checkpoint(collections):
+    carts = collections["carts"].find()
+    collections["counters"].data[checkpoint_id("carts")] = {"last_id": carts[-1]["_id"]}
+    report = migrate(collections, names=["carts"], restart=True)
+    assert report["carts"]["converted"] == 5
+
+def test_migrate_retries_concurrent_writes(collections):
+    carts = collections["carts"]
+    bulk_write = carts.bulk_write
+
+    # A cart modified between the read and the write is converted by a second pass
+    def concurrent_bulk_write(operations, ordered=True):
+        if len(carts.batches) == 0:
+            carts.data[0]["items"] = carts.data[0]["items"] + [legacy_line("Bacon")]
+        return bulk_write(operations, ordered)
+    carts.bulk_write = concurrent_bulk_write
+
+    report = migrate(collections, names=["carts"])
+    assert report["carts"]["passes"] == 2
+    assert report["carts"]["conflicts"] == 0
+    assert carts.data[0]["items"][1]["selected_options"] == [bacon["_id"]]
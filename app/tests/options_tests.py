@@ -24,8 +24,12 @@ mock_option_2 = {
 class MockCollection:
     def __init__(self, data=None):
         self.data = data or []
+        self.updates = []
 
-    def find(self):
+    def find(self, query=None):
+        if query and "_id" in query and "$in" in query["_id"]:
+            # Handle multi-get query
+            return [item for item in self.data if item["_id"] in query["_id"]["$in"]]
         return self.data
 
     def find_one(self, query):
@@ -59,16 +63,67 @@ class MockCollection:
         self.data = [item for item in self.data if item["_id"] != query["_id"]]
         return type("DeleteResult", (), {"deleted_count": initial_length - len(self.data)})
 
+    def update_many(self, query, update, array_filters=None):
+        self.updates.append((query, update, array_filters))
+        return type("UpdateResult", (), {"modified_count": 0})
+
+# Mock counters collection holding the catalog version
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, amount in update.get("$inc", {}).items():
+            counter[field] = counter.get(field, 0) + amount
+        counter.update(update.get("$set", {}))
+        return counter
+
+mock_counters = MockCounters()
+
+# Mock tombstones collection
+class MockTombstones:
+    def __init__(self):
+        self.data = []
+
+    def insert_one(self, document):
+        self.data.append(document)
+
+mock_tombstones = MockTombstones()
+
+mock_menu_item = {
+    "_id": ObjectId(),
+    "name": "Burger",
+    "description": "Beef burger",
+    "price": 8.5,
+    "available": True,
+    "options": ["Bacon"]
+}
+
+mock_menu = MockCollection([])
+mock_carts = MockCollection([])
+
 # Mock database dependency
 def mock_get_collections():
     return {
         "options": MockCollection([mock_option_1.copy(), mock_option_2.copy()]),
-        "menu": MockCollection([])  # Empty menu collection for delete validation
+        "menu": mock_menu,
+        "carts": mock_carts,
+        "counters": mock_counters,
+        "tombstones": mock_tombstones
     }
 
 # Setup test client
 @pytest.fixture
 def client():
+    mock_counters.data = {}
+    mock_tombstones.data = []
+    mock_menu.data = []  # Empty menu collection for delete validation
+    mock_menu.updates.clear()
+    mock_carts.updates.clear()
     app.dependency_overrides[get_collections] = mock_get_collections
     return TestClient(app)
 
@@ -153,3 +208,64 @@ def test_delete_option_not_found(client):
     response = client.delete(f"/options/{str(ObjectId())}")
     assert response.status_code == 404
     assert response.json()["detail"] == "Option not found"
+
+def test_get_options_not_modified(client):
+    etag = client.get("/options/").headers["etag"]
+    response = client.get("/options/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_create_option_changes_etag(client):
+    etag = client.get("/options/").headers["etag"]
+    client.post("/options/", json={"name": "Avocado", "price": 1.8})
+    response = client.get("/options/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_delete_option_leaves_tombstone(client):
+    option_id = str(mock_option_2["_id"])
+    client.delete(f"/options/{option_id}")
+    assert [str(t["item_id"]) for t in mock_tombstones.data] == [option_id]
+    assert mock_tombstones.data[0]["collection"] == "options"
+
+def test_rename_option_cascades(client):
+    option_id = str(mock_option_2["_id"])
+    response = client.put(f"/options/{option_id}", json={"name": "Smoked Bacon"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Smoked Bacon"
+    query, update, array_filters = mock_menu.updates[0]
+    assert query == {"options": "Bacon"}
+    assert update["$set"]["options.$[option]"] == "Smoked Bacon"
+    assert array_filters == [{"option": "Bacon"}]
+    query, update, array_filters = mock_carts.updates[0]
+    assert query == {"items.selected_options": "Bacon"}
+    assert update["$set"] == {"items.$[].selected_options.$[option]": "Smoked Bacon"}
+    assert array_filters == [{"option": "Bacon"}]
+
+def test_update_option_price_does_not_cascade(client):
+    option_id = str(mock_option_2["_id"])
+    client.put(f"/options/{option_id}", json={"price": 2.5})
+    assert mock_menu.updates == []
+    assert mock_carts.updates == []
+
+def test_get_option_menu_items(client):
+    mock_menu.data = [mock_menu_item.copy()]
+    response = client.get(f"/options/{str(mock_option_2['_id'])}/menu-items")
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()] == ["Burger"]
+    response = client.get(f"/options/{str(mock_option_1['_id'])}/menu-items")
+    assert response.json() == []
+
+def test_delete_option_in_use(client):
+    mock_menu.data = [mock_menu_item.copy()]
+    response = client.delete(f"/options/{str(mock_option_2['_id'])}")
+    assert response.status_code == 400
+    assert "being used in menu items" in response.json()["detail"]
+
+def test_batch_get_options(client):
+    ids = [str(mock_option_2["_id"]), str(ObjectId()), str(mock_option_1["_id"])]
+    response = client.post("/options:batchGet", json={"ids": ids})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["found"] for result in results] == [True, False, True]
+    assert [result["item"]["name"] for result in results if result["found"]] == ["Bacon", "Extra Cheese"]
+    assert results[1]["error"] == "not_found"
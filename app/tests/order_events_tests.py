@@ -0,0 +1,82 @@
+from datetime import datetime, UTC
+from bson import ObjectId
+from order_events import OrderEventLog, order_menu_item_ids, stage_duration, stage_durations_pipeline
+from tenancy import truck_collections
+
+# Mock collection recording the batches it receives
+class MockEvents:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append((documents, ordered))
+
+burger_id = ObjectId()
+order = {"_id": ObjectId(), "items": [{"menu_item_id": str(burger_id)}, {"menu_item_id": burger_id}]}
+
+# Test cases
+def test_events_are_written_in_batches():
+    events = MockEvents()
+    log = OrderEventLog(batch_size=3, flush_interval=60)
+    log.record({"order_events": events}, order, "pending")
+    log.record({"order_events": events}, order, "en préparation", "pending")
+    assert events.batches == []
+    log.record({"order_events": events}, order, "prête", "en préparation")
+    documents, ordered = events.batches[0]
+    assert not ordered
+    assert [document["status"] for document in documents] == ["pending", "en préparation", "prête"]
+    assert documents[1]["previous_status"] == "pending"
+    assert documents[0]["menu_item_ids"] == [burger_id]
+    assert log.pending == []
+
+def test_events_carry_their_truck():
+    events = MockEvents()
+    log = OrderEventLog(batch_size=100, flush_interval=60)
+    for truck_id in ("food-1", "food-2"):
+        log.record(truck_collections({"order_events": events, "counters": MockEvents()}, truck_id), order, "pending")
+    # One insert_many for both trucks, each event stamped with its own
+    assert log.flush() == 2
+    assert [document["truck_id"] for document in events.batches[0][0]] == ["food-1", "food-2"]
+
+def test_failed_batch_is_dropped():
+    log = OrderEventLog(batch_size=100, flush_interval=60)
+    log.record({"order_events": MockEvents(fail=True)}, order, "pending")
+    assert log.flush() == 0
+    assert log.pending == []
+
+def test_background_flush():
+    events = MockEvents()
+    log = OrderEventLog(batch_size=100, flush_interval=0.01)
+    log.start()
+    log.record({"order_events": events}, order, "pending")
+    log.stop()
+    assert len(events.batches) == 1
+
+def test_menu_item_ids():
+    assert order_menu_item_ids({"items": [{"menu_item_id": "legacy"}]}) == ["legacy"]
+
+def test_stage_durations_pipeline():
+    since, until = datetime(2026, 1, 1, tzinfo=UTC), datetime(2026, 1, 2, tzinfo=UTC)
+    pipeline = stage_durations_pipeline(since, until, "hour")
+    assert pipeline[0] == {"$match": {"at": {"$gte": since, "$lt": until}}}
+    assert pipeline[1]["$setWindowFields"]["partitionBy"] == "$order_id"
+    assert "hour" in pipeline[-2]["$group"]["_id"]
+    by_item = stage_durations_pipeline(since, until, "menu_item")
+    assert {"$unwind": "$menu_item_ids"} in by_item
+    assert by_item[-2]["$group"]["_id"] == {"stage": "$status", "menu_item_id": "$menu_item_ids"}
+
+def test_stage_duration():
+    document = {"_id": {"stage": "pending", "menu_item_id": burger_id}, "count": 4, "percentiles": [62.04, 300.51]}
+    result = stage_duration(document, {str(burger_id): {"name": "Burger"}})
+    assert result == {
+        "stage": "pending",
+        "hour": None,
+        "menu_item_id": str(burger_id),
+        "menu_item_name": "Burger",
+        "count": 4,
+        "p50_seconds": 62.0,
+        "p95_seconds": 300.5
+    }
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, UTC
+import mongomock
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from main import app
+from database import database_collections, get_collections
+from tenancy import truck_collections
+from order_events import order_events
+from order_sweeper import sweep_once
+import inventory
+import config
+
+now = datetime(2026, 1, 1, 12, tzinfo=UTC)
+burger_id = ObjectId()
+
+def order(truck_id, status, age_minutes, reservations=None):
+    return {
+        "_id": ObjectId(),
+        "truck_id": truck_id,
+        "status": status,
+        "created_at": now - timedelta(minutes=age_minutes),
+        "items": [{"menu_item_id": str(burger_id), "quantity": 1}],
+        "reservations": reservations or []
+    }
+
+@pytest.fixture
+def collections():
+    return database_collections(mongomock.MongoClient().db)
+
+# Test cases
+def test_expired_pending_orders_are_cancelled(collections, monkeypatch):
+    monkeypatch.setattr(config, "PENDING_ORDER_TTL_SECONDS", 3600)
+    monkeypatch.setattr(config, "ORDER_SWEEP_BATCH_SIZE", 2)
+    released = []
+    monkeypatch.setattr(inventory, "release", lambda reservations, scoped: released.append((reservations, scoped)))
+    reservations = [{"shard": f"menu:{burger_id}:0", "kind": "menu", "item_id": burger_id, "quantity": 2}]
+    expired = [order("food-1", "pending", 90, reservations), order("food-2", "pending", 61), order("food-1", "pending", 120)]
+    kept = [order("food-1", "pending", 30), order("food-1", "en préparation", 120)]
+    collections["orders"].insert_many(expired + kept)
+
+    # Two batches of two
+    assert sweep_once(collections, now) == 3
+    statuses = {doc["_id"]: doc["status"] for doc in collections["orders"].find()}
+    assert [statuses[doc["_id"]] for doc in expired] == ["annulée"] * 3
+    assert [statuses[doc["_id"]] for doc in kept] == ["pending", "en préparation"]
+    # Stock given back to the order's truck, cancellations logged per truck
+    assert [(reservations, scoped["inventory"].truck_id) for reservations, scoped in released if reservations] == [
+        (reservations, "food-1")
+    ]
+    events = [event for _, event in order_events.pending]
+    assert sorted(event["truck_id"] for event in events) == ["food-1", "food-1", "food-2"]
+    assert {(event["status"], event["previous_status"]) for event in events} == {("annulée", "pending")}
+
+    # Nothing left to cancel
+    assert sweep_once(collections, now) == 0
+
+# Orders collection whose reads are followed by a sweep, before the handler goes on
+class SweptAfterRead:
+    def __init__(self, collection, sweep):
+        self.collection = collection
+        self.sweep = sweep
+
+    def __getattr__(self, method):
+        return getattr(self.collection, method)
+
+    def find_one(self, *args, **kwargs):
+        document = self.collection.find_one(*args, **kwargs)
+        self.sweep()
+        return document
+
+def test_order_cancelled_by_sweep_cannot_be_paid(collections, monkeypatch):
+    monkeypatch.setattr(config, "PENDING_ORDER_TTL_SECONDS", 3600)
+    expired = {**order("default", "pending", 90), "user_id": None, "order_number": "FT-2026-0001", "total_amount": 10.0}
+    collections["orders"].insert_one(expired)
+    swept = {**collections, "orders": SweptAfterRead(collections["orders"], lambda: sweep_once(collections, now))}
+    monkeypatch.setitem(app.dependency_overrides, get_collections, lambda: truck_collections(swept, "default"))
+
+    response = TestClient(app).post(f"/orders/{expired['_id']}/pay")
+    assert response.status_code == 400
+    assert collections["orders"].find_one({"_id": expired["_id"]})["status"] == "annulée"
+    events = [event for _, event in order_events.pending]
+    assert [(event["status"], event["previous_status"]) for event in events] == [("annulée", "pending")]
@@ -1,9 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime, UTC
 from main import app
 from database import get_collections
+from order_events import order_events
 from schemas.order import OrderStatus
 
 # Get current year for order numbers
@@ -69,6 +71,9 @@ class MockCollection:
             # Handle options query for validation
             valid_names = set(query["name"]["$in"])
             return [item for item in self.data if item["name"] in valid_names]
+        if query and "_id" in query and "$in" in query["_id"]:
+            # Handle multi-get query
+            return [item for item in self.data if item["_id"] in query["_id"]["$in"]]
         if query and "status" in query:
             # Handle status filter for orders
             return [item for item in self.data if item["status"] == query["status"]]
@@ -109,7 +114,8 @@ class MockCollection:
                     if data_item["_id"] == item["_id"]:
                         self.data[i] = updated_item
                         break
-                return updated_item
+                # pymongo returns the document as it was unless asked otherwise
+                return updated_item if return_document == ReturnDocument.AFTER else item
             return item
         return None
 
@@ -136,13 +142,50 @@ class MockCollection:
                 break
         return type("DeleteResult", (), {"deleted_count": 1 if item_to_delete else 0})
 
+# Mock counters collection: order number sequences (the catalog version is never bumped here)
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, value in update.get("$max", {}).items():
+            counter[field] = max(counter.get(field, 0), value)
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, amount in update.get("$inc", {}).items():
+            counter[field] = counter.get(field, 0) + amount
+        return counter
+
+# Mock time-series collection of order events
+class MockEvents:
+    def __init__(self, results=None):
+        self.data = []
+        self.pipelines = []
+        self.results = results or []
+
+    def insert_many(self, documents, ordered=True):
+        self.data.extend(documents)
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self.results
+
 # Mock database dependency
 def mock_get_collections():
     return {
         "menu": MockCollection([mock_menu_item_1.copy()]),
         "options": MockCollection(mock_options),
         "carts": MockCollection([mock_cart.copy()]),
-        "orders": MockCollection([mock_order.copy()])
+        "orders": MockCollection([mock_order.copy()]),
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([]),
+        "inventory": MockCollection([]),
+        "order_events": MockEvents()
     }
 
 # Setup test client
@@ -156,7 +199,8 @@ def test_create_order(client):
     response = client.post("/orders/")
     assert response.status_code == 200
     order = response.json()
-    assert order["order_number"].startswith(f"FT-{CURRENT_YEAR}-")
+    # Numbered after the existing FT-<year>-0001
+    assert order["order_number"] == f"FT-{CURRENT_YEAR}-0002"
     assert len(order["items"]) == 1
     assert order["total_amount"] == pytest.approx(28.98, rel=1e-9)
     assert order["status"] == "pending"
@@ -231,3 +275,97 @@ def test_pay_order(client):
     assert response.status_code == 200
     order = response.json()
     assert order["status"] == "en préparation"
+
+def test_create_order_with_object_id_references(client):
+    # Cart lines reference the menu item and options by ObjectId
+    cart = {
+        **mock_cart,
+        "items": [{
+            **mock_cart["items"][0],
+            "menu_item_id": mock_menu_item_1["_id"],
+            "selected_options": [mock_options[0]["_id"]]
+        }]
+    }
+    orders = MockCollection([])
+    app.dependency_overrides[get_collections] = lambda: {
+        "menu": MockCollection([mock_menu_item_1.copy()]),
+        "options": MockCollection(mock_options),
+        "carts": MockCollection([cart]),
+        "orders": orders,
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([]),
+        "inventory": MockCollection([]),
+        "order_events": MockEvents()
+    }
+    response = client.post("/orders/")
+    assert response.status_code == 200
+    order = response.json()
+    assert order["total_amount"] == pytest.approx(28.98, rel=1e-9)
+    assert order["items"][0]["menu_item_id"] == str(mock_menu_item_1["_id"])
+    assert order["items"][0]["selected_options"] == ["Extra Cheese"]
+    assert orders.data[0]["items"][0]["selected_options"] == [mock_options[0]["_id"]]
+
+def test_batch_get_orders(client):
+    missing_id = str(ObjectId())
+    ids = [missing_id, str(mock_order["_id"]), str(mock_order["_id"])]
+    response = client.post("/orders:batchGet", json={"ids": ids})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["id"] for result in results] == ids
+    assert results[0]["error"] == "not_found"
+    assert results[1]["item"]["order_number"] == f"FT-{CURRENT_YEAR}-0001"
+    assert results[1]["item"]["items"][0]["selected_options"] == ["Extra Cheese"]
+    assert results[2] == results[1]
+
+def test_create_order_applies_pricing_rules(client):
+    rule = {"_id": ObjectId(), "name": "10% off", "type": "percentage", "menu_item_ids": [], "value": 10}
+    app.dependency_overrides[get_collections] = lambda: {
+        **mock_get_collections(),
+        "pricing_rules": MockCollection([rule])
+    }
+    response = client.post("/orders/")
+    assert response.status_code == 200
+    order = response.json()
+    assert order["discounts"] == [{"rule_id": str(rule["_id"]), "name": "10% off", "amount": 2.9}]
+    assert order["discount_amount"] == 2.9
+    assert order["total_amount"] == pytest.approx(26.08, rel=1e-9)
+
+def test_create_order_unavailable_item(client):
+    app.dependency_overrides[get_collections] = lambda: {
+        **mock_get_collections(),
+        "menu": MockCollection([{**mock_menu_item_1, "available": False}])
+    }
+    response = client.post("/orders/")
+    assert response.status_code == 400
+    assert "not available" in response.json()["detail"]
+
+def test_status_changes_are_logged(client):
+    collections = mock_get_collections()
+    app.dependency_overrides[get_collections] = lambda: collections
+    assert client.post("/orders/").status_code == 200
+    order_id = str(mock_order["_id"])
+    assert client.post(f"/orders/{order_id}/pay").status_code == 200
+    assert client.put(f"/orders/{order_id}/status?status=prête").status_code == 200
+    order_events.flush()
+    events = collections["order_events"].data
+    assert [(event["status"], event["previous_status"]) for event in events] == [
+        ("pending", None),
+        ("en préparation", "pending"),
+        ("prête", "en préparation")
+    ]
+    assert events[0]["menu_item_ids"] == [mock_menu_item_1["_id"]]
+
+def test_stage_durations(client):
+    events = MockEvents([
+        {"_id": {"stage": "pending", "hour": datetime(2026, 1, 1, 12, tzinfo=UTC)}, "count": 3, "percentiles": [45.0, 90.0]}
+    ])
+    app.dependency_overrides[get_collections] = lambda: {**mock_get_collections(), "order_events": events}
+    response = client.get("/orders/stats/stage-durations?since=2026-01-01T00:00:00Z&until=2026-01-02T00:00:00Z")
+    assert response.status_code == 200
+    result = response.json()
+    assert result["group_by"] == "hour"
+    assert result["stages"][0]["stage"] == "pending"
+    assert result["stages"][0]["p95_seconds"] == 90.0
+    assert events.pipelines[0][0]["$match"]["at"]["$lt"] == datetime(2026, 1, 2, tzinfo=UTC)
+    response = client.get("/orders/stats/stage-durations?since=2026-01-02T00:00:00Z&until=2026-01-01T00:00:00Z")
+    assert response.status_code == 400
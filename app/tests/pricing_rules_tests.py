@@ -0,0 +1,202 @@
+import pytest
+from fastapi.testclient import TestClient
+from bson import ObjectId
+from datetime import datetime
+from main import app
+from database import get_collections
+from pricing_rules import PricingEngine
+
+# Mock data
+burger_id = str(ObjectId())
+fries_id = str(ObjectId())
+soda_id = str(ObjectId())
+
+mock_menu = [
+    {"_id": ObjectId(burger_id), "name": "Burger", "price": 10.0, "options": ["Bacon"], "available": True},
+    {"_id": ObjectId(fries_id), "name": "Fries", "price": 4.0, "options": [], "available": True},
+    {"_id": ObjectId(soda_id), "name": "Soda", "price": 3.0, "options": [], "available": True}
+]
+
+mock_options = [{"_id": ObjectId(), "name": "Bacon", "price": 2.0}]
+
+# Wednesday
+NOON = datetime(2026, 3, 4, 12, 0)
+EVENING = datetime(2026, 3, 4, 18, 30)
+
+def rule(type, menu_item_ids=(), value=0, **fields):
+    return {"id": str(ObjectId()), "name": type, "type": type, "menu_item_ids": list(menu_item_ids), "value": value, **fields}
+
+def line(menu_item_id, quantity, unit_price, base_price=None):
+    return {
+        "menu_item_id": menu_item_id,
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "base_price": unit_price if base_price is None else base_price
+    }
+
+def total_discount(rules, lines, now=NOON):
+    return sum(discount["amount"] for discount in PricingEngine(rules).evaluate(lines, now))
+
+# Engine tests
+def test_no_rules():
+    assert PricingEngine([]).evaluate([line(burger_id, 1, 10.0)], NOON) == []
+
+def test_percentage_and_fixed():
+    assert total_discount([rule("percentage", [burger_id], 20)], [line(burger_id, 2, 10.0)]) == 4.0
+    assert total_discount([rule("fixed", [], 1.5)], [line(burger_id, 2, 10.0), line(fries_id, 1, 4.0)]) == 4.5
+    # A fixed discount never exceeds the unit price
+    assert total_discount([rule("fixed", [soda_id], 5)], [line(soda_id, 1, 3.0)]) == 3.0
+
+def test_buy_x_get_y():
+    bogo = rule("buy_x_get_y", [fries_id], buy_quantity=2, get_quantity=1)
+    assert total_discount([bogo], [line(fries_id, 2, 4.0)]) == 0
+    assert total_discount([bogo], [line(fries_id, 7, 4.0)]) == 8.0
+
+def test_best_line_rule_without_stacking():
+    rules = [rule("percentage", [burger_id], 10), rule("fixed", [burger_id], 2.5)]
+    discounts = PricingEngine(rules).evaluate([line(burger_id, 2, 10.0)], NOON)
+    assert [discount["name"] for discount in discounts] == ["fixed"]
+    assert discounts[0]["amount"] == 5.0
+
+def test_combo_uses_base_prices_and_consumes_units():
+    combo = rule("combo", [burger_id, fries_id, soda_id], 14)
+    percentage = rule("percentage", [burger_id], 50)
+    lines = [line(burger_id, 2, 12.0, base_price=10.0), line(fries_id, 1, 4.0), line(soda_id, 1, 3.0)]
+    discounts = {discount["name"]: discount["amount"] for discount in PricingEngine([combo, percentage]).evaluate(lines, NOON)}
+    # One combo (17 -> 14), the second burger gets the percentage
+    assert discounts == {"combo": 3.0, "percentage": 6.0}
+
+def test_incomplete_combo():
+    combo = rule("combo", [burger_id, fries_id], 12)
+    assert total_discount([combo], [line(burger_id, 3, 10.0)]) == 0
+
+def test_happy_hour_window():
+    happy_hour = rule("percentage", [], 50, start_time="17:00", end_time="19:00", days=[2])
+    lines = [line(soda_id, 2, 3.0)]
+    assert total_discount([happy_hour], lines, NOON) == 0
+    assert total_discount([happy_hour], lines, EVENING) == 3.0
+    # Thursday
+    assert total_discount([happy_hour], lines, datetime(2026, 3, 5, 18, 0)) == 0
+
+def test_overnight_window():
+    late_night = rule("fixed", [], 1, start_time="22:00", end_time="02:00", days=[2])
+    lines = [line(soda_id, 1, 3.0)]
+    assert total_discount([late_night], lines, datetime(2026, 3, 4, 23, 0)) == 1.0
+    # 01:00 on Thursday still belongs to Wednesday night
+    assert total_discount([late_night], lines, datetime(2026, 3, 5, 1, 0)) == 1.0
+    assert total_discount([late_night], lines, datetime(2026, 3, 5, 23, 0)) == 0
+
+def test_inactive_rule():
+    assert total_discount([rule("percentage", [], 10, active=False)], [line(soda_id, 1, 3.0)]) == 0
+
+# Mock Collection class
+class MockCollection:
+    def __init__(self, data=None):
+        self.data = data or []
+
+    def find(self, query=None):
+        if query and "_id" in query and "$in" in query["_id"]:
+            return [item for item in self.data if item["_id"] in query["_id"]["$in"]]
+        return self.data
+
+    def insert_one(self, document):
+        document["_id"] = ObjectId()
+        self.data.append(document)
+        return type("InsertOneResult", (), {"inserted_id": document["_id"]})
+
+    def find_one_and_update(self, query, update, return_document=None):
+        item = next((item for item in self.data if item["_id"] == query["_id"]), None)
+        if item:
+            item.update(update["$set"])
+        return item
+
+    def delete_one(self, query):
+        initial_length = len(self.data)
+        self.data = [item for item in self.data if item["_id"] != query["_id"]]
+        return type("DeleteResult", (), {"deleted_count": initial_length - len(self.data)})
+
+# Mock counters collection holding the catalog version
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, amount in update.get("$inc", {}).items():
+            counter[field] = counter.get(field, 0) + amount
+        counter.update(update.get("$set", {}))
+        return counter
+
+mock_rules = MockCollection([])
+mock_counters = MockCounters()
+
+# Mock database dependency
+def mock_get_collections():
+    return {
+        "menu": MockCollection(mock_menu),
+        "options": MockCollection(mock_options),
+        "pricing_rules": mock_rules,
+        "counters": mock_counters
+    }
+
+# Setup test client
+@pytest.fixture
+def client():
+    mock_rules.data = []
+    mock_counters.data = {}
+    app.dependency_overrides[get_collections] = mock_get_collections
+    return TestClient(app)
+
+# Route tests
+def test_create_pricing_rule(client):
+    response = client.post("/pricing-rules/", json={
+        "name": "Burger menu", "type": "combo", "menu_item_ids": [burger_id, fries_id], "value": 12
+    })
+    assert response.status_code == 200
+    assert response.json()["type"] == "combo"
+    assert [rule["name"] for rule in client.get("/pricing-rules/").json()] == ["Burger menu"]
+
+def test_create_pricing_rule_unknown_menu_item(client):
+    unknown_id = str(ObjectId())
+    response = client.post("/pricing-rules/", json={
+        "name": "Discount", "type": "percentage", "menu_item_ids": [unknown_id], "value": 10
+    })
+    assert response.status_code == 400
+    assert unknown_id in response.json()["detail"]
+
+def test_create_pricing_rule_invalid(client):
+    response = client.post("/pricing-rules/", json={"name": "Combo", "type": "combo", "menu_item_ids": [burger_id], "value": 5})
+    assert response.status_code == 422
+    response = client.post("/pricing-rules/", json={"name": "Half", "type": "percentage", "value": 10, "start_time": "17:00"})
+    assert response.status_code == 422
+
+def test_rules_apply_to_quotes_and_invalidate(client):
+    items = [{"menu_item_id": burger_id, "quantity": 2, "selected_options": ["Bacon"]}]
+    assert client.post("/quote", json={"items": items}).json()["total_amount"] == 24.0
+
+    rule_id = client.post("/pricing-rules/", json={
+        "name": "10% off burgers", "type": "percentage", "menu_item_ids": [burger_id], "value": 10
+    }).json()["id"]
+    quote = client.post("/quote", json={"items": items}).json()
+    assert quote["discounts"] == [{"rule_id": rule_id, "name": "10% off burgers", "amount": 2.4}]
+    assert quote["total_amount"] == pytest.approx(21.6, rel=1e-9)
+
+    response = client.put(f"/pricing-rules/{rule_id}", json={
+        "name": "20% off burgers", "type": "percentage", "menu_item_ids": [burger_id], "value": 20
+    })
+    assert response.status_code == 200
+    assert client.post("/quote", json={"items": items}).json()["discount_amount"] == 4.8
+
+    assert client.delete(f"/pricing-rules/{rule_id}").status_code == 200
+    assert client.post("/quote", json={"items": items}).json()["discounts"] == []
+
+def test_update_pricing_rule_not_found(client):
+    response = client.put(f"/pricing-rules/{str(ObjectId())}", json={"name": "X", "type": "fixed", "value": 1})
+    assert response.status_code == 404
+
+def test_delete_pricing_rule_invalid_id(client):
+    response = client.delete("/pricing-rules/not-an-id")
+    assert response.status_code == 400
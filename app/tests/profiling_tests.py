@@ -0,0 +1,103 @@
+import asyncio
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import config
+from profiling import ProfilingMiddleware, profiling_enabled, rotate_profiles
+
+# Setup a small app wrapped by the middleware
+@pytest.fixture
+def profiled_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 0)
+    monkeypatch.setattr(config, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILING_MAX_FILES", 2)
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/menu/{menu_item_id}")
+    async def get_menu_item(menu_item_id: str):
+        return {"id": menu_item_id}
+
+    return TestClient(app)
+
+# Test cases
+def test_profiling_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_TOKEN", None)
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 0)
+    assert not profiling_enabled()
+
+def test_request_without_header_is_not_profiled(profiled_client, tmp_path):
+    response = profiled_client.get("/menu/abc")
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert os.listdir(tmp_path) == []
+
+def test_request_with_wrong_token_is_not_profiled(profiled_client, tmp_path):
+    response = profiled_client.get("/menu/abc", headers={"X-Profile": "wrong"})
+    assert response.status_code == 200
+    assert os.listdir(tmp_path) == []
+
+def test_authorized_request_writes_profile(profiled_client, tmp_path):
+    response = profiled_client.get("/menu/abc", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"id": "abc"}
+    profile_id = response.headers["x-profile-id"]
+    assert os.listdir(tmp_path) == [profile_id]
+
+def test_inline_profile_replaces_body(profiled_client):
+    response = profiled_client.get(
+        "/menu/abc",
+        headers={"X-Profile": "secret", "X-Profile-Output": "inline"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "function calls" in response.text
+
+def test_rotate_profiles_keeps_newest(tmp_path):
+    for i in range(4):
+        path = tmp_path / f"{i}.prof"
+        path.write_text("")
+        os.utime(path, (i, i))
+    rotate_profiles(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ["2.prof", "3.prof"]
+
+def test_sampled_request_cannot_get_inline_report(profiled_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 1)
+    sampled_client = TestClient(profiled_client.app)
+    response = sampled_client.get("/menu/abc", headers={"X-Profile-Output": "inline"})
+    assert response.json() == {"id": "abc"}
+    assert os.listdir(tmp_path) == [response.headers["x-profile-id"]]
+
+def test_one_profile_in_flight(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 0)
+    monkeypatch.setattr(config, "PROFILING_DIR", str(tmp_path))
+
+    # The first request waits until the second one is done
+    release = asyncio.Event()
+    async def app(scope, receive, send):
+        if scope["path"] == "/slow":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+        release.set()
+
+    middleware = ProfilingMiddleware(app)
+    async def request(path):
+        sent = []
+        async def send(message):
+            sent.append(message)
+        scope = {"type": "http", "method": "GET", "path": path, "headers": [(b"x-profile", b"secret")]}
+        await middleware(scope, None, send)
+        return dict(sent[0]["headers"])
+
+    async def overlapping():
+        return await asyncio.gather(request("/slow"), request("/fast"))
+
+    slow, fast = asyncio.run(overlapping())
+    assert b"x-profile-id" in slow
+    assert b"x-profile-id" not in fast
+    assert len(os.listdir(tmp_path)) == 1
@@ -0,0 +1,120 @@
+import pytest
+from fastapi.testclient import TestClient
+from bson import ObjectId
+from main import app
+from database import get_collections
+
+# Mock data
+mock_menu_item_1 = {
+    "_id": ObjectId(),
+    "name": "Margherita Pizza",
+    "description": "Classic pizza with tomato sauce and mozzarella",
+    "price": 12.99,
+    "options": ["Extra Cheese", "Bacon"],
+    "available": True
+}
+
+mock_menu_item_2 = {
+    "_id": ObjectId(),
+    "name": "Pepperoni Pizza",
+    "description": "Pizza with tomato sauce, mozzarella, and pepperoni",
+    "price": 14.99,
+    "options": ["Extra Cheese"],
+    "available": False
+}
+
+mock_options = [
+    {"_id": ObjectId(), "name": "Extra Cheese", "price": 1.5},
+    {"_id": ObjectId(), "name": "Bacon", "price": 2.0}
+]
+
+# Mock Collection class (quotes only read the catalog)
+class MockCollection:
+    def __init__(self, data=None):
+        self.data = data or []
+        self.writes = 0
+
+    def find(self, query=None):
+        return self.data
+
+    def insert_one(self, document):
+        self.writes += 1
+
+# Mock counters collection (the catalog version is never bumped here)
+class MockCounters:
+    def find_one(self, query):
+        return None
+
+mock_carts = MockCollection([])
+
+# Mock database dependency
+def mock_get_collections():
+    return {
+        "menu": MockCollection([mock_menu_item_1, mock_menu_item_2]),
+        "options": MockCollection(mock_options),
+        "carts": mock_carts,
+        "counters": MockCounters(),
+        "pricing_rules": MockCollection([])
+    }
+
+# Setup test client
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_collections] = mock_get_collections
+    return TestClient(app)
+
+# Test cases
+def test_quote(client):
+    items = [
+        {"menu_item_id": str(mock_menu_item_1["_id"]), "quantity": 2, "selected_options": ["Extra Cheese", "Bacon"]},
+        {"menu_item_id": str(mock_menu_item_1["_id"]), "quantity": 1}
+    ]
+    response = client.post("/quote", json={"items": items})
+    assert response.status_code == 200
+    quote = response.json()
+    assert quote["valid"] is True
+    assert quote["items"][0]["unit_price"] == pytest.approx(16.49, rel=1e-9)
+    assert quote["items"][0]["total_price"] == pytest.approx(32.98, rel=1e-9)
+    assert quote["total_amount"] == pytest.approx(45.97, rel=1e-9)
+    # Nothing is written
+    assert mock_carts.writes == 0
+
+def test_quote_empty_cart(client):
+    response = client.post("/quote", json={"items": []})
+    assert response.json() == {
+        "items": [], "total_amount": 0.0, "discounts": [], "discount_amount": 0.0, "valid": True
+    }
+
+def test_quote_reports_invalid_lines(client):
+    items = [
+        {"menu_item_id": str(mock_menu_item_1["_id"]), "selected_options": ["Invalid Option"]},
+        {"menu_item_id": str(mock_menu_item_2["_id"])},
+        {"menu_item_id": str(ObjectId())},
+        {"menu_item_id": str(mock_menu_item_1["_id"])}
+    ]
+    response = client.post("/quote", json={"items": items})
+    assert response.status_code == 200
+    quote = response.json()
+    assert quote["valid"] is False
+    assert "not available for this menu item" in quote["items"][0]["error"]
+    assert "currently not available" in quote["items"][1]["error"]
+    assert quote["items"][2]["error"] == "Menu item not found"
+    assert quote["items"][3]["error"] is None
+    # Invalid lines are priced 0
+    assert quote["total_amount"] == pytest.approx(12.99, rel=1e-9)
+
+def test_quote_batch(client):
+    menu_item_id = str(mock_menu_item_1["_id"])
+    variants = [
+        {"items": [{"menu_item_id": menu_item_id}]},
+        {"items": [{"menu_item_id": menu_item_id, "selected_options": ["Bacon"]}]},
+        {"items": [{"menu_item_id": menu_item_id, "quantity": 3, "selected_options": ["Bacon", "Extra Cheese"]}]}
+    ]
+    response = client.post("/quote:batch", json={"variants": variants})
+    assert response.status_code == 200
+    totals = [quote["total_amount"] for quote in response.json()["quotes"]]
+    assert totals == pytest.approx([12.99, 14.99, 49.47], rel=1e-9)
+
+def test_quote_batch_requires_variants(client):
+    response = client.post("/quote:batch", json={"variants": []})
+    assert response.status_code == 422
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from singleflight import SingleFlight
+
+class BlockingQuery:
+    """Simulates a DB call that stays in flight until released."""
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        if self.error:
+            raise self.error
+        return self.result
+
+async def run_concurrently(flight, query, count, key="item-1"):
+    tasks = [asyncio.ensure_future(flight.do("menu.get", key, query)) for _ in range(count)]
+    # Let every task reach the single-flight layer before releasing the query
+    while query.calls == 0:
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.01)
+    query.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+# Test cases
+def test_concurrent_identical_reads_share_one_call():
+    flight = SingleFlight(max_waiters=10)
+    query = BlockingQuery(result={"name": "Bacon"})
+    results = asyncio.run(run_concurrently(flight, query, 5))
+    assert query.calls == 1
+    assert all(result == {"name": "Bacon"} for result in results)
+    assert flight.in_flight() == 0
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight(max_waiters=10)
+    query = BlockingQuery(result=1)
+    query.release.set()
+
+    async def scenario():
+        return await asyncio.gather(
+            flight.do("menu.get", "a", query),
+            flight.do("menu.get", "b", query)
+        )
+
+    assert asyncio.run(scenario()) == [1, 1]
+    assert query.calls == 2
+
+def test_waiters_above_limit_are_rejected():
+    flight = SingleFlight(max_waiters=2)
+    query = BlockingQuery(result="ok")
+    results = asyncio.run(run_concurrently(flight, query, 5))
+    assert query.calls == 1
+    assert results.count("ok") == 3
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 2
+    assert all(r.status_code == 503 for r in rejected)
+
+def test_errors_are_shared_with_waiters():
+    flight = SingleFlight(max_waiters=10)
+    query = BlockingQuery(error=ValueError("boom"))
+    results = asyncio.run(run_concurrently(flight, query, 3))
+    assert query.calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_next_call_after_completion_runs_again():
+    flight = SingleFlight(max_waiters=10)
+    query = BlockingQuery(result=1)
+    query.release.set()
+
+    async def scenario():
+        await flight.do("orders.get", "x", query)
+        await flight.do("orders.get", "x", query)
+
+    asyncio.run(scenario())
+    assert query.calls == 2
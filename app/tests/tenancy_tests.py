@@ -0,0 +1,151 @@
+import asyncio
+import time
+import pytest
+import mongomock
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pymongo import InsertOne, UpdateOne
+from main import app
+from database import get_collections, get_database, get_truck_id
+from tenancy import TruckCollection, collections_truck, truck_collections
+from migrate_tenancy import assign_truck, move_catalog_counter
+from routes.options import get_option
+
+# Mock collection recording the calls it receives
+class RecordingCollection:
+    name = "menu"
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, method):
+        def record(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+        return record
+
+# Test cases
+def test_filters_and_documents_are_scoped():
+    collection = RecordingCollection()
+    menu = TruckCollection(collection, "food-1")
+    menu.find({"available": True, "truck_id": "food-2"}, limit=5)
+    menu.find_one(sort=[("created_at", -1)])
+    menu.insert_one({"name": "Burger"})
+    menu.update_many({"options": "Bacon"}, {"$set": {"seq": 3}})
+    assert collection.calls == [
+        ("find", ({"available": True, "truck_id": "food-1"},), {"limit": 5}),
+        ("find_one", ({"truck_id": "food-1"},), {"sort": [("created_at", -1)]}),
+        ("insert_one", ({"name": "Burger", "truck_id": "food-1"},), {}),
+        ("update_many", ({"options": "Bacon", "truck_id": "food-1"}, {"$set": {"seq": 3}}), {})
+    ]
+
+def test_bulk_write_and_aggregate_are_scoped():
+    collection = RecordingCollection()
+    menu = TruckCollection(collection, "food-1")
+    update = UpdateOne({"name": "Burger"}, {"$set": {"price": 9}}, upsert=True)
+    menu.bulk_write([update, InsertOne({"name": "Fries"})], ordered=False)
+    operations = collection.calls[0][1][0]
+    assert operations[0]._filter == {"name": "Burger", "truck_id": "food-1"}
+    assert operations[0]._upsert
+    assert operations[1]._doc == {"name": "Fries", "truck_id": "food-1"}
+    # The caller's operation is left untouched
+    assert update._filter == {"name": "Burger"}
+
+    menu.aggregate([{"$group": {"_id": "$category"}}])
+    menu.aggregate([{"$geoNear": {"near": [0, 0], "distanceField": "distance"}}, {"$limit": 1}])
+    assert collection.calls[1][1][0][0] == {"$match": {"truck_id": "food-1"}}
+    assert collection.calls[2][1][0][0]["$geoNear"]["query"] == {"truck_id": "food-1"}
+
+def test_counter_ids_are_prefixed():
+    collection = RecordingCollection()
+    collections = truck_collections({"counters": collection, "other": object()}, "food-1")
+    collections["counters"].find_one({"_id": "catalog"})
+    assert collection.calls[0][1][0] == {"_id": "food-1:catalog", "truck_id": "food-1"}
+    assert collections_truck(collections) == "food-1"
+    assert not isinstance(collections["other"], TruckCollection)
+
+def test_truck_id_header():
+    assert get_truck_id(None) == "default"
+    assert get_truck_id("food-1") == "food-1"
+    with pytest.raises(HTTPException):
+        get_truck_id("food:1")
+
+def test_migration_assigns_existing_documents():
+    db = mongomock.MongoClient().db
+    db["menu"].insert_many([{"name": "Burger"}, {"name": "Fries", "truck_id": "food-2"}])
+    db["counters"].insert_one({"_id": "catalog", "seq": 12})
+    collections = {name: db[name] for name in ("menu", "options", "carts", "orders", "counters", "tombstones", "pricing_rules", "inventory")}
+    assert assign_truck(collections, "food-1")["menu"] == 1
+    assert move_catalog_counter(db["counters"], "food-1")
+    assert db["counters"].find_one({"_id": "food-1:catalog"})["seq"] == 12
+    assert db["counters"].find_one({"_id": "catalog"}) is None
+    assert sorted(doc["truck_id"] for doc in db["menu"].find()) == ["food-1", "food-2"]
+
+# Collection whose reads stay in flight long enough to be coalesced
+class SlowCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, method):
+        return getattr(self.collection, method)
+
+    def find_one(self, *args, **kwargs):
+        time.sleep(0.05)
+        return self.collection.find_one(*args, **kwargs)
+
+def test_coalesced_reads_stay_within_their_truck():
+    db = mongomock.MongoClient().db
+    option_id = db["options"].insert_one({"truck_id": "food-1", "name": "Bacon", "price": 2.0}).inserted_id
+    collections = {"options": SlowCollection(db["options"]), "counters": db["counters"]}
+
+    async def scenario():
+        return await asyncio.gather(
+            get_option(str(option_id), truck_collections(collections, "food-1")),
+            get_option(str(option_id), truck_collections(collections, "food-2")),
+            return_exceptions=True
+        )
+
+    found, other_truck = asyncio.run(scenario())
+    assert found.name == "Bacon"
+    assert isinstance(other_truck, HTTPException)
+
+# Trucks sharing one database through the API
+@pytest.fixture
+def client():
+    db = mongomock.MongoClient().db
+    db["menu"].create_index([("truck_id", 1), ("name", 1)], unique=True)
+    app.dependency_overrides.pop(get_collections, None)
+    app.dependency_overrides[get_database] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_database, None)
+
+def test_trucks_do_not_see_each_other(client):
+    burger = {"name": "Burger", "price": 10.0}
+    assert client.post("/menu/", json=burger, headers={"X-Truck-Id": "food-1"}).status_code == 200
+    # Names are unique per truck only
+    assert client.post("/menu/", json=burger, headers={"X-Truck-Id": "food-2"}).status_code == 200
+    assert client.post("/menu/", json={**burger, "price": 12.0}, headers={"X-Truck-Id": "food-2"}).status_code == 400
+
+    menu = client.get("/menu/", headers={"X-Truck-Id": "food-1"}).json()
+    assert [item["price"] for item in menu] == [10.0]
+    item_id = menu[0]["id"]
+    assert client.get(f"/menu/{item_id}", headers={"X-Truck-Id": "food-2"}).status_code == 400
+    assert client.delete(f"/menu/{item_id}", headers={"X-Truck-Id": "food-2"}).status_code == 400
+    assert client.get("/menu/").json() == []
+    assert client.get("/menu/", headers={"X-Truck-Id": "food 1"}).status_code == 400
+
+def test_catalog_etags_are_per_truck(client):
+    for truck_id in ("food-1", "food-2"):
+        response = client.post("/options/", json={"name": "Bacon", "price": 2.0}, headers={"X-Truck-Id": truck_id})
+        assert response.status_code == 200
+    response = client.get("/options/", headers={"X-Truck-Id": "food-1"})
+    assert response.headers["vary"] == "X-Truck-Id"
+    etag = response.headers["etag"]
+    assert etag.startswith('"food-1-options-')
+
+    # Same version number on the other truck, yet not its catalog
+    response = client.get("/options/", headers={"X-Truck-Id": "food-2", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    response = client.get("/options/", headers={"X-Truck-Id": "food-1", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["vary"] == "X-Truck-Id"
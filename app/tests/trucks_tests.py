@@ -0,0 +1,105 @@
+import pytest
+from fastapi.testclient import TestClient
+from bson import ObjectId
+from main import app
+from database import get_collections
+from locations import LocationThrottle, distance_meters, location_throttle, nearby_pipeline
+
+# Mock data
+burger_id = ObjectId()
+mock_results = [
+    {
+        "_id": "food-1",
+        "name": "Le Camion",
+        "location": {"type": "Point", "coordinates": [2.3522, 48.8566]},
+        "distance": 120.04,
+        "items": [{"_id": burger_id, "name": "Burger", "price": 10.0}]
+    }
+]
+
+# Mock trucks collection recording writes and aggregation pipelines
+class MockTrucks:
+    def __init__(self):
+        self.data = {}
+        self.pipelines = []
+
+    def update_one(self, query, update, upsert=False):
+        self.data.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return mock_results
+
+mock_trucks = MockTrucks()
+
+# Mock database dependency
+def mock_get_collections():
+    return {"trucks": mock_trucks}
+
+# Setup test client
+@pytest.fixture
+def client():
+    mock_trucks.data = {}
+    mock_trucks.pipelines = []
+    location_throttle.forget()
+    app.dependency_overrides[get_collections] = mock_get_collections
+    return TestClient(app)
+
+# Test cases
+def test_distance_meters():
+    # Paris - London
+    assert distance_meters(48.8566, 2.3522, 51.5074, -0.1278) == pytest.approx(343500, rel=0.01)
+    assert distance_meters(48.8566, 2.3522, 48.8566, 2.3522) == 0
+
+def test_throttle_drops_small_moves():
+    throttle = LocationThrottle(min_move_meters=10, refresh_seconds=60)
+    assert throttle.should_store("food-1", 48.8566, 2.3522)
+    # About 1 meter
+    assert not throttle.should_store("food-1", 48.85661, 2.3522)
+    # About 110 meters
+    assert throttle.should_store("food-1", 48.8576, 2.3522)
+    assert throttle.should_store("food-2", 48.8576, 2.3522)
+    refreshing = LocationThrottle(min_move_meters=10, refresh_seconds=0)
+    assert refreshing.should_store("food-1", 48.8566, 2.3522)
+    assert refreshing.should_store("food-1", 48.8566, 2.3522)
+
+def test_nearby_pipeline():
+    pipeline = nearby_pipeline(48.8566, 2.3522, "Burger", 2000, 5)
+    geo_near = pipeline[0]["$geoNear"]
+    assert geo_near["near"] == {"type": "Point", "coordinates": [2.3522, 48.8566]}
+    assert geo_near["maxDistance"] == 2000
+    assert geo_near["query"]["open"] is True
+    assert pipeline[1]["$lookup"]["pipeline"][0] == {"$match": {"name": "Burger", "available": True}}
+    # Trucks without the item are dropped before the limit
+    assert pipeline[-2:] == [{"$match": {"items": {"$ne": []}}}, {"$limit": 5}]
+    assert len(nearby_pipeline(48.8566, 2.3522, None, 2000, 5)) == 2
+
+def test_update_location(client):
+    headers = {"X-Truck-Id": "food-1"}
+    response = client.put("/trucks/me/location", json={"lat": 48.8566, "lng": 2.3522}, headers=headers)
+    assert response.json() == {"stored": True}
+    assert mock_trucks.data["food-1"]["location"]["coordinates"] == [2.3522, 48.8566]
+    response = client.put("/trucks/me/location", json={"lat": 48.85661, "lng": 2.3522}, headers=headers)
+    assert response.json() == {"stored": False}
+    assert client.put("/trucks/me/location", json={"lat": 91, "lng": 0}, headers=headers).status_code == 422
+
+def test_update_truck(client):
+    response = client.put("/trucks/me", json={"name": "Le Camion", "open": True}, headers={"X-Truck-Id": "food-1"})
+    assert response.status_code == 200
+    assert mock_trucks.data["food-1"] == {"_id": "food-1", "name": "Le Camion", "open": True}
+
+def test_nearby_trucks(client):
+    response = client.get("/trucks/nearby?lat=48.857&lng=2.352&item=Burger&limit=3")
+    assert response.status_code == 200
+    assert response.json() == [{
+        "truck_id": "food-1",
+        "name": "Le Camion",
+        "distance": 120.0,
+        "location": {"lat": 48.8566, "lng": 2.3522},
+        "item": {"id": str(burger_id), "name": "Burger", "price": 10.0}
+    }]
+    assert mock_trucks.pipelines[0][-1] == {"$limit": 3}
+
+def test_nearby_trucks_invalid(client):
+    assert client.get("/trucks/nearby?lat=48.857").status_code == 422
+    assert client.get("/trucks/nearby?lat=48.857&lng=2.352&limit=1000").status_code == 422
@@ -4,9 +4,9 @@ from bson import ObjectId
 from fastapi import HTTPException
 from routes.order import (
     generate_order_number,
-    calculate_item_total,
     validate_menu_item_and_options
 )
+from pricing import calculate_item_total
 
 # Mock data for tests
 mock_menu_item = {
@@ -25,7 +25,8 @@ mock_options = [
 def test_generate_order_number_first_order():
     # Mock collections with no existing orders
     collections = {
-        "orders": MockCollection([])
+        "orders": MockCollection([]),
+        "counters": MockCounters()
     }
     
     # Get current year
@@ -43,11 +44,14 @@ def test_generate_order_number_with_existing_orders():
     collections = {
         "orders": MockCollection([
             {"order_number": f"FT-{current_year}-0001"}
-        ])
+        ]),
+        "counters": MockCounters()
     }
     
     order_number = generate_order_number(collections)
     assert order_number == f"FT-{current_year}-0002"
+    # Next numbers come from the counter alone
+    assert generate_order_number(collections) == f"FT-{current_year}-0003"
 
 # Tests for calculate_item_total
 def test_calculate_item_total_no_options():
@@ -78,6 +82,11 @@ def test_calculate_item_total_with_invalid_options():
     # Invalid options should be ignored
     assert total == 20.0
 
+def test_calculate_item_total_with_object_id_references():
+    cheese = {"_id": ObjectId(), "name": "Extra Cheese", "price": 1.5}
+    total = calculate_item_total(10.0, 2, [cheese["_id"]], [cheese])
+    assert total == 23.0
+
 # Tests for validate_menu_item_and_options
 def test_validate_menu_item_and_options_valid():
     collections = {
@@ -150,4 +159,23 @@ class MockCollection:
             # Handle options query
             valid_names = set(query["name"]["$in"])
             return [item for item in self.data if item["name"] in valid_names]
-        return self.data 
\ No newline at end of file
+        return self.data 
+
+# Mock counters collection for order number sequences
+class MockCounters:
+    def __init__(self):
+        self.data = {}
+
+    def find_one(self, query):
+        return self.data.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, value in update.get("$max", {}).items():
+            counter[field] = max(counter.get(field, 0), value)
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        counter = self.data.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        for field, amount in update.get("$inc", {}).items():
+            counter[field] = counter.get(field, 0) + amount
+        return counter
@@ -0,0 +1,176 @@
+import time
+from datetime import datetime, timedelta, UTC
+import pytest
+import mongomock
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from main import app
+from database import get_collections, get_database
+from auth import RevocationCache, create_token, decode_token, hash_password_sync, revocation_cache, verify_password_sync
+import config
+
+alice = {"email": "Alice@example.com", "full_name": "Alice", "phone_number": "+33612345678", "password": "correct horse"}
+
+# Accounts and carts in an in-memory database
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    db["users"].create_index("email", unique=True)
+    return db
+
+@pytest.fixture
+def client(db):
+    revocation_cache.clear()
+    app.dependency_overrides.pop(get_collections, None)
+    app.dependency_overrides[get_database] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_database, None)
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+# Test cases
+def test_password_hashing():
+    password_hash = hash_password_sync("correct horse")
+    assert password_hash.startswith("scrypt$")
+    assert hash_password_sync("correct horse") != password_hash
+    assert verify_password_sync("correct horse", password_hash)
+    assert not verify_password_sync("wrong horse", password_hash)
+    assert not verify_password_sync("correct horse", "garbage")
+
+def test_tokens():
+    token, _ = create_token("user-1")
+    assert decode_token(token)["sub"] == "user-1"
+    payload, _, signature = token.partition(".")
+    assert decode_token(f"{payload}.{signature[:-2]}AA") is None
+    assert decode_token(payload) is None
+
+def test_expired_token(monkeypatch):
+    monkeypatch.setattr(config, "AUTH_TOKEN_TTL_SECONDS", -1)
+    token, _ = create_token("user-1")
+    assert decode_token(token) is None
+
+def test_revocation_cache():
+    cache = RevocationCache(max_size=2, ttl=0.01)
+    cache.put("a", False)
+    cache.put("b", True)
+    assert cache.get("a") is False
+    cache.put("c", False)
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    time.sleep(0.02)
+    # Stale checks are redone, revocations are kept
+    cache.put("d", True)
+    assert cache.get("c") is None
+    assert cache.get("d") is True
+
+def test_signup_login_logout(client, db):
+    response = client.post("/users/signup", json=alice)
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "alice@example.com"
+    assert "password" not in db["users"].find_one()
+    assert client.post("/users/signup", json=alice).status_code == 400
+
+    response = client.post("/users/login", json={"email": "alice@example.com", "password": "wrong horse"})
+    assert response.status_code == 401
+    response = client.post("/users/login", json={"email": "bob@example.com", "password": "correct horse"})
+    assert response.status_code == 401
+    response = client.post("/users/login", json={"email": alice["email"], "password": alice["password"]})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    assert client.get("/users/me", headers=bearer(token)).json()["full_name"] == "Alice"
+    assert client.get("/users/me").status_code == 401
+    assert client.post("/users/logout", headers=bearer(token)).status_code == 200
+    assert client.get("/users/me", headers=bearer(token)).status_code == 401
+    assert db["revoked_tokens"].count_documents({}) == 1
+
+def test_revocation_seen_by_other_workers(client, db):
+    token = client.post("/users/signup", json=alice).json()["access_token"]
+    assert client.get("/users/me", headers=bearer(token)).status_code == 200
+    # Another worker revoked it: seen once the cached check goes stale
+    db["revoked_tokens"].insert_one({"_id": decode_token(token)["jti"]})
+    revocation_cache.clear()
+    assert client.get("/users/me", headers=bearer(token)).status_code == 401
+
+def test_carts_are_per_user(client):
+    burger = client.post("/menu/", json={"name": "Burger", "price": 10.0}).json()
+    token = client.post("/users/signup", json=alice).json()["access_token"]
+    response = client.post("/cart/items", json={"menu_item_id": burger["id"], "quantity": 2}, headers=bearer(token))
+    assert response.status_code == 200
+    assert client.get("/cart/", headers=bearer(token)).json()["items"][0]["quantity"] == 2
+    # The anonymous cart is another one
+    assert client.get("/cart/").status_code == 404
+    assert client.get("/cart/", headers={"Authorization": "Bearer forged"}).status_code == 401
+
+def test_orders_of_two_users_get_distinct_numbers(client, db):
+    db["orders"].create_index([("truck_id", 1), ("order_number", 1)], unique=True)
+    burger = client.post("/menu/", json={"name": "Burger", "price": 10.0}).json()
+    # Numbered by someone else before the order number counter existed
+    year = datetime.now(UTC).year
+    db["orders"].insert_one({"truck_id": "default", "user_id": "someone-else", "order_number": f"FT-{year}-0007"})
+    numbers = []
+    for user in (alice, {**alice, "email": "bob@example.com", "full_name": "Bob"}):
+        headers = bearer(client.post("/users/signup", json=user).json()["access_token"])
+        client.post("/cart/items", json={"menu_item_id": burger["id"], "quantity": 1}, headers=headers)
+        response = client.post("/orders/", headers=headers)
+        assert response.status_code == 200
+        numbers.append(response.json()["order_number"])
+    # Numbered per truck, whoever placed the previous orders
+    assert numbers == [f"FT-{year}-0008", f"FT-{year}-0009"]
+
+def insert_orders(db, user_id, count, status="livrée"):
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    orders = [{
+        "_id": ObjectId(),
+        "truck_id": "default",
+        "user_id": user_id,
+        "order_number": f"FT-2026-{i:04d}",
+        "status": status,
+        "items": [{"menu_item_id": str(ObjectId()), "quantity": 2, "selected_options": []}],
+        "total_amount": 20.0,
+        # Two orders per millisecond: ties are broken by _id
+        "created_at": start + timedelta(milliseconds=i // 2)
+    } for i in range(count)]
+    db["orders"].insert_many(orders)
+    return orders
+
+def test_order_history_pages(client, db):
+    signup = client.post("/users/signup", json=alice).json()
+    headers = bearer(signup["access_token"])
+    orders = insert_orders(db, signup["user"]["id"], 5)
+    insert_orders(db, "someone-else", 3)
+
+    seen, before = [], None
+    while True:
+        params = {"limit": 2, **({"before": before} if before else {})}
+        page = client.get("/users/me/orders", params=params, headers=headers).json()
+        seen += page["orders"]
+        before = page["next_before"]
+        if before is None:
+            break
+    newest_first = sorted(orders, key=lambda order: (order["created_at"], order["_id"]), reverse=True)
+    assert [order["id"] for order in seen] == [str(order["_id"]) for order in newest_first]
+    assert seen[0]["item_count"] == 2
+    assert "items" not in seen[0]
+    assert client.get("/users/me/orders?before=garbage", headers=headers).status_code == 400
+    before = f"{10 ** 20}-{orders[0]['_id']}"
+    assert client.get("/users/me/orders", params={"before": before}, headers=headers).status_code == 400
+    assert client.get("/users/me/orders").status_code == 401
+
+def test_active_orders_are_cached(client, db):
+    signup = client.post("/users/signup", json=alice).json()
+    headers = bearer(signup["access_token"])
+    order = insert_orders(db, signup["user"]["id"], 1, status="pending")[0]
+    insert_orders(db, signup["user"]["id"], 1)
+    active = client.get("/users/me/orders/active", headers=headers).json()
+    assert [summary["status"] for summary in active] == ["pending"]
+
+    # Refreshes are served from the cache
+    db["orders"].update_one({"_id": order["_id"]}, {"$set": {"order_number": "changed"}})
+    assert client.get("/users/me/orders/active", headers=headers).json() == active
+    # A status change drops it
+    assert client.put(f"/orders/{order['_id']}/status?status=prête").status_code == 200
+    assert client.get("/users/me/orders/active", headers=headers).json()[0]["status"] == "prête"
+    assert client.put(f"/orders/{order['_id']}/status?status=livrée").status_code == 200
+    assert client.get("/users/me/orders/active", headers=headers).json() == []
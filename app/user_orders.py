@@ -0,0 +1,146 @@
+"""
+Order history of a customer account (GET /users/me/orders).
+
+History pages are read newest first through the `(user_id, created_at, _id)`
+index with keyset pagination: the cursor is the position of the last order
+returned, so a page costs the same however deep it is, and orders created
+meanwhile do not shift the following pages. Only the fields of the list are
+read (no lines, options or reservations).
+
+The active orders of a user (not delivered or cancelled yet), which apps
+poll while waiting, are kept per worker for ACTIVE_ORDERS_CACHE_TTL seconds
+(ACTIVE_ORDERS_CACHE_SIZE users at most) and dropped on every status change
+made through this worker; a change made through another worker shows after
+the TTL at worst.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from schemas.order import OrderStatus
+from order_events import order_events
+import config
+
+ACTIVE_STATUSES = [OrderStatus.PENDING, OrderStatus.IN_PREPARATION, OrderStatus.READY]
+
+# Fields of an order summary
+SUMMARY_PROJECTION = {
+    "truck_id": 1, "order_number": 1, "status": 1, "total_amount": 1, "created_at": 1, "items.quantity": 1
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+class ActiveOrdersCache:
+    """Active order summaries per user, LRU with a TTL."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[List[dict], float]]" = OrderedDict()
+        # Status changes come from request handlers and the order sweeper thread
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[List[dict]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            orders, loaded_at = entry
+            if time.monotonic() - loaded_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return orders
+
+    def put(self, user_id: str, orders: List[dict]) -> None:
+        with self._lock:
+            self._entries[user_id] = (orders, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+active_orders = ActiveOrdersCache(config.ACTIVE_ORDERS_CACHE_SIZE, config.ACTIVE_ORDERS_CACHE_TTL)
+
+
+def status_changed(collections: dict, order: dict, status: str, previous_status: Optional[str] = None) -> None:
+    """Log a status change of `order` and drop its user's cached active orders."""
+    order_events.record(collections, order, status, previous_status)
+    if order.get("user_id"):
+        active_orders.invalidate(order["user_id"])
+
+
+def order_summary(order: dict) -> dict:
+    return {
+        "id": str(order["_id"]),
+        "truck_id": order.get("truck_id"),
+        "order_number": order["order_number"],
+        "status": order["status"],
+        "total_amount": order["total_amount"],
+        "item_count": sum(line["quantity"] for line in order.get("items", [])),
+        "created_at": order["created_at"]
+    }
+
+
+def _milliseconds(moment: datetime) -> int:
+    # pymongo returns naive UTC datetimes
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    return (moment - EPOCH) // timedelta(milliseconds=1)
+
+
+def encode_cursor(order: dict) -> str:
+    return f"{_milliseconds(order['created_at'])}-{order['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """(created_at, _id) of the last order of the previous page; ValueError if malformed."""
+    milliseconds, _, order_id = cursor.partition("-")
+    if not ObjectId.is_valid(order_id):
+        raise ValueError("invalid cursor")
+    try:
+        created_at = EPOCH + timedelta(milliseconds=int(milliseconds))
+    except OverflowError:
+        # Out of the datetime range
+        raise ValueError("invalid cursor")
+    return created_at, ObjectId(order_id)
+
+
+def history_page(orders, user_id: str, before: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """One page of a user's orders, newest first, and the cursor of the next one."""
+    query: dict = {"user_id": user_id}
+    if before:
+        created_at, order_id = decode_cursor(before)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": order_id}}
+        ]
+    # One more than asked tells whether there is a next page
+    documents = list(
+        orders.find(query, SUMMARY_PROJECTION).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1)
+    )
+    next_before = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+    return [order_summary(document) for document in documents[:limit]], next_before
+
+
+def user_active_orders(orders, user_id: str) -> List[dict]:
+    cached = active_orders.get(user_id)
+    if cached is not None:
+        return cached
+    documents = orders.find(
+        {"user_id": user_id, "status": {"$in": ACTIVE_STATUSES}},
+        SUMMARY_PROJECTION
+    ).sort([("created_at", -1), ("_id", -1)])
+    summaries = [order_summary(document) for document in documents]
+    active_orders.put(user_id, summaries)
+    return summaries
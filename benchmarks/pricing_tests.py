@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime
+from routes import order
+from pricing import calculate_item_total, discount_totals, quote_items
+from pricing_rules import PricingEngine
+from schemas.cart import CartItem
+from sample_catalog import (
+    CART_SIZES, OPTION_COUNTS, RULE_COUNTS, make_collections, make_cart_items, make_pricing_rules
+)
+
+HAPPY_HOUR = datetime(2026, 3, 4, 18, 0)
+
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+def test_calculate_item_total(benchmark, option_count):
+    collections = make_collections(option_count)
+    options = collections["options"].data
+    selected = [opt["name"] for opt in options[:5]]
+    total = benchmark(calculate_item_total, 10.0, 2, selected, options)
+    assert total > 20.0
+
+# POST /quote: pricing against the cached catalog, no database access
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+@pytest.mark.parametrize("line_count", CART_SIZES)
+def test_quote_items(benchmark, line_count, option_count):
+    collections = make_collections(option_count)
+    menu = collections["menu"].data
+    menu_by_id = {str(item["_id"]): item for item in menu}
+    options_by_name = {opt["name"]: opt for opt in collections["options"].data}
+    items = [
+        CartItem(menu_item_id=str(menu[i % len(menu)]["_id"]), quantity=1 + i % 3, selected_options=menu[0]["options"][:3])
+        for i in range(line_count)
+    ]
+    quote = benchmark(quote_items, items, menu_by_id, options_by_name, PricingEngine([]), HAPPY_HOUR)
+    assert quote["valid"]
+
+# Pricing rules evaluation per cart (rules compiled once, as in the catalog cache)
+@pytest.mark.parametrize("rule_count", RULE_COUNTS)
+@pytest.mark.parametrize("line_count", CART_SIZES)
+def test_evaluate_pricing_rules(benchmark, line_count, rule_count):
+    collections = make_collections(10)
+    menu = collections["menu"].data
+    menu_by_id = {str(item["_id"]): item for item in menu}
+    engine = PricingEngine(make_pricing_rules(menu, rule_count))
+    lines = [{**line, "total_price": 12.0 * line["quantity"]} for line in make_cart_items(menu, collections["options"].data, line_count)]
+    totals = benchmark(discount_totals, lines, menu_by_id, engine, HAPPY_HOUR)
+    assert totals["discount_amount"] > 0
+
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+@pytest.mark.parametrize("line_count", CART_SIZES)
+def test_calculate_total_amount(benchmark, line_count, option_count):
+    collections = make_collections(option_count)
+    items = make_cart_items(collections["menu"].data, collections["options"].data, line_count)
+    total = benchmark(order.calculate_total_amount, items, collections)
+    assert total > 0
+
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+@pytest.mark.parametrize("line_count", CART_SIZES)
+def test_validate_menu_items(benchmark, line_count, option_count):
+    collections = make_collections(option_count)
+    items = make_cart_items(collections["menu"].data, collections["options"].data, line_count)
+    benchmark(order.validate_menu_items, items, collections)
+
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+def test_validate_menu_item_and_options(benchmark, option_count):
+    collections = make_collections(option_count)
+    menu_item = collections["menu"].data[0]
+    selected = menu_item["options"][:5]
+    result = benchmark(
+        order.validate_menu_item_and_options, str(menu_item["_id"]), selected, collections
+    )
+    assert result[0] is menu_item
@@ -0,0 +1,88 @@
+"""Synthetic catalog data shared by the benchmarks."""
+from bson import ObjectId
+
+# Realistic and extreme sizes for the hot-path functions
+CART_SIZES = [5, 100]
+OPTION_COUNTS = [10, 500]
+
+# Minimal in-memory collection supporting the queries used by the pricing code
+class InMemoryCollection:
+    def __init__(self, data):
+        self.data = data
+        self.by_id = {doc["_id"]: doc for doc in data}
+
+    def find(self, query=None):
+        if query and "_id" in query and "$in" in query["_id"]:
+            return [self.by_id[_id] for _id in query["_id"]["$in"] if _id in self.by_id]
+        if query and "name" in query and "$in" in query["name"]:
+            names = set(query["name"]["$in"])
+            return [doc for doc in self.data if doc["name"] in names]
+        return list(self.data)
+
+    def find_one(self, query=None, sort=None):
+        if query and "_id" in query:
+            return self.by_id.get(query["_id"])
+        return self.data[0] if self.data else None
+
+def make_options(count: int) -> list:
+    return [{"_id": ObjectId(), "name": f"Option {i}", "price": 0.5 + i % 7} for i in range(count)]
+
+def make_menu(item_count: int, options: list) -> list:
+    names = [opt["name"] for opt in options]
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Item {i}",
+            "description": "Benchmark item",
+            "price": 5.0 + i % 11,
+            "available": True,
+            "options": names
+        }
+        for i in range(item_count)
+    ]
+
+def make_cart_items(menu: list, options: list, line_count: int, options_per_line: int = 3) -> list:
+    # Lines as stored: menu item and options referenced by ObjectId
+    option_ids = {opt["name"]: opt["_id"] for opt in options}
+    items = []
+    for i in range(line_count):
+        menu_item = menu[i % len(menu)]
+        items.append({
+            "menu_item_id": menu_item["_id"],
+            "quantity": 1 + i % 3,
+            "selected_options": [option_ids[name] for name in menu_item["options"][:options_per_line]],
+            "special_instructions": None,
+            "total_price": 0.0
+        })
+    return items
+
+def make_collections(option_count: int, menu_size: int = 20) -> dict:
+    options = make_options(option_count)
+    return {
+        "menu": InMemoryCollection(make_menu(menu_size, options)),
+        "options": InMemoryCollection(options)
+    }
+
+# Evaluation cost grows with the rules matching a cart, not with the stored ones
+RULE_COUNTS = [10, 200]
+
+def make_pricing_rules(menu: list, count: int) -> list:
+    """Mix of every rule type, half of them limited to a happy hour."""
+    kinds = ["percentage", "fixed", "buy_x_get_y", "combo"]
+    rules = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        item_count = 2 if kind == "combo" else 1
+        rules.append({
+            "id": str(ObjectId()),
+            "name": f"Rule {i}",
+            "type": kind,
+            "menu_item_ids": [str(menu[(i + j) % len(menu)]["_id"]) for j in range(item_count)],
+            "value": 5.0 if kind == "combo" else 10.0 if kind == "percentage" else 1.0,
+            "buy_quantity": 2,
+            "get_quantity": 1,
+            "start_time": "17:00" if i % 2 else None,
+            "end_time": "19:00" if i % 2 else None,
+            "days": []
+        })
+    return rules
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from datetime import datetime, UTC
+from bson import ObjectId
+from routes.menu import validate_option_names
+from schemas.menu import MenuItemResponse
+from schemas.option import OptionResponse
+from schemas.order import OrderResponse
+from references import to_public_line
+from sample_catalog import CART_SIZES, OPTION_COUNTS, make_collections, make_cart_items
+
+# The `{**doc, "id": str(doc["_id"])}` conversion followed by response model validation
+def serialize(documents: list, response_model) -> list:
+    return [response_model(**{**doc, "id": str(doc["_id"])}) for doc in documents]
+
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+def test_serialize_options(benchmark, option_count):
+    options = make_collections(option_count)["options"].data
+    result = benchmark(serialize, options, OptionResponse)
+    assert len(result) == option_count
+
+@pytest.mark.parametrize("menu_size", [20, 500])
+def test_serialize_menu(benchmark, menu_size):
+    menu = make_collections(10, menu_size=menu_size)["menu"].data
+    result = benchmark(serialize, menu, MenuItemResponse)
+    assert len(result) == menu_size
+
+@pytest.mark.parametrize("line_count", CART_SIZES)
+def test_serialize_orders(benchmark, line_count):
+    collections = make_collections(10)
+    now = datetime.now(UTC)
+    orders = [
+        {
+            "_id": ObjectId(),
+            "order_number": f"FT-2026-{i:04d}",
+            "items": make_cart_items(collections["menu"].data, collections["options"].data, line_count),
+            "total_amount": 100.0,
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now
+        }
+        for i in range(50)
+    ]
+    option_names = {opt["_id"]: opt["name"] for opt in collections["options"].data}
+
+    # Stored lines reference by ObjectId, the response exposes string ids and names
+    def serialize_orders():
+        return [
+            OrderResponse(**{
+                **order,
+                "id": str(order["_id"]),
+                "items": [to_public_line(line, option_names) for line in order["items"]]
+            })
+            for order in orders
+        ]
+
+    result = benchmark(serialize_orders)
+    assert len(result) == 50
+
+@pytest.mark.parametrize("option_count", OPTION_COUNTS)
+def test_validate_option_names(benchmark, option_count):
+    collections = make_collections(option_count)
+    names = [opt["name"] for opt in collections["options"].data]
+    loop = asyncio.new_event_loop()
+    try:
+        benchmark(lambda: loop.run_until_complete(validate_option_names(names, collections)))
+    finally:
+        loop.close()
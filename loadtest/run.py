@@ -0,0 +1,266 @@
+"""
+Load-test harness for the Food Truck API.
+
+Drives realistic scenarios (browse the menu, build a cart, check out, kitchen
+advancing statuses) with concurrent virtual users and reports throughput and
+p50/p95/p99 latency per route. Results are written as JSON so that runs can be
+compared against a baseline.
+
+Usage:
+    # In-process app backed by an in-memory MongoDB stand-in (mongomock)
+    python loadtest/run.py --users 20 --duration 30 --output results.json
+
+    # A locally started server (e.g. uvicorn against a local mongod)
+    python loadtest/run.py --url http://localhost:8000 --duration 60
+
+    # Fail if p95 of any route regressed more than 20% against a previous run
+    python loadtest/run.py --compare baseline.json --threshold 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, UTC
+import httpx
+
+APP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+SEED_OPTIONS = [
+    {"name": "Extra Cheese", "price": 1.5},
+    {"name": "Bacon", "price": 2.0},
+    {"name": "Jalapenos", "price": 0.75},
+    {"name": "Avocado", "price": 1.8},
+    {"name": "Double Patty", "price": 3.5},
+]
+
+SEED_MENU = [
+    {"name": "Margherita Pizza", "description": "Tomato and mozzarella", "price": 12.99,
+     "options": ["Extra Cheese", "Bacon"]},
+    {"name": "Classic Burger", "description": "Beef, cheddar, pickles", "price": 10.5,
+     "options": ["Extra Cheese", "Bacon", "Double Patty", "Jalapenos"]},
+    {"name": "Veggie Wrap", "description": "Grilled vegetables", "price": 8.9,
+     "options": ["Avocado", "Jalapenos"]},
+    {"name": "Loaded Fries", "description": "Fries with toppings", "price": 5.5,
+     "options": ["Extra Cheese", "Bacon", "Jalapenos"]},
+    {"name": "Lemonade", "description": None, "price": 3.0, "options": []},
+]
+
+KITCHEN_FLOW = ["prête", "livrée"]
+
+
+class Recorder:
+    """Collects per-route latencies (seconds) and status codes."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[route] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    for route, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        routes[route] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(route, 0),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "started_at": datetime.now(UTC).isoformat(),
+        "duration_s": round(elapsed, 2),
+        "total_requests": total,
+        "total_errors": sum(recorder.errors.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "routes": routes,
+    }
+
+
+async def seed_catalog(client: httpx.AsyncClient) -> list:
+    """Create the options and menu items (ignoring duplicates) and return the menu."""
+    for option in SEED_OPTIONS:
+        await client.post("/options/", json=option)
+    for item in SEED_MENU:
+        await client.post("/menu/", json=item)
+    response = await client.get("/menu/")
+    response.raise_for_status()
+    return response.json()
+
+
+async def customer_session(client: httpx.AsyncClient) -> dict:
+    """Sign up a new account, so that the customer gets its own cart; returns its auth headers."""
+    response = await client.post("/users/signup", json={
+        "email": f"loadtest-{uuid.uuid4().hex}@example.com",
+        "full_name": "Load Test",
+        "phone_number": "+33600000000",
+        "password": uuid.uuid4().hex,
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def customer(client: httpx.AsyncClient, recorder: Recorder, kitchen_queue: asyncio.Queue, deadline: float):
+    """Browse, fill its own cart with a few customized items and check out."""
+    headers = await customer_session(client)
+    while time.perf_counter() < deadline:
+        response = await recorder.call(client, "GET /menu/", "GET", "/menu/")
+        await recorder.call(client, "GET /options/", "GET", "/options/")
+        if response is None or response.status_code != 200:
+            continue
+        menu = [item for item in response.json() if item["available"]]
+
+        for item in random.sample(menu, k=min(len(menu), random.randint(1, 3))):
+            await recorder.call(client, "GET /menu/{menu_item_id}", "GET", f"/menu/{item['id']}")
+            selected = random.sample(item["options"], k=random.randint(0, len(item["options"])))
+            await recorder.call(client, "POST /cart/items", "POST", "/cart/items", headers=headers, json={
+                "menu_item_id": item["id"],
+                "quantity": random.randint(1, 3),
+                "selected_options": selected,
+            })
+
+        await recorder.call(client, "GET /cart/", "GET", "/cart/", headers=headers)
+        response = await recorder.call(client, "POST /orders/", "POST", "/orders/", headers=headers)
+        if response is not None and response.status_code == 200:
+            # Paid at the counter, on behalf of the customer who placed it
+            await kitchen_queue.put((response.json()["id"], headers))
+
+
+async def kitchen(client: httpx.AsyncClient, recorder: Recorder, kitchen_queue: asyncio.Queue, deadline: float):
+    """Pay for incoming orders and advance them through the kitchen statuses."""
+    while time.perf_counter() < deadline:
+        try:
+            order_id, customer_headers = await asyncio.wait_for(kitchen_queue.get(), timeout=0.5)
+        except asyncio.TimeoutError:
+            continue
+        await recorder.call(
+            client, "POST /orders/{order_id}/pay", "POST", f"/orders/{order_id}/pay", headers=customer_headers
+        )
+        for status in KITCHEN_FLOW:
+            await recorder.call(
+                client, "PUT /orders/{order_id}/status", "PUT",
+                f"/orders/{order_id}/status", params={"status": status}
+            )
+        await recorder.call(client, "GET /orders/{order_id}", "GET", f"/orders/{order_id}")
+        await recorder.call(client, "GET /orders/", "GET", "/orders/", params={"status": "pending"})
+
+
+def in_memory_transport() -> httpx.ASGITransport:
+    """Serve the app in-process with mongomock standing in for MongoDB."""
+    import mongomock
+    sys.path.insert(0, APP_PATH)
+    from main import app
+    from database import get_database, create_indexes
+
+    db = mongomock.MongoClient()["food_truck_loadtest"]
+    try:
+        create_indexes(db)
+    except NotImplementedError:
+        # mongomock has no time-series collections: order events go to a plain one
+        pass
+    app.dependency_overrides[get_database] = lambda: db
+    return httpx.ASGITransport(app=app)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Return the routes whose p95 regressed by more than `threshold` percent."""
+    regressions = []
+    for route, stats in current["routes"].items():
+        previous = baseline["routes"].get(route)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+        print(f"  {route:<35} p95 {previous['p95_ms']:>9.3f} -> {stats['p95_ms']:>9.3f} ms ({change:+.1f}%)")
+        if change > threshold:
+            regressions.append(route)
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    print(f"\n{results['total_requests']} requests in {results['duration_s']}s "
+          f"({results['throughput_rps']} req/s, {results['total_errors']} errors)\n")
+    print(f"  {'route':<35} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in results["routes"].items():
+        print(f"  {route:<35} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+
+async def run(args) -> dict:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+    else:
+        client = httpx.AsyncClient(transport=in_memory_transport(), base_url="http://loadtest", timeout=30)
+
+    async with client:
+        await seed_catalog(client)
+        recorder = Recorder()
+        kitchen_queue = asyncio.Queue()
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(customer(client, recorder, kitchen_queue, deadline) for _ in range(args.users)),
+            *(kitchen(client, recorder, kitchen_queue, deadline) for _ in range(args.kitchen_staff)),
+        )
+        return summarize(recorder, time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Food Truck API load test")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app with mongomock)")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent customers")
+    parser.add_argument("--kitchen-staff", type=int, default=2, help="Concurrent kitchen workers")
+    parser.add_argument("--duration", type=float, default=10, help="Test duration in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible scenarios")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=20, help="Allowed p95 regression in percent")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"\nComparison with {args.compare} (threshold {args.threshold}%):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\np95 regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())